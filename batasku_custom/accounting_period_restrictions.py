@@ -13,14 +13,191 @@ Restricted Transaction Types:
 - Purchase Invoice (PI)
 - Payment Entry (Payment Receive and Payment Pay)
 - Stock Entry (Stock Reconciliation)
+
+Closed periods are looked up from a per-company interval index instead of
+querying `Accounting Period` for every document. The index is cached in the
+worker and in Redis, and is invalidated whenever an Accounting Period changes
+(see `clear_closed_period_cache`).
 """
 
+from bisect import bisect_right
+
 import frappe
 from frappe import _
 from frappe.utils import getdate
 import json
 
+from batasku_custom.batasku_custom.doctype.account_balance_snapshot.account_balance_snapshot import (
+    on_closed_period_override
+)
+from batasku_custom.instrumentation import instrumented
+from batasku_custom.period_closing_audit import log_period_action
+
+
+CLOSED_STATUSES = ('Closed', 'Permanently Closed')
+OVERRIDE_ROLES = ('System Manager', 'Accounts Manager')
+
+# Redis hash of company -> closed period index
+CLOSED_PERIOD_CACHE_KEY = 'batasku_closed_period_index'
+# Redis value that changes on every invalidation, so that worker caches
+# built from an older index are discarded
+CLOSED_PERIOD_GENERATION_KEY = 'batasku_closed_period_generation'
+
+# Worker level cache: (site, company) -> (generation, index)
+_worker_index_cache = {}
+
+
+def build_closed_period_index(company):
+    """
+    Build the sorted interval index of closed periods for a company.
+
+    The index is a plain dict so it can be pickled into Redis:
+    - starts: sorted list of period start dates
+    - periods: period rows in the same order as `starts`
+    - max_end: running maximum of end_date, used to stop the backwards scan
+    - watermark: latest end_date of any closed period (None if no period is closed)
+    """
+    periods = frappe.get_all(
+        'Accounting Period',
+        filters={
+            'company': company,
+            'status': ['in', CLOSED_STATUSES]
+        },
+        fields=['name', 'period_name', 'status', 'start_date', 'end_date'],
+        order_by='start_date asc, end_date asc'
+    )
+
+    starts = []
+    rows = []
+    max_end = []
+    running_max = None
+
+    for period in periods:
+        start_date = getdate(period['start_date'])
+        end_date = getdate(period['end_date'])
+        running_max = end_date if running_max is None else max(running_max, end_date)
+
+        starts.append(start_date)
+        rows.append({
+            'name': period['name'],
+            'period_name': period['period_name'],
+            'status': period['status'],
+            'start_date': start_date,
+            'end_date': end_date
+        })
+        max_end.append(running_max)
+
+    return {
+        'starts': starts,
+        'periods': rows,
+        'max_end': max_end,
+        'watermark': running_max
+    }
+
+
+def get_closed_period_index(company):
+    """
+    Return the closed period index for a company.
+
+    Lookup order: worker memory, Redis, database. Worker entries are tagged
+    with the current cache generation so an invalidation from any worker is
+    picked up on the next request.
+    """
+    cache = frappe.cache()
+    generation = cache.get_value(CLOSED_PERIOD_GENERATION_KEY)
+    key = (getattr(frappe.local, 'site', None), company)
+
+    cached = _worker_index_cache.get(key)
+    if cached and cached[0] == generation:
+        return cached[1]
+
+    index = cache.hget(
+        CLOSED_PERIOD_CACHE_KEY,
+        company,
+        generator=lambda: build_closed_period_index(company)
+    )
+    _worker_index_cache[key] = (generation, index)
+    return index
+
+
+def clear_closed_period_cache(doc=None, method=None):
+    """
+    Invalidate the closed period index for all companies.
+
+    Can be called directly or wired as a doc event; the arguments are ignored.
+    The cache is cleared again after the transaction commits, so a worker that
+    rebuilt the index from pre-commit data does not keep a stale copy.
+    """
+    _reset_closed_period_cache()
+    frappe.db.after_commit.add(_reset_closed_period_cache)
+
+
+def _reset_closed_period_cache():
+    cache = frappe.cache()
+    cache.delete_value(CLOSED_PERIOD_CACHE_KEY)
+    cache.set_value(CLOSED_PERIOD_GENERATION_KEY, frappe.generate_hash(length=10))
+    _worker_index_cache.clear()
+
+
+def sync_closed_documents(periods, closed):
+    """
+    Set the `closed` flag of the Closed Document rows of many periods with
+    one UPDATE.
+
+    Args:
+        periods: Accounting Period names
+        closed: 1 to close the documents, 0 to open them
+    """
+    if not periods:
+        return
+
+    frappe.db.sql("""
+        UPDATE `tabClosed Document`
+        SET closed = %(closed)s
+        WHERE parenttype = 'Accounting Period'
+            AND parent IN %(periods)s
+    """, {'closed': 1 if closed else 0, 'periods': tuple(periods)})
+
 
+def find_closed_period(company, posting_date):
+    """
+    Return the closed period covering posting_date for a company, or None.
+
+    Dates after the latest closed end_date (the watermark) return immediately.
+    When periods overlap, a Permanently Closed period takes precedence.
+    """
+    index = get_closed_period_index(company)
+    watermark = index['watermark']
+    if watermark is None:
+        return None
+
+    posting_date = getdate(posting_date)
+    if posting_date > watermark:
+        return None
+
+    match = None
+    pos = bisect_right(index['starts'], posting_date) - 1
+    while pos >= 0 and index['max_end'][pos] >= posting_date:
+        period = index['periods'][pos]
+        if period['end_date'] >= posting_date:
+            if period['status'] == 'Permanently Closed':
+                return period
+            match = match or period
+        pos -= 1
+
+    return match
+
+
+def can_override_closed_period():
+    """Check if the current user may modify transactions in a closed period"""
+    if not frappe.has_permission('Accounting Period', 'write'):
+        return False
+
+    roles = set(frappe.get_roles())
+    return any(role in roles for role in OVERRIDE_ROLES)
+
+
+@instrumented
 def validate_transaction_against_closed_period(doc, method):
     """
     Validate that transactions are not created/modified in closed periods.
@@ -40,33 +217,57 @@ def validate_transaction_against_closed_period(doc, method):
         doc: The document being validated
         method: The method being called (before_insert, before_save, etc.)
     """
-    # Skip if no posting_date
-    if not hasattr(doc, 'posting_date') or not doc.posting_date:
-        return
-    
-    # Skip if no company
-    if not hasattr(doc, 'company') or not doc.company:
-        return
-    
-    # Get all closed periods for the company that include this posting_date
-    closed_periods = frappe.get_all(
-        'Accounting Period',
-        filters={
-            'company': doc.company,
-            'status': ['in', ['Closed', 'Permanently Closed']],
-            'start_date': ['<=', doc.posting_date],
-            'end_date': ['>=', doc.posting_date]
-        },
-        fields=['name', 'period_name', 'status', 'start_date', 'end_date'],
-        limit=1
-    )
-    
-    if not closed_periods:
+    _validate_against_closed_period(doc)
+
+
+def validate_many(docs, method=None):
+    """
+    Validate a batch of transactions against closed periods.
+
+    Entry point for bulk tools (Data Import, background jobs). The closed
+    period index is loaded once per company and the override permission is
+    only resolved when a document actually falls in a closed period.
+
+    Args:
+        docs: Iterable of documents or dicts with posting_date and company
+            (and doctype / name, recorded when a closed period is overridden)
+        method: Optional method name, kept for parity with the doc event hook
+    """
+    can_override = None
+    for doc in docs:
+        period = _get_closed_period_for_doc(doc)
+        if not period:
+            continue
+
+        if can_override is None:
+            can_override = can_override_closed_period()
+
+        _handle_closed_period(doc, period, can_override)
+
+
+def _get_closed_period_for_doc(doc):
+    """Return the closed period for a document, or None if it is not restricted"""
+    posting_date = doc.get('posting_date')
+    company = doc.get('company')
+
+    # Skip if no posting_date or no company
+    if not posting_date or not company:
+        return None
+
+    return find_closed_period(company, posting_date)
+
+
+def _validate_against_closed_period(doc):
+    period = _get_closed_period_for_doc(doc)
+    if not period:
         # No closed period found, allow transaction
         return
-    
-    period = closed_periods[0]
-    
+
+    _handle_closed_period(doc, period, None)
+
+
+def _handle_closed_period(doc, period, can_override):
+    """Deny, or log and allow, a transaction that falls in a closed period"""
     # Check if permanently closed - no exceptions allowed
     if period['status'] == 'Permanently Closed':
         frappe.throw(
@@ -77,28 +278,22 @@ def validate_transaction_against_closed_period(doc, method):
     
     # Check if user has override permission
     # System Manager or Accounts Manager can override
-    if frappe.has_permission('Accounting Period', 'write') and (
-        'System Manager' in frappe.get_roles() or 
-        'Accounts Manager' in frappe.get_roles()
-    ):
-        # Log the override
-        try:
-            frappe.get_doc({
-                'doctype': 'Period Closing Log',
-                'accounting_period': period['name'],
-                'action_type': 'Transaction Modified',
-                'action_by': frappe.session.user,
-                'action_date': frappe.utils.now(),
-                'affected_transaction': doc.name if doc.name else 'New Document',
-                'transaction_doctype': doc.doctype,
-                'reason': f"Modified {doc.doctype} in closed period {period['period_name']}",
-                'ip_address': frappe.local.request_ip if hasattr(frappe.local, 'request_ip') else None,
-                'user_agent': frappe.local.request.headers.get('User-Agent') if hasattr(frappe.local, 'request') else None
-            }).insert(ignore_permissions=True)
-            frappe.db.commit()
-        except Exception as e:
-            frappe.log_error(f"Failed to create audit log: {str(e)}", "Period Closing Audit Log Error")
+    if can_override is None:
+        can_override = can_override_closed_period()
+
+    if can_override:
+        # Log the override, written after the caller's transaction commits
+        log_period_action(
+            period['name'],
+            'Transaction Modified',
+            affected_transaction=doc.get('name') or 'New Document',
+            transaction_doctype=doc.get('doctype'),
+            reason=f"Modified {doc.get('doctype')} in closed period {period['period_name']}"
+        )
         
+        # The period's GL changes, so its balance snapshots are rebuilt
+        on_closed_period_override(period['name'])
+
         # Show warning but allow transaction
         frappe.msgprint(
             _(f"Warning: Modifying transaction in closed period {period['period_name']}. "
@@ -117,6 +312,7 @@ def validate_transaction_against_closed_period(doc, method):
     )
 
 
+@instrumented
 def validate_transaction_deletion(doc, method):
     """
     Validate that transactions are not deleted in closed periods.
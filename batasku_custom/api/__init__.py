@@ -0,0 +1,76 @@
+import frappe
+
+from batasku_custom.api.purchase_invoice import create_purchase_invoice_with_details  # noqa: F401
+from batasku_custom.logger import get_logger
+
+
+@frappe.whitelist()
+def fetch_pr_detail_for_pi(pr):
+    """
+    Fetch Purchase Receipt details for Purchase Invoice creation
+    Includes received_qty and rejected_qty for each item
+    """
+    logger = get_logger("purchase_receipt")
+    logger.debug("Fetch PR detail for PI", pr=pr)
+    
+    try:
+        # Check if PR exists and belongs to selected company
+        if not frappe.db.exists("Purchase Receipt", pr):
+            return {
+                "success": False,
+                "message": f"Purchase Receipt {pr} not found"
+            }
+        
+        # Get PR details
+        pr_doc = frappe.get_doc("Purchase Receipt", pr)
+        
+        logger.debug(
+            "PR found", pr=pr_doc.name, supplier=pr_doc.supplier,
+            company=pr_doc.company, items=len(pr_doc.items)
+        )
+        
+        # Build response
+        items = []
+        for item in pr_doc.items:
+            items.append({
+                "item_code": item.item_code,
+                "item_name": item.item_name,
+                "description": item.description,
+                "qty": item.qty,
+                "received_qty": item.received_qty or 0,
+                "rejected_qty": item.rejected_qty or 0,
+                "accepted_qty": item.accepted_qty or 0,
+                "billed_qty": item.billed_qty or 0,
+                "outstanding_qty": item.outstanding_qty or 0,
+                "uom": item.uom,
+                "rate": item.rate,
+                "amount": item.amount,
+                "warehouse": item.warehouse,
+                "purchase_order": item.purchase_order,
+                "purchase_order_item": item.purchase_order_item,
+                # Use the actual field name from database
+                "purchase_receipt_item": item.name
+            })
+        
+        response = {
+            "success": True,
+            "data": {
+                "name": pr_doc.name,
+                "supplier": pr_doc.supplier,
+                "supplier_name": pr_doc.supplier_name,
+                "posting_date": pr_doc.posting_date.strftime("%Y-%m-%d"),
+                "company": pr_doc.company,
+                "currency": pr_doc.currency,
+                "items": items,
+                "custom_note_pr": pr_doc.custom_note_pr or ""
+            }
+        }
+        
+        return response
+        
+    except Exception as e:
+        frappe.log_error(f"Error fetching PR details for {pr}: {str(e)}", "PR Detail Fetch Error")
+        return {
+            "success": False,
+            "message": str(e)
+        }
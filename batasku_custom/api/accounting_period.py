@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Bulk close / reopen of Accounting Periods
+
+`bulk_update_accounting_periods` selects periods by name or by companies and
+date range and changes their status in a background job:
+
+    close               Open   → Closed
+    reopen              Closed → Open
+    permanently_close   Closed → Permanently Closed
+
+The job works on the whole selection at once instead of saving every
+Accounting Period: one locking read, the transition check in memory, one
+UPDATE for the periods, one for their Closed Document rows (missing rows are
+bulk inserted), one buffered Period Closing Log batch with compact
+before/after snapshots, and one closed period cache invalidation. Periods
+with an invalid transition are reported and left unchanged. Closed periods
+get their Account Balance Snapshot, reopened ones lose it.
+"""
+
+from __future__ import unicode_literals
+
+import frappe
+from frappe.utils import getdate, now
+
+from batasku_custom.accounting_period_restrictions import clear_closed_period_cache, sync_closed_documents
+from batasku_custom.batasku_custom.doctype.account_balance_snapshot.account_balance_snapshot import (
+    on_period_status_change
+)
+from batasku_custom.period_closing_audit import log_period_action
+
+CLOSE = "close"
+REOPEN = "reopen"
+PERMANENTLY_CLOSE = "permanently_close"
+
+# action: (statuses it applies to, new status, Period Closing Log action type)
+TRANSITIONS = {
+    CLOSE: (("Open",), "Closed", "Closed"),
+    REOPEN: (("Closed",), "Open", "Reopened"),
+    PERMANENTLY_CLOSE: (("Closed",), "Permanently Closed", "Permanently Closed")
+}
+
+MAX_PERIODS = 1000
+# Job results are kept for a day
+STATUS_TTL = 24 * 60 * 60
+STATUS_KEY = "batasku_bulk_accounting_period"
+PROGRESS_EVENT = "bulk_accounting_period_progress"
+
+
+@frappe.whitelist(methods=["POST"])
+def bulk_update_accounting_periods(action, periods=None, companies=None, from_date=None, to_date=None, reason=None):
+    """
+    Close, reopen or permanently close many Accounting Periods in a background job.
+
+    Args:
+        action: "close", "reopen" or "permanently_close"
+        periods: Optional list of Accounting Period names
+        companies: Optional list of companies; with from_date / to_date,
+            selects the periods that lie inside the date range
+        from_date, to_date: Optional date range
+        reason: Recorded in the Period Closing Log
+
+    Returns:
+        {"job_id", "periods"}; poll `get_bulk_accounting_period_status` or
+        listen to the `bulk_accounting_period_progress` realtime event
+    """
+    if action not in TRANSITIONS:
+        frappe.throw(f"Action harus salah satu dari: {', '.join(TRANSITIONS)}")
+
+    validate_role(action)
+
+    names = get_periods(frappe.parse_json(periods), frappe.parse_json(companies), from_date, to_date)
+    if not names:
+        frappe.throw("Tidak ada Accounting Period yang cocok.")
+    if len(names) > MAX_PERIODS:
+        frappe.throw(f"Maksimal {MAX_PERIODS} Accounting Period per proses.")
+
+    job_id = frappe.generate_hash(length=12)
+    set_status(job_id, {
+        "job_id": job_id,
+        "action": action,
+        "owner": frappe.session.user,
+        "status": "Queued",
+        "periods": names,
+        "updated": [],
+        "skipped": [],
+        "errors": []
+    })
+
+    frappe.enqueue(
+        "batasku_custom.api.accounting_period.process_bulk_update",
+        queue="long",
+        timeout=1800,
+        enqueue_after_commit=True,
+        # enqueue keeps job_id for itself (the RQ job id)
+        batch_id=job_id,
+        action=action,
+        periods=names,
+        reason=reason
+    )
+
+    return {"job_id": job_id, "periods": names}
+
+
+@frappe.whitelist()
+def get_bulk_accounting_period_status(job_id):
+    """Updated, skipped and failed periods of a bulk close / reopen"""
+    status = frappe.cache().get_value(get_status_key(job_id))
+    if not status:
+        frappe.throw(f"Proses {job_id} tidak ditemukan atau sudah kedaluwarsa.", frappe.DoesNotExistError)
+    if status["owner"] != frappe.session.user and "System Manager" not in frappe.get_roles():
+        frappe.throw(f"Tidak diizinkan melihat proses {job_id}.", frappe.PermissionError)
+    return status
+
+
+def process_bulk_update(batch_id, action, periods, reason=None):
+    """Background job: apply one status transition to all periods in one transaction"""
+    job_id = batch_id
+    status = frappe.cache().get_value(get_status_key(job_id))
+    if not status:
+        # Expired or evicted before the job ran: start a new entry
+        status = {
+            "job_id": job_id,
+            "action": action,
+            "owner": frappe.session.user,
+            "periods": periods,
+            "updated": [],
+            "skipped": [],
+            "errors": []
+        }
+    status["status"] = "Running"
+    set_status(job_id, status)
+
+    try:
+        result = update_period_status(periods, action, reason)
+        frappe.db.commit()
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(title="Bulk Accounting Period Error", message=f"Job {job_id}\n\n{frappe.get_traceback()}")
+        status.update({"status": "Failed", "message": str(e)})
+        set_status(job_id, status)
+        return
+
+    status.update(result)
+    status["status"] = "Completed"
+    set_status(job_id, status)
+    frappe.publish_realtime(PROGRESS_EVENT, {
+        "job_id": job_id,
+        "status": status["status"],
+        "updated": len(status["updated"]),
+        "errors": len(status["errors"])
+    }, user=status["owner"])
+
+
+def update_period_status(periods, action, reason=None):
+    """
+    Apply a status transition to many periods with set-based updates.
+
+    Returns:
+        {"updated": [names], "skipped": [names already in the new status],
+        "errors": [{"period", "message"}]}
+    """
+    from_statuses, new_status, action_type = TRANSITIONS[action]
+
+    rows = frappe.db.sql("""
+        SELECT name, status
+        FROM `tabAccounting Period`
+        WHERE name IN %(periods)s
+        FOR UPDATE
+    """, {"periods": tuple(periods)}, as_dict=True)
+    current = {row.name: row.status or "Open" for row in rows}
+
+    updated, skipped, errors = [], [], []
+    for name in periods:
+        if name not in current:
+            errors.append({"period": name, "message": "Accounting Period tidak ditemukan"})
+        elif current[name] == new_status:
+            skipped.append(name)
+        elif current[name] not in from_statuses:
+            errors.append({
+                "period": name,
+                "message": f"Status {current[name]} tidak bisa diubah menjadi {new_status}"
+            })
+        else:
+            updated.append(name)
+
+    if not updated:
+        return {"updated": updated, "skipped": skipped, "errors": errors}
+
+    set_period_status(updated, new_status)
+
+    closed = new_status != "Open"
+    add_missing_closed_documents(updated, closed)
+    sync_closed_documents(updated, closed)
+
+    for name in updated:
+        log_period_action(
+            name,
+            action_type,
+            reason=reason or f"Bulk {action}",
+            before_snapshot=frappe.as_json({"status": current[name]}),
+            after_snapshot=frappe.as_json({"status": new_status})
+        )
+
+    clear_closed_period_cache()
+    on_period_status_change(updated, new_status)
+
+    return {"updated": updated, "skipped": skipped, "errors": errors}
+
+
+def set_period_status(periods, new_status):
+    """Set status and the matching closed by / on fields of many periods"""
+    timestamp = now()
+    values = {
+        "status": new_status,
+        "user": frappe.session.user,
+        "timestamp": timestamp,
+        "periods": tuple(periods)
+    }
+
+    extra = ""
+    if new_status == "Closed":
+        extra = ", closed_by = %(user)s, closed_on = %(timestamp)s"
+    elif new_status == "Permanently Closed":
+        extra = ", permanently_closed_by = %(user)s, permanently_closed_on = %(timestamp)s"
+
+    frappe.db.sql(f"""
+        UPDATE `tabAccounting Period`
+        SET status = %(status)s,
+            modified = %(timestamp)s,
+            modified_by = %(user)s
+            {extra}
+        WHERE name IN %(periods)s
+    """, values)
+
+
+def add_missing_closed_documents(periods, closed):
+    """Bulk insert the Closed Document rows of periods that have none yet"""
+    with_rows = {row[0] for row in frappe.db.sql("""
+        SELECT DISTINCT parent
+        FROM `tabClosed Document`
+        WHERE parenttype = 'Accounting Period'
+            AND parent IN %(periods)s
+    """, {"periods": tuple(periods)})}
+    missing = [name for name in periods if name not in with_rows]
+    if not missing:
+        return
+
+    doctypes = [row.get("document_type") for row in frappe.new_doc("Accounting Period").get_doctypes_for_closing()]
+    timestamp = now()
+    user = frappe.session.user
+
+    values = []
+    for period in missing:
+        for idx, document_type in enumerate(doctypes, start=1):
+            values.append((
+                frappe.generate_hash(length=10), period, "Accounting Period", "closed_documents", idx,
+                document_type, 1 if closed else 0, timestamp, timestamp, user, user
+            ))
+
+    frappe.db.bulk_insert(
+        "Closed Document",
+        fields=[
+            "name", "parent", "parenttype", "parentfield", "idx",
+            "document_type", "closed", "creation", "modified", "owner", "modified_by"
+        ],
+        values=values
+    )
+
+
+def get_periods(periods=None, companies=None, from_date=None, to_date=None):
+    """Names of the selected periods, oldest first"""
+    if not (periods or companies or from_date or to_date):
+        frappe.throw("Pilih Accounting Period, company, atau rentang tanggal.")
+
+    filters = {}
+    if periods:
+        filters["name"] = ["in", periods]
+    if companies:
+        filters["company"] = ["in", companies]
+    if from_date:
+        filters["start_date"] = [">=", getdate(from_date)]
+    if to_date:
+        filters["end_date"] = ["<=", getdate(to_date)]
+
+    return frappe.get_all("Accounting Period", filters=filters, pluck="name", order_by="start_date asc, name asc")
+
+
+def validate_role(action):
+    """Closing role for close / permanently close, reopen role for reopen (Period Closing Config)"""
+    frappe.has_permission("Accounting Period", "write", throw=True)
+
+    fieldname = "reopen_role" if action == REOPEN else "closing_role"
+    role = frappe.db.get_single_value("Period Closing Config", fieldname) or "Accounts Manager"
+
+    roles = frappe.get_roles()
+    if role not in roles and "System Manager" not in roles:
+        frappe.throw(f"Hanya role {role} yang boleh melakukan {action}.", frappe.PermissionError)
+
+
+def get_status_key(job_id):
+    return f"{STATUS_KEY}|{job_id}"
+
+
+def set_status(job_id, status):
+    frappe.cache().set_value(get_status_key(job_id), status, expires_in_sec=STATUS_TTL)
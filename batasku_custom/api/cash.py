@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Cash in / cash out (kas masuk / kas keluar)
+
+Whitelisted replacements for the `kas_masuk_multi` and `kas_keluar_multi`
+API server scripts, routed from the bare method names through
+`override_whitelisted_methods`. Both post one compact Journal Entry with
+N + 1 rows: one line per kategori and a single consolidated cash line.
+
+`import_cash_book` imports a CSV/XLSX cash book attached as a File. A
+background job reads the rows in chunks, groups each chunk by (posting date,
+cash account), posts one Journal Entry per group and commits per chunk.
+Rows that fail validation or posting are reported with their row number in
+`get_cash_import_status`.
+
+Expected columns (Indonesian or English headers):
+
+    tanggal / posting_date, akun_kas / cash_account (optional when given
+    as a parameter), kategori / account, nominal / amount,
+    keterangan / remarks
+"""
+
+from __future__ import unicode_literals
+import csv
+import os
+from itertools import islice
+
+import frappe
+from frappe.utils import cint, flt, getdate
+
+from batasku_custom.logger import get_logger
+
+KAS_MASUK = "masuk"
+KAS_KELUAR = "keluar"
+
+IMPORT_CHUNK_SIZE = 500
+# Import results are kept for a day
+IMPORT_STATUS_TTL = 24 * 60 * 60
+IMPORT_STATUS_KEY = "batasku_cash_import"
+IMPORT_PROGRESS_EVENT = "cash_import_progress"
+
+COLUMN_ALIASES = {
+    "tanggal": "posting_date",
+    "posting_date": "posting_date",
+    "akun_kas": "cash_account",
+    "cash_account": "cash_account",
+    "kategori": "kategori",
+    "account": "kategori",
+    "nominal": "nominal",
+    "amount": "nominal",
+    "keterangan": "keterangan",
+    "remarks": "keterangan"
+}
+
+
+@frappe.whitelist()
+def kas_masuk_multi(payload):
+    """
+    Kas masuk: Dr kas (satu baris) / Cr kategori per item.
+
+    Args:
+        payload: {posting_date, cash_account, items: [{keterangan, nominal, kategori}]}
+    """
+    return post_cash_payload(KAS_MASUK, payload)
+
+
+@frappe.whitelist()
+def kas_keluar_multi(payload):
+    """
+    Kas keluar: Dr kategori per item / Cr kas (satu baris).
+
+    Args:
+        payload: {posting_date, cash_account, items: [{keterangan, nominal, kategori}]}
+    """
+    return post_cash_payload(KAS_KELUAR, payload)
+
+
+def post_cash_payload(direction, payload):
+    frappe.has_permission("Journal Entry", "create", throw=True)
+    payload = frappe.parse_json(payload)
+
+    je = make_cash_journal_entry(direction, payload["posting_date"], payload["cash_account"], payload["items"])
+
+    # kembalikan response ke frontend
+    return {
+        "status": "success",
+        "journal_entry": je.name
+    }
+
+
+def make_cash_journal_entry(direction, posting_date, cash_account, items, company=None):
+    """
+    Insert and submit a cash Journal Entry with N + 1 account rows.
+
+    Args:
+        direction: KAS_MASUK or KAS_KELUAR
+        posting_date: Posting date
+        cash_account: Cash / bank account, one consolidated line
+        items: [{kategori, nominal, keterangan}], one line each
+        company: Defaults to the cash account's company
+    """
+    cash_side, item_side = ("debit", "credit") if direction == KAS_MASUK else ("credit", "debit")
+
+    je = frappe.get_doc({
+        "doctype": "Journal Entry",
+        "company": company or frappe.get_cached_value("Account", cash_account, "company"),
+        "posting_date": posting_date,
+        "voucher_type": "Bank Entry",
+        "accounts": []
+    })
+
+    total = 0
+    for item in items:
+        je.append("accounts", {
+            "account": item["kategori"],  # kategori harus sesuai akun ERPNext
+            f"{item_side}_in_account_currency": flt(item["nominal"]),
+            "user_remark": item.get("keterangan")
+        })
+        total += flt(item["nominal"])
+
+    je.append("accounts", {
+        "account": cash_account,
+        f"{cash_side}_in_account_currency": total,
+        "user_remark": "Kas masuk" if direction == KAS_MASUK else "Kas keluar"
+    })
+
+    je.insert()
+    je.submit()
+
+    return je
+
+
+@frappe.whitelist()
+def import_cash_book(file_url, direction=KAS_KELUAR, cash_account=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Import a CSV/XLSX cash book in a background job.
+
+    Args:
+        file_url: URL of the uploaded File
+        direction: "masuk" or "keluar"
+        cash_account: Cash account for rows without an akun_kas column
+        chunk_size: Rows per chunk (one commit per chunk)
+
+    Returns:
+        {"import_id": ...}; poll `get_cash_import_status` or listen to the
+        `cash_import_progress` realtime event
+    """
+    frappe.has_permission("Journal Entry", "create", throw=True)
+
+    if direction not in (KAS_MASUK, KAS_KELUAR):
+        frappe.throw(f"direction harus '{KAS_MASUK}' atau '{KAS_KELUAR}'")
+
+    file_doc = frappe.get_doc("File", {"file_url": file_url})
+    if get_file_extension(file_doc) not in ("csv", "xlsx"):
+        frappe.throw("Format file harus CSV atau XLSX")
+
+    import_id = frappe.generate_hash(length=12)
+    set_import_status(import_id, {
+        "import_id": import_id,
+        "owner": frappe.session.user,
+        "file_url": file_url,
+        "status": "Queued",
+        "rows": 0,
+        "journal_entries": [],
+        "errors": []
+    })
+
+    frappe.enqueue(
+        "batasku_custom.api.cash.process_cash_import",
+        queue="long",
+        timeout=3600,
+        enqueue_after_commit=True,
+        import_id=import_id,
+        file_name=file_doc.name,
+        direction=direction,
+        cash_account=cash_account,
+        chunk_size=max(cint(chunk_size), 1)
+    )
+
+    return {"import_id": import_id}
+
+
+@frappe.whitelist()
+def get_cash_import_status(import_id):
+    """Progress, created Journal Entries and per-row errors of a cash import"""
+    status = frappe.cache().get_value(get_import_status_key(import_id))
+    if not status:
+        frappe.throw(f"Import {import_id} tidak ditemukan atau sudah kedaluwarsa.", frappe.DoesNotExistError)
+    if status["owner"] != frappe.session.user and "System Manager" not in frappe.get_roles():
+        frappe.throw(f"Tidak diizinkan melihat import {import_id}.", frappe.PermissionError)
+    return status
+
+
+def process_cash_import(import_id, file_name, direction, cash_account=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Background job: stream the file and post it chunk by chunk.
+
+    Each chunk is validated (one Account query), grouped by (posting date,
+    cash account) and posted as one Journal Entry per group; the chunk is
+    committed before the next one is read.
+    """
+    logger = get_logger("cash")
+    status = frappe.cache().get_value(get_import_status_key(import_id))
+    status["status"] = "Running"
+
+    try:
+        file_doc = frappe.get_doc("File", file_name)
+        rows = iter_cash_book_rows(file_doc)
+
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            journal_entries, errors = post_cash_chunk(chunk, direction, cash_account)
+            frappe.db.commit()
+
+            status["rows"] += len(chunk)
+            status["journal_entries"] += journal_entries
+            status["errors"] += errors
+            set_import_status(import_id, status)
+            frappe.publish_realtime(IMPORT_PROGRESS_EVENT, {
+                "import_id": import_id,
+                "rows": status["rows"],
+                "journal_entries": len(status["journal_entries"]),
+                "errors": len(status["errors"])
+            }, user=frappe.session.user)
+            logger.info("Cash import %s: %s rows, %s errors", import_id, status["rows"], len(status["errors"]))
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(title="Cash Import Error", message=f"Import {import_id}\n\n{frappe.get_traceback()}")
+        status.update({"status": "Failed", "message": str(e)})
+        set_import_status(import_id, status)
+        return
+
+    status["status"] = "Completed"
+    set_import_status(import_id, status)
+
+
+def post_cash_chunk(chunk, direction, default_cash_account=None):
+    """
+    Validate and post one chunk of (row number, row) pairs.
+
+    Returns:
+        (journal entry names, [{"row", "message"}])
+    """
+    errors = []
+    groups = {}
+
+    accounts = get_accounts({
+        value for _, row in chunk
+        for value in (row.get("kategori"), row.get("cash_account") or default_cash_account) if value
+    })
+
+    for row_no, row in chunk:
+        message, item = validate_cash_row(row, default_cash_account, accounts)
+        if message:
+            errors.append({"row": row_no, "message": message})
+            continue
+
+        key = (item["posting_date"], item["cash_account"])
+        groups.setdefault(key, []).append((row_no, item))
+
+    journal_entries = []
+    for (posting_date, cash_account), group in groups.items():
+        frappe.db.savepoint("cash_import_group")
+        try:
+            je = make_cash_journal_entry(
+                direction, posting_date, cash_account, [item for _, item in group],
+                company=accounts[cash_account].company
+            )
+            journal_entries.append(je.name)
+        except Exception as e:
+            frappe.db.rollback(save_point="cash_import_group")
+            errors += [{"row": row_no, "message": str(e)} for row_no, _ in group]
+        finally:
+            frappe.clear_messages()
+
+    return journal_entries, errors
+
+
+def validate_cash_row(row, default_cash_account, accounts):
+    """Return (error message, None) or (None, normalised item)"""
+    cash_account = row.get("cash_account") or default_cash_account
+    if not cash_account:
+        return "Akun kas wajib diisi", None
+    if not row.get("kategori"):
+        return "Kategori wajib diisi", None
+
+    for account in (cash_account, row["kategori"]):
+        if account not in accounts:
+            return f"Akun tidak ditemukan: {account}", None
+        if accounts[account].disabled or accounts[account].is_group:
+            return f"Akun {account} tidak bisa dipakai (nonaktif atau grup)", None
+
+    if accounts[row["kategori"]].company != accounts[cash_account].company:
+        return f"Akun {row['kategori']} dan {cash_account} berbeda company", None
+
+    try:
+        posting_date = getdate(row.get("posting_date"))
+    except Exception:
+        return f"Tanggal tidak valid: {row.get('posting_date')}", None
+    if not posting_date:
+        return "Tanggal wajib diisi", None
+
+    nominal = flt(row.get("nominal"))
+    if nominal <= 0:
+        return f"Nominal harus lebih dari 0: {row.get('nominal')}", None
+
+    return None, {
+        "posting_date": posting_date,
+        "cash_account": cash_account,
+        "kategori": row["kategori"],
+        "nominal": nominal,
+        "keterangan": row.get("keterangan")
+    }
+
+
+def get_accounts(names):
+    """Return {account name: row} with company, disabled and is_group"""
+    if not names:
+        return {}
+
+    rows = frappe.db.sql("""
+        SELECT name, company, disabled, is_group
+        FROM `tabAccount`
+        WHERE name IN %(names)s
+    """, {"names": tuple(names)}, as_dict=True)
+
+    return {row.name: row for row in rows}
+
+
+def iter_cash_book_rows(file_doc):
+    """Yield (row number, row dict) from a CSV or XLSX File, one row at a time"""
+    path = file_doc.get_full_path()
+
+    if get_file_extension(file_doc) == "csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            header = normalise_header(next(reader, []))
+            for row_no, values in enumerate(reader, start=2):
+                if any(values):
+                    yield row_no, dict(zip(header, values))
+    else:
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = normalise_header(next(rows, ()))
+            for row_no, values in enumerate(rows, start=2):
+                if any(value not in (None, "") for value in values):
+                    yield row_no, dict(zip(header, values))
+        finally:
+            workbook.close()
+
+
+def normalise_header(header):
+    columns = []
+    for column in header:
+        column = str(column or "").strip().lower().replace(" ", "_")
+        columns.append(COLUMN_ALIASES.get(column, column))
+    return columns
+
+
+def get_file_extension(file_doc):
+    return os.path.splitext(file_doc.file_name or file_doc.file_url or "")[1].lower().lstrip(".")
+
+
+def get_import_status_key(import_id):
+    return f"{IMPORT_STATUS_KEY}|{import_id}"
+
+
+def set_import_status(import_id, status):
+    frappe.cache().set_value(get_import_status_key(import_id), status, expires_in_sec=IMPORT_STATUS_TTL)
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Commission preview
+
+Whitelisted replacement for the `preview_sales_invoice_commission` API
+server script, routed from the bare method name through
+`override_whitelisted_methods`. The response keys are set on
+`frappe.response` directly, like the script did.
+
+`preview_delivery_note_commissions` previews many Delivery Notes at once for
+the Sales Invoice screen. Only the needed columns are read, with one grouped
+query each for items, sales teams and sales person rates. Previews are
+cached per Delivery Note together with its `modified` timestamp, so a
+repeated preview is served from Redis until the Delivery Note changes.
+Sales Person and Customer changes (default rate, sales team) do not touch
+the Delivery Note, so they clear the whole cache (see doc_events in
+hooks.py). The cache also expires a day after it was started, which bounds
+its size.
+"""
+
+from __future__ import unicode_literals
+import pickle
+
+import frappe
+from frappe.utils import flt
+
+from batasku_custom.instrumentation import instrumented
+
+PREVIEW_CACHE_KEY = "batasku_dn_commission_preview"
+PREVIEW_CACHE_TTL = 24 * 60 * 60
+MAX_PREVIEW_DELIVERY_NOTES = 500
+
+
+@frappe.whitelist()
+def preview_sales_invoice_commission(delivery_note=None):
+    """
+    Commission per item of a Delivery Note: margin × qty × commission rate.
+
+    The rate is the Delivery Note snapshot (custom_persentase_komisi_dn),
+    else the default rate of the first sales person of the Delivery Note or
+    of its customer.
+
+    Args:
+        delivery_note: Delivery Note name
+    """
+    if not delivery_note:
+        frappe.throw("delivery_note is required")
+
+    previews = get_commission_previews([delivery_note])
+    if delivery_note not in previews:
+        frappe.throw(f"Delivery Note {delivery_note} not found", frappe.DoesNotExistError)
+
+    frappe.response.update(previews[delivery_note])
+
+
+@frappe.whitelist()
+def preview_delivery_note_commissions(delivery_notes=None):
+    """
+    Commission previews of many Delivery Notes.
+
+    Args:
+        delivery_notes: List of Delivery Note names
+
+    Returns:
+        {"success", "data": {delivery note: {preview_available,
+        commission_rate, items, total_commission}}, "not_found": [names]}
+    """
+    delivery_notes = list(dict.fromkeys(frappe.parse_json(delivery_notes) or []))
+    if not delivery_notes:
+        frappe.throw("delivery_notes is required")
+    if len(delivery_notes) > MAX_PREVIEW_DELIVERY_NOTES:
+        frappe.throw(f"Maksimal {MAX_PREVIEW_DELIVERY_NOTES} Delivery Note per preview.")
+
+    previews = get_commission_previews(delivery_notes)
+    return {
+        "success": True,
+        "data": previews,
+        "not_found": [name for name in delivery_notes if name not in previews]
+    }
+
+
+def get_commission_previews(delivery_notes):
+    """
+    Return {delivery note: preview} for the Delivery Notes the user can read.
+
+    Cached previews are used when the Delivery Note was not modified since;
+    the others are computed together and cached.
+    """
+    frappe.has_permission("Delivery Note", "read", throw=True)
+
+    # get_list applies user permissions; one projection for all headers
+    headers = frappe.get_list(
+        "Delivery Note",
+        filters={"name": ["in", delivery_notes]},
+        fields=["name", "modified", "customer", "custom_persentase_komisi_dn"],
+        limit_page_length=0
+    )
+
+    cached = get_cached_previews([dn.name for dn in headers])
+    previews = {}
+    pending = []
+    for dn in headers:
+        entry = cached.get(dn.name)
+        if entry and entry["modified"] == str(dn.modified):
+            previews[dn.name] = entry["preview"]
+        else:
+            pending.append(dn)
+
+    if pending:
+        computed = dict(zip((dn.name for dn in pending), compute_commission_previews(pending)))
+        previews.update(computed)
+        set_cached_previews({
+            dn.name: {"modified": str(dn.modified), "preview": computed[dn.name]}
+            for dn in pending
+        })
+
+    return previews
+
+
+def get_cached_previews(names):
+    """Return {delivery note: {"modified", "preview"}} of the cached entries, in one round trip"""
+    if not names:
+        return {}
+
+    # Raw redis commands: one HMGET instead of frappe's per-field hget
+    pipe = frappe.cache().pipeline(transaction=False)
+    pipe.hmget(get_preview_cache_key(), names)
+    values = pipe.execute()[0] or []
+    return {name: pickle.loads(value) for name, value in zip(names, values) if value}
+
+
+def set_cached_previews(entries):
+    """Store preview entries; a new cache expires PREVIEW_CACHE_TTL after it was started"""
+    key = get_preview_cache_key()
+    pipe = frappe.cache().pipeline(transaction=False)
+    pipe.hset(key, mapping={name: pickle.dumps(entry) for name, entry in entries.items()})
+    pipe.ttl(key)
+    ttl = pipe.execute()[-1]
+
+    # Only a new cache gets an expiry, so busy sites still drop it daily
+    if ttl is not None and ttl < 0:
+        frappe.cache().expire(key, PREVIEW_CACHE_TTL)
+
+
+def get_preview_cache_key():
+    return frappe.cache().make_key(PREVIEW_CACHE_KEY)
+
+
+@instrumented
+def clear_commission_preview_cache(doc=None, method=None):
+    """Sales Person / Customer doc event: forget all cached previews"""
+    _reset_commission_preview_cache()
+    frappe.db.after_commit.add(_reset_commission_preview_cache)
+
+
+def _reset_commission_preview_cache():
+    frappe.cache().delete_value(PREVIEW_CACHE_KEY)
+
+
+def compute_commission_previews(headers):
+    """Previews of Delivery Note header rows, in the same order"""
+    names = [dn.name for dn in headers]
+
+    items = {}
+    for row in frappe.db.sql("""
+        SELECT parent, item_code, qty, margin_rate_or_amount
+        FROM `tabDelivery Note Item`
+        WHERE parenttype = 'Delivery Note' AND parent IN %(names)s
+        ORDER BY parent, idx
+    """, {"names": tuple(names)}, as_dict=True):
+        items.setdefault(row.parent, []).append(row)
+
+    rates = get_commission_rates(headers)
+
+    previews = []
+    for dn in headers:
+        commission_rate = rates.get(dn.name, 0.0) / 100
+
+        rows = []
+        total_commission = 0.0
+        for row in items.get(dn.name, []):
+            margin = flt(row.margin_rate_or_amount)
+            qty = flt(row.qty)
+            commission = margin * qty * commission_rate
+
+            rows.append({
+                "item_code": row.item_code,
+                "qty": qty,
+                "margin": margin,
+                "commission": commission
+            })
+            total_commission += commission
+
+        previews.append({
+            "preview_available": True,
+            "commission_rate": commission_rate * 100,  # tampilkan %
+            "items": rows,
+            "total_commission": total_commission
+        })
+
+    return previews
+
+
+def get_commission_rates(headers):
+    """
+    Return {delivery note: commission rate in percent}.
+
+    The Delivery Note snapshot wins; otherwise the default rate of the first
+    sales person of the Delivery Note, else of its customer.
+    """
+    rates = {}
+    fallback = []
+    for dn in headers:
+        if flt(dn.custom_persentase_komisi_dn):
+            rates[dn.name] = flt(dn.custom_persentase_komisi_dn)
+        else:
+            fallback.append(dn)
+
+    if not fallback:
+        return rates
+
+    # First sales person of each Delivery Note and customer, in one query
+    first_sales_person = {}
+    for row in frappe.db.sql("""
+        SELECT parenttype, parent, sales_person
+        FROM `tabSales Team`
+        WHERE (parenttype = 'Delivery Note' AND parent IN %(delivery_notes)s)
+            OR (parenttype = 'Customer' AND parent IN %(customers)s)
+        ORDER BY parenttype, parent, idx
+    """, {
+        "delivery_notes": tuple(dn.name for dn in fallback),
+        "customers": tuple({dn.customer for dn in fallback if dn.customer}) or ("",)
+    }, as_dict=True):
+        first_sales_person.setdefault((row.parenttype, row.parent), row.sales_person)
+
+    sales_persons = {}
+    for dn in fallback:
+        sales_person = first_sales_person.get(("Delivery Note", dn.name))
+        if not sales_person and dn.customer:
+            sales_person = first_sales_person.get(("Customer", dn.customer))
+        if sales_person:
+            sales_persons[dn.name] = sales_person
+
+    default_rates = {}
+    if sales_persons:
+        default_rates = dict(frappe.db.sql("""
+            SELECT name, custom_default_commission_rate
+            FROM `tabSales Person`
+            WHERE name IN %(names)s
+        """, {"names": tuple(set(sales_persons.values()))}))
+
+    for dn in fallback:
+        rates[dn.name] = flt(default_rates.get(sales_persons.get(dn.name)))
+
+    return rates
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Sales commission payment
+
+Whitelisted replacements for the `get_paid_sales_invoices` and
+`pay_sales_commission` API server scripts, routed from the bare method names
+through `override_whitelisted_methods`.
+
+All invoices of a payment are validated with two queries (invoice
+projection, prior commission payments in the Auto Journal Registry) and the
+commission account is resolved once. Up to PAYMENT_JOB_THRESHOLD invoices
+are paid with one Journal Entry in the request, as before. Larger payments are split into
+Journal Entries of PAYMENT_CHUNK_SIZE invoices, posted by a background job
+that commits each Journal Entry on its own.
+"""
+
+from __future__ import unicode_literals
+import frappe
+from frappe.utils import flt, today
+
+from batasku_custom.batasku_custom.doctype.auto_journal_registry.auto_journal_registry import (
+    COMMISSION_PAYMENT,
+    claim_sources,
+    get_registered_sources,
+    set_journal_entry
+)
+from batasku_custom.commission_accounts import get_commission_accounts
+
+PAYMENT_JOB_THRESHOLD = 200
+PAYMENT_CHUNK_SIZE = 200
+PAYMENT_REMARK = "PEMBAYARAN KOMISI SALES MULTI-INVOICE"
+PAYMENT_PROGRESS_EVENT = "sales_commission_payment_progress"
+
+
+@frappe.whitelist()
+def get_paid_sales_invoices(company=None, sales_person=None):
+    """
+    Fully paid, submitted Sales Invoices of a sales person whose commission
+    is not paid yet, newest first.
+
+    Args:
+        company: Company of the invoices
+        sales_person: Sales person in the invoice's Sales Team
+    """
+    if not company:
+        frappe.throw("Company is required")
+    if not sales_person:
+        frappe.throw("Sales Person is required")
+
+    frappe.has_permission("Sales Invoice", "read", throw=True)
+
+    return frappe.db.sql("""
+        SELECT
+            si.name,
+            si.posting_date,
+            si.customer,
+            si.grand_total,
+            si.custom_total_komisi_sales
+        FROM `tabSales Invoice` si
+        INNER JOIN `tabSales Team` st
+            ON st.parent = si.name
+            AND st.parenttype = 'Sales Invoice'
+        WHERE
+            si.company = %s
+            AND st.sales_person = %s
+            AND si.docstatus = 1
+            AND si.outstanding_amount = 0
+            AND IFNULL(si.custom_commission_paid, 0) = 0
+        ORDER BY si.posting_date DESC
+    """, (company, sales_person), as_dict=True)
+
+
+@frappe.whitelist()
+def pay_sales_commission(invoices=None, payment_account=None, company=None, posting_date=None):
+    """
+    Pay sales commission for many Sales Invoices.
+
+    Args:
+        invoices: list of {"sales_invoice": name, "commission_amount": amount}
+        payment_account: Cash / Bank account credited
+        company: Company of the invoices
+        posting_date: Defaults to today
+
+    Returns:
+        {"success", "journal_entry", "total_commission", "invoice_count"} when
+        paid in the request, or {"success", "queued", "journal_entry_count",
+        "total_commission", "invoice_count"} when posted by a background job
+    """
+    frappe.has_permission("Journal Entry", "create", throw=True)
+
+    invoices = frappe.parse_json(invoices)
+    posting_date = posting_date or today()
+
+    # Validasi wajib
+    for param_name, param_value in [
+        ("invoices", invoices),
+        ("payment_account", payment_account),
+        ("company", company),
+    ]:
+        if not param_value:
+            frappe.throw(f"Parameter {param_name} wajib dikirim")
+
+    if not isinstance(invoices, list) or len(invoices) == 0:
+        frappe.throw("Parameter invoices harus list tidak kosong")
+
+    validate_payment_account(payment_account)
+    commission_account = get_commission_expense_account(company)
+    invoices = validate_invoices(invoices, company)
+    total_commission = sum(inv["commission_amount"] for inv in invoices)
+
+    if len(invoices) <= PAYMENT_JOB_THRESHOLD:
+        je = make_payment_entry(invoices, company, payment_account, commission_account, posting_date)
+        return {
+            "success": True,
+            "journal_entry": je.name,
+            "total_commission": total_commission,
+            "invoice_count": len(invoices)
+        }
+
+    chunks = [invoices[i:i + PAYMENT_CHUNK_SIZE] for i in range(0, len(invoices), PAYMENT_CHUNK_SIZE)]
+    frappe.enqueue(
+        "batasku_custom.api.commission_payment.make_payment_entries",
+        queue="long",
+        timeout=3600,
+        enqueue_after_commit=True,
+        chunks=chunks,
+        company=company,
+        payment_account=payment_account,
+        posting_date=posting_date
+    )
+
+    return {
+        "success": True,
+        "queued": True,
+        "journal_entry_count": len(chunks),
+        "total_commission": total_commission,
+        "invoice_count": len(invoices)
+    }
+
+
+def make_payment_entries(chunks, company, payment_account, posting_date):
+    """
+    Background job: post one Journal Entry per chunk of invoices.
+
+    Each chunk is validated again (an invoice may have been paid since the
+    request) and committed on its own; a failed chunk is rolled back and
+    logged without stopping the others.
+    """
+    commission_account = get_commission_expense_account(company)
+    journal_entries = []
+    failed = []
+
+    for chunk in chunks:
+        try:
+            chunk = validate_invoices(chunk, company)
+            je = make_payment_entry(chunk, company, payment_account, commission_account, posting_date)
+            frappe.db.commit()
+            journal_entries.append(je.name)
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(title="Sales Commission Payment Error", message=frappe.get_traceback())
+            failed.append({
+                "invoices": [inv["sales_invoice"] for inv in chunk],
+                "message": str(e)
+            })
+        finally:
+            frappe.clear_messages()
+
+        frappe.publish_realtime(PAYMENT_PROGRESS_EVENT, {
+            "journal_entries": journal_entries,
+            "failed": failed,
+            "done": len(journal_entries) + len(failed),
+            "total": len(chunks)
+        }, user=frappe.session.user)
+
+
+def make_payment_entry(invoices, company, payment_account, commission_account, posting_date):
+    """Dr commission expense per invoice / Cr cash-bank; marks the invoices paid"""
+    names = [inv["sales_invoice"] for inv in invoices]
+    claim_sources("Sales Invoice", names, COMMISSION_PAYMENT, company=company)
+
+    je = frappe.new_doc("Journal Entry")
+    je.voucher_type = "Bank Entry"
+    je.company = company
+    je.posting_date = posting_date
+    je.user_remark = PAYMENT_REMARK
+
+    total_credit = 0.0
+    for inv in invoices:
+        # Debit akun komisi
+        je.append("accounts", {
+            "account": commission_account,
+            "debit_in_account_currency": inv["commission_amount"],
+            "reference_name": inv["sales_invoice"]
+        })
+        total_credit += inv["commission_amount"]
+
+    # Kredit total ke kas/bank
+    je.append("accounts", {
+        "account": payment_account,
+        "credit_in_account_currency": total_credit
+    })
+
+    # Insert & submit
+    je.insert(ignore_permissions=True)
+    je.submit()
+    set_journal_entry("Sales Invoice", names, COMMISSION_PAYMENT, je.name)
+
+    frappe.db.sql("""
+        UPDATE `tabSales Invoice`
+        SET custom_commission_paid = 1
+        WHERE name IN %(names)s
+    """, {"names": tuple(names)})
+
+    return je
+
+
+def validate_payment_account(payment_account):
+    payment_acc = frappe.db.get_value("Account", payment_account, ["account_type", "root_type", "disabled"], as_dict=True)
+    if not payment_acc:
+        frappe.throw(f"Akun Pembayaran tidak ditemukan: {payment_account}")
+    if payment_acc.disabled:
+        frappe.throw(f"Akun Pembayaran {payment_account} dinonaktifkan")
+    if payment_acc.root_type != "Asset":
+        frappe.throw(f"Akun Pembayaran harus Asset (Kas/Bank). Saat ini: {payment_account}")
+
+
+def get_commission_expense_account(company):
+    commission_account = get_commission_accounts(company)["expense_account"]
+    if not commission_account:
+        frappe.throw("Tidak ada akun Komisi Expense untuk company ini")
+    return commission_account
+
+
+def validate_invoices(invoices, company):
+    """
+    Validate all invoices of a payment with two queries.
+
+    Returns:
+        The invoices as {"sales_invoice", "commission_amount"} dicts
+    """
+    rows = []
+    seen = set()
+    for inv in invoices:
+        si_name = inv.get("sales_invoice")
+        commission_amount = flt(inv.get("commission_amount", 0.0))
+        if not si_name or commission_amount <= 0:
+            frappe.throw("Setiap invoice harus memiliki sales_invoice dan commission_amount > 0")
+        if si_name in seen:
+            frappe.throw(f"Sales Invoice {si_name} dikirim lebih dari sekali")
+        seen.add(si_name)
+        rows.append({"sales_invoice": si_name, "commission_amount": commission_amount})
+
+    names = tuple({row["sales_invoice"] for row in rows})
+    sales_invoices = {
+        si.name: si for si in frappe.db.sql("""
+            SELECT name, company, docstatus, outstanding_amount
+            FROM `tabSales Invoice`
+            WHERE name IN %(names)s
+        """, {"names": names}, as_dict=True)
+    }
+    paid = get_registered_sources("Sales Invoice", names, COMMISSION_PAYMENT)
+
+    for row in rows:
+        si_name = row["sales_invoice"]
+        si = sales_invoices.get(si_name)
+        if not si:
+            frappe.throw(f"Sales Invoice {si_name} tidak ditemukan", frappe.DoesNotExistError)
+        if si.company != company:
+            frappe.throw(f"Company mismatch untuk {si_name}")
+        if si.docstatus != 1:
+            frappe.throw(f"Sales Invoice {si_name} harus Submitted")
+        if si.outstanding_amount > 0:
+            frappe.throw(f"Sales Invoice {si_name} belum lunas, komisi tidak bisa dibayarkan")
+        if si_name in paid:
+            frappe.throw(f"Komisi sales untuk invoice {si_name} sudah dibayarkan sebelumnya")
+
+    return rows
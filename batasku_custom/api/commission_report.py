@@ -0,0 +1,538 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Sales Commission Report (Support Credit Note)
+
+Whitelisted replacement for the `get_profit_commission_report_dual` API
+server script. The response format is unchanged; the bare method name is
+routed here through `override_whitelisted_methods` in hooks.py.
+
+Besides the full JSON report, `get_profit_commission_report_page` returns
+`by_item` in keyset-paginated pages, `get_profit_commission_report_summary`
+returns the totals only, and `download_profit_commission_report` streams the
+rows as CSV or NDJSON.
+
+Rows are read from the Sales Commission Fact table where available. For
+invoices without facts, every dependent table (Sales Team, Delivery Note
+Item, Bin, Item Price) is prefetched with one query and looked up from dicts
+while the items are accumulated in a single pass.
+"""
+
+from __future__ import unicode_literals
+import calendar
+import csv
+import heapq
+import io
+import json
+import tempfile
+from itertools import islice
+
+import frappe
+from frappe.utils import cint, getdate
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+
+from batasku_custom.commission import compute_item_row, row_from_fact
+from batasku_custom.hpp import resolve_hpp
+
+DEFAULT_PAGE_LENGTH = 500
+MAX_PAGE_LENGTH = 5000
+# Rows fetched per round of queries when streaming the report
+REPORT_CHUNK_SIZE = 2000
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson"
+}
+
+BY_ITEM_FIELDS = (
+    "invoice",
+    "is_return",
+    "return_against",
+    "document_type",
+    "customer",
+    "customer_name",
+    "sales_person",
+    "item_code",
+    "item_name",
+    "qty",
+    "rate",
+    "price_list_rate",
+    "hpp_rate",
+    "financial_cost_percent",
+    "sales",
+    "hpp_base",
+    "financial_cost",
+    "hpp_total",
+    "gross_profit_before_overhead",
+    "gross_profit",
+    "base_profit",
+    "margin_zone",
+    "commission",
+    "company_margin",
+    "company_profit"
+)
+
+TOTAL_FIELDS = (
+    "sales",
+    "hpp_base",
+    "financial_cost",
+    "hpp_total",
+    "gross_profit_before_overhead",
+    "gross_profit",
+    "base_profit",
+    "commission",
+    "company_margin",
+    "profit"
+)
+
+
+@frappe.whitelist()
+def get_profit_commission_report_dual(from_date=None, to_date=None, company=None, sales_person=None,
+                                      customer=None, mode=None, include_hpp=None):
+    """
+    Profit and commission report per item, invoice, customer and sales person.
+
+    Args:
+        from_date, to_date: Posting date range (to_date is clamped to the end of its month)
+        company, customer, sales_person: Optional filters
+        mode: "valuation" (default) or "margin"
+        include_hpp: In margin mode, also compute HPP based profit
+    """
+    filters = get_report_filters(from_date, to_date, company, sales_person, customer, mode, include_hpp)
+    result = new_report_result(filters)
+
+    invoice_keys = {"by_customer": {}, "by_sales": {}}
+    for row in iter_report_rows(filters):
+        add_row_to_result(result, row, invoice_keys)
+
+    return result
+
+
+@frappe.whitelist()
+def get_profit_commission_report_page(from_date=None, to_date=None, company=None, sales_person=None,
+                                      customer=None, mode=None, include_hpp=None, after=None,
+                                      page_length=DEFAULT_PAGE_LENGTH):
+    """
+    One keyset-paginated page of `by_item` rows.
+
+    Pass the returned `next_cursor` as `after` to fetch the next page; it is
+    None on the last page. Totals come from
+    `get_profit_commission_report_summary`.
+    """
+    filters = get_report_filters(from_date, to_date, company, sales_person, customer, mode, include_hpp)
+    page_length = min(max(cint(page_length), 1), MAX_PAGE_LENGTH)
+
+    rows = list(iter_keyed_rows(filters, decode_cursor(after), limit=page_length, chunk_size=page_length))
+
+    return {
+        "params": new_report_result(filters)["params"],
+        "by_item": [row for _key, row in rows],
+        "next_cursor": encode_cursor(rows[-1][0]) if len(rows) == page_length else None
+    }
+
+
+@frappe.whitelist()
+def get_profit_commission_report_summary(from_date=None, to_date=None, company=None, sales_person=None,
+                                         customer=None, mode=None, include_hpp=None, include_invoices=0):
+    """
+    Report totals without `by_item`.
+
+    Rows are streamed in chunks and only the groupings are kept in memory.
+    `by_invoice` is included only when include_invoices is set.
+    """
+    filters = get_report_filters(from_date, to_date, company, sales_person, customer, mode, include_hpp)
+    result = new_report_result(filters)
+    del result["by_item"]
+    if not cint(include_invoices):
+        del result["by_invoice"]
+
+    invoice_keys = {"by_customer": {}, "by_sales": {}}
+    for row in iter_report_rows(filters, chunk_size=REPORT_CHUNK_SIZE):
+        add_row_to_result(result, row, invoice_keys)
+
+    return result
+
+
+@frappe.whitelist()
+def download_profit_commission_report(from_date=None, to_date=None, company=None, sales_person=None,
+                                      customer=None, mode=None, include_hpp=None, export_format="csv"):
+    """
+    Download `by_item` rows as CSV or NDJSON.
+
+    Rows are written to a spooled temporary file chunk by chunk as they are
+    computed, so the full result is never held in memory; large exports
+    spill to disk and are streamed back from there.
+    """
+    if export_format not in EXPORT_FORMATS:
+        frappe.throw("export_format harus csv atau ndjson")
+
+    filters = get_report_filters(from_date, to_date, company, sales_person, customer, mode, include_hpp)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    stream = io.TextIOWrapper(spool, encoding="utf-8", newline="", write_through=True)
+
+    if export_format == "csv":
+        writer = csv.DictWriter(stream, fieldnames=BY_ITEM_FIELDS)
+        writer.writeheader()
+        for row in iter_report_rows(filters, chunk_size=REPORT_CHUNK_SIZE):
+            writer.writerow(row)
+    else:
+        for row in iter_report_rows(filters, chunk_size=REPORT_CHUNK_SIZE):
+            stream.write(json.dumps(row, default=str))
+            stream.write("\n")
+
+    stream.detach()
+    spool.seek(0)
+
+    filename = "profit_commission_{0}_{1}.{2}".format(filters.from_date, filters.to_date, export_format)
+    response = Response(
+        wrap_file(frappe.local.request.environ, spool),
+        mimetype=EXPORT_FORMATS[export_format],
+        direct_passthrough=True
+    )
+    response.headers["Content-Disposition"] = 'attachment; filename="{0}"'.format(filename)
+    return response
+
+
+def get_report_filters(from_date=None, to_date=None, company=None, sales_person=None,
+                       customer=None, mode=None, include_hpp=None):
+    """Normalize request parameters the same way the server script did"""
+    return frappe._dict({
+        "from_date": from_date,
+        "to_date": clamp_to_date(to_date),
+        "company": company,
+        "sales_person": sales_person,
+        "customer": customer,
+        "mode": mode or "valuation",
+        "include_hpp": include_hpp in [1, "1", True, "true"]
+    })
+
+
+def clamp_to_date(date_str):
+    """Clamp a YYYY-MM-DD string to the last valid day of its month"""
+    if not date_str:
+        return date_str
+    parts = str(date_str).split("-")
+    if len(parts) != 3:
+        return date_str
+
+    year, month, day = cint(parts[0]), cint(parts[1]), cint(parts[2])
+    if not 1 <= month <= 12:
+        return date_str
+
+    last_day = calendar.monthrange(year, month)[1]
+    return "{0}-{1}-{2:02d}".format(parts[0], parts[1], min(day, last_day))
+
+
+def new_report_result(filters):
+    return {
+        "params": {
+            "from_date":    filters.from_date,
+            "to_date":      filters.to_date,
+            "company":      filters.company,
+            "mode":         filters.mode,
+            "include_hpp":  filters.include_hpp,
+            "sales_person": filters.sales_person or "All",
+            "customer":     filters.customer or "All"
+        },
+        "by_item":     [],
+        "by_invoice":  {},
+        "by_customer": {},
+        "by_sales":    {},
+        "summary":     new_summary()
+    }
+
+
+def new_summary():
+    return {
+        "total_sales":                        0.0,
+        "total_hpp_base":                     0.0,
+        "total_financial_cost":               0.0,
+        "total_hpp_total":                    0.0,
+        "total_gross_profit_before_overhead": 0.0,
+        "total_gross_profit":                 0.0,
+        "total_base_profit":                  0.0,
+        "total_commission":                   0.0,
+        "total_company_margin":               0.0,
+        "total_company_profit":               0.0,
+        "total_invoices":                     0,
+        "total_credit_notes":                 0,
+        "total_commission_positive":          0.0,
+        "total_commission_negative":          0.0
+    }
+
+
+def iter_report_rows(filters, after=None, limit=None, chunk_size=None):
+    """Yield `by_item` rows in report order, see `iter_keyed_rows`"""
+    for _key, row in iter_keyed_rows(filters, after, limit, chunk_size):
+        yield row
+
+
+def iter_keyed_rows(filters, after=None, limit=None, chunk_size=None):
+    """
+    Yield (cursor key, `by_item` row) for every Sales Invoice Item matching the filters.
+
+    Rows are ordered by (posting_date, invoice, idx), which is also the
+    keyset cursor. Rows are fetched chunk_size at a time (None reads
+    everything in one chunk), so memory stays bounded when the caller does
+    not keep them.
+
+    Args:
+        after: Cursor key; only rows after it are returned
+        limit: Maximum number of rows
+        chunk_size: Rows fetched per round of queries
+    """
+    cursor = after
+    remaining = limit
+
+    while True:
+        size = chunk_size
+        if remaining is not None:
+            size = remaining if size is None else min(size, remaining)
+
+        chunk = get_report_chunk(filters, cursor, size)
+        yield from chunk
+
+        if size is None or len(chunk) < size:
+            return
+
+        cursor = chunk[-1][0]
+        if remaining is not None:
+            remaining -= len(chunk)
+            if remaining <= 0:
+                return
+
+
+def get_report_chunk(filters, cursor=None, size=None):
+    """
+    Return up to `size` (key, row) pairs after the cursor.
+
+    Invoices with Sales Commission Fact rows are read from the fact table;
+    the rest (e.g. submitted before the table existed) are computed here.
+    Both sources are ordered the same way and merged, so the output order
+    does not depend on where a row came from.
+    """
+    fact_rows = [
+        ((fact.posting_date, fact.sales_invoice, fact.idx), row_from_fact(fact, filters, filters.sales_person))
+        for fact in get_fact_rows(filters, cursor, size)
+    ]
+    computed_rows = get_computed_rows(filters, cursor, size)
+
+    rows = heapq.merge(fact_rows, computed_rows, key=lambda pair: pair[0])
+    return list(islice(rows, size))
+
+
+def get_computed_rows(filters, cursor=None, size=None):
+    """Return (key, row) pairs for invoices that have no Sales Commission Fact rows"""
+    items = get_invoice_items(filters, cursor, size)
+    if not items:
+        return []
+
+    invoice_names = {item.parent for item in items}
+    invoices = get_invoices(invoice_names)
+    invoice_sales = get_invoice_sales_persons(invoice_names, filters.sales_person)
+    hpp_map = resolve_hpp(items)
+
+    rows = []
+    for item in items:
+        invoice = invoices[item.parent]
+        row = compute_item_row(item, invoice, invoice_sales.get(item.parent), hpp_map.get(item.name, 0), filters)
+        rows.append(((item.posting_date, item.parent, item.idx), row))
+
+    return rows
+
+
+def get_fact_rows(filters, cursor=None, size=None):
+    values = dict(filters)
+    return frappe.db.sql("""
+        SELECT f.*
+        FROM `tabSales Commission Fact` f
+        INNER JOIN `tabSales Invoice` si ON si.name = f.sales_invoice
+        WHERE {conditions} {cursor_condition}
+        ORDER BY f.posting_date, f.sales_invoice, f.idx
+        {limit}
+    """.format(
+        conditions=get_invoice_conditions(filters),
+        cursor_condition=get_cursor_condition("f.posting_date", "f.sales_invoice", "f.idx", cursor, values),
+        limit=get_limit(size)
+    ), values, as_dict=True)
+
+
+def get_invoice_items(filters, cursor=None, size=None):
+    values = dict(filters)
+    return frappe.db.sql("""
+        SELECT sii.name, sii.parent, sii.idx, si.posting_date, sii.item_code, sii.item_name,
+            sii.qty, sii.rate, sii.price_list_rate, sii.incoming_rate, sii.margin_rate_or_amount,
+            sii.custom_hpp_snapshot, sii.custom_financial_cost_percent, sii.dn_detail,
+            sii.warehouse
+        FROM `tabSales Invoice Item` sii
+        INNER JOIN `tabSales Invoice` si ON si.name = sii.parent
+        WHERE sii.parenttype = 'Sales Invoice' AND {conditions} {cursor_condition}
+        ORDER BY si.posting_date, si.name, sii.idx
+        {limit}
+    """.format(
+        conditions=get_invoice_conditions(filters, without_facts=True),
+        cursor_condition=get_cursor_condition("si.posting_date", "si.name", "sii.idx", cursor, values),
+        limit=get_limit(size)
+    ), values, as_dict=True)
+
+
+def get_invoice_conditions(filters, without_facts=False):
+    """WHERE clause on `tabSales Invoice` si shared by every report query"""
+    conditions = ["si.docstatus = 1", "si.posting_date BETWEEN %(from_date)s AND %(to_date)s"]
+    if without_facts:
+        conditions.append("""NOT EXISTS (
+            SELECT 1 FROM `tabSales Commission Fact` f WHERE f.sales_invoice = si.name
+        )""")
+    if filters.company:
+        conditions.append("si.company = %(company)s")
+    if filters.customer:
+        conditions.append("si.customer = %(customer)s")
+    if filters.sales_person:
+        conditions.append("""EXISTS (
+            SELECT 1 FROM `tabSales Team` st_filter
+            WHERE st_filter.parent = si.name
+            AND st_filter.parenttype = 'Sales Invoice'
+            AND st_filter.sales_person = %(sales_person)s
+        )""")
+    return " AND ".join(conditions)
+
+
+def get_cursor_condition(date_field, name_field, idx_field, cursor, values):
+    """Keyset condition for rows after (posting_date, invoice, idx); adds its values"""
+    if not cursor:
+        return ""
+
+    values.update({"cursor_date": cursor[0], "cursor_name": cursor[1], "cursor_idx": cursor[2]})
+    return """AND ({date} > %(cursor_date)s OR ({date} = %(cursor_date)s AND (
+        {name} > %(cursor_name)s OR ({name} = %(cursor_name)s AND {idx} > %(cursor_idx)s))))""".format(
+        date=date_field, name=name_field, idx=idx_field
+    )
+
+
+def get_limit(size):
+    return "LIMIT {0}".format(cint(size)) if size else ""
+
+
+def encode_cursor(key):
+    return json.dumps([str(key[0]), key[1], key[2]])
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    posting_date, invoice, idx = json.loads(cursor)
+    return (getdate(posting_date), invoice, cint(idx))
+
+
+def get_invoices(invoice_names):
+    """Return {invoice name: header row}"""
+    rows = frappe.db.sql("""
+        SELECT name, customer, customer_name, company, is_return, return_against,
+            custom_persentase_komisi_si
+        FROM `tabSales Invoice`
+        WHERE name IN %(names)s
+    """, {"names": tuple(invoice_names)}, as_dict=True)
+
+    return {row.name: row for row in rows}
+
+
+def get_invoice_sales_persons(invoice_names, sales_person=None):
+    """Return {invoice name: sales person}; the last Sales Team row wins, as before"""
+    condition = "AND sales_person = %(sales_person)s" if sales_person else ""
+    rows = frappe.db.sql("""
+        SELECT parent, sales_person
+        FROM `tabSales Team`
+        WHERE parenttype = 'Sales Invoice' AND parent IN %(names)s {condition}
+        ORDER BY parent, idx
+    """.format(condition=condition), {"names": tuple(invoice_names), "sales_person": sales_person}, as_dict=True)
+
+    return {row.parent: row.sales_person for row in rows}
+
+
+def add_row_to_result(result, row, invoice_keys):
+    """
+    Accumulate one `by_item` row into every grouping present in the result.
+
+    invoice_keys holds per-group sets of invoice names so the `invoices`
+    lists are de-duplicated without scanning them.
+    """
+    if "by_item" in result:
+        result["by_item"].append(row)
+
+    inv = row["invoice"]
+    cust_id = row["customer"]
+    customer_name = row["customer_name"]
+    cust_key = cust_id + " - " + customer_name if customer_name != cust_id else cust_id
+    sp_key = row["sales_person"] or "Unassigned"
+    amounts = get_row_amounts(row)
+
+    # By Invoice
+    if "by_invoice" in result:
+        inv_row = result["by_invoice"].get(inv)
+        if inv_row is None:
+            inv_row = result["by_invoice"][inv] = {
+                "customer":       cust_id,
+                "sales_person":   row["sales_person"],
+                "is_return":      row["is_return"],
+                "return_against": row["return_against"]
+            }
+            inv_row.update(dict.fromkeys(TOTAL_FIELDS, 0.0))
+        add_amounts(inv_row, amounts)
+
+    # By Customer / By Sales
+    for group, key in (("by_customer", cust_key), ("by_sales", sp_key)):
+        group_row = result[group].get(key)
+        if group_row is None:
+            group_row = result[group][key] = {"invoices": []}
+            group_row.update(dict.fromkeys(TOTAL_FIELDS, 0.0))
+            invoice_keys[group][key] = set()
+
+        seen = invoice_keys[group][key]
+        if inv not in seen:
+            seen.add(inv)
+            group_row["invoices"].append(inv)
+        add_amounts(group_row, amounts)
+
+    # Summary
+    add_row_to_summary(result["summary"], row, amounts)
+
+
+def get_row_amounts(row):
+    """Map a `by_item` row onto the TOTAL_FIELDS used by every grouping"""
+    return {
+        "sales":                        row["sales"],
+        "hpp_base":                     row["hpp_base"] or 0,
+        "financial_cost":               row["financial_cost"] or 0,
+        "hpp_total":                    row["hpp_total"] or 0,
+        "gross_profit_before_overhead": row["gross_profit_before_overhead"],
+        "gross_profit":                 row["gross_profit"],
+        "base_profit":                  row["base_profit"],
+        "commission":                   row["commission"],
+        "company_margin":               row["company_margin"],
+        "profit":                       row["company_profit"]
+    }
+
+
+def add_amounts(target, amounts):
+    for fieldname in TOTAL_FIELDS:
+        target[fieldname] += amounts[fieldname]
+
+
+def add_row_to_summary(summary, row, amounts=None):
+    amounts = amounts or get_row_amounts(row)
+    for fieldname in TOTAL_FIELDS:
+        key = "total_company_profit" if fieldname == "profit" else "total_" + fieldname
+        summary[key] += amounts[fieldname]
+
+    commission = row["commission"]
+    if row["is_return"]:
+        summary["total_credit_notes"] += 1
+        summary["total_commission_negative"] += abs(commission)
+    else:
+        summary["total_invoices"] += 1
+        summary["total_commission_positive"] += commission
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Document details for the frontend forms
+
+Whitelisted replacements for the `fetch_po_detail_for_pr`,
+`fetch_pr_detail_for_pi` and `fetch_pi_detail` API server scripts, with the
+same parameters and response shapes. The bare method names are routed here
+through `override_whitelisted_methods` in hooks.py.
+
+Linked Purchase Order Items are read with one query for the whole document
+instead of one `get_value` per row.
+"""
+
+from __future__ import unicode_literals
+
+import frappe
+from frappe.utils import flt
+
+
+@frappe.whitelist()
+def fetch_po_detail_for_pr(po=None):
+    """
+    Purchase Order header and items to prefill a Purchase Receipt.
+
+    Args:
+        po: Purchase Order name
+    """
+    if not po:
+        frappe.throw("Parameter po wajib dikirim")
+
+    po_doc = frappe.get_doc("Purchase Order", po)
+    po_doc.check_permission("read")
+
+    items = []
+    for row in po_doc.items:
+        items.append({
+            "item_code": row.item_code,
+            "item_name": row.item_name,
+            "description": row.description,
+            "qty": row.qty,
+            "uom": row.uom,
+            "rate": row.rate,
+            "warehouse": row.warehouse,
+
+            # RELASI WAJIB PO → PR
+            "purchase_order": po_doc.name,
+            "purchase_order_item": row.name,
+
+            # DELIVERY DATE
+            "schedule_date": row.schedule_date
+        })
+
+    return {
+        "success": True,
+        "data": {
+            "name": po_doc.name,
+            "supplier": po_doc.supplier,
+            "supplier_name": po_doc.supplier_name,
+            "transaction_date": po_doc.transaction_date,
+            "warehouse": po_doc.set_warehouse,
+            "custom_notes_po": po_doc.custom_notes_po,
+            "items": items
+        }
+    }
+
+
+@frappe.whitelist()
+def fetch_pr_detail_for_pi(pr=None):
+    """
+    Purchase Receipt header, supplier address and the items still to bill,
+    to prefill a Purchase Invoice.
+
+    The qty to bill is the linked Purchase Order Item qty (or the receipt qty
+    without a Purchase Order) minus the billed qty; fully billed rows are
+    left out.
+
+    Args:
+        pr: Purchase Receipt name
+    """
+    if not pr:
+        frappe.throw("Parameter pr wajib dikirim")
+
+    pr_doc = frappe.get_doc("Purchase Receipt", pr)
+    pr_doc.check_permission("read")
+
+    supplier_address, supplier_address_display = get_supplier_address(pr_doc.supplier)
+    po_items = get_purchase_order_items(pr_doc.items)
+
+    items = []
+    for row in pr_doc.items:
+        received_qty = flt(row.received_qty)
+        rejected_qty = flt(row.rejected_qty)
+        billed_qty = flt(row.billed_qty)
+
+        # AUTO LOOKUP PO ITEM JIKA NULL
+        po_item = row.purchase_order_item
+        if row.purchase_order and not po_item:
+            po_item = po_items.get((row.purchase_order, row.item_code), {}).get("name")
+
+        if po_item:
+            qty_pi = flt(po_items.get(po_item, {}).get("qty")) - billed_qty
+        else:
+            qty_pi = flt(row.qty) - billed_qty
+
+        if qty_pi <= 0:
+            continue
+
+        item = {
+            "item_code": row.item_code,
+            "item_name": row.item_name,
+            "description": row.description,
+            # qty diterima bersih
+            "received_qty": received_qty - rejected_qty,
+            "rejected_qty": rejected_qty,
+            "billed_qty": billed_qty,
+            "outstanding_qty": qty_pi,
+            "qty": qty_pi,
+            "uom": row.uom,
+            "rate": row.rate,
+            "warehouse": row.warehouse,
+            "purchase_receipt": pr_doc.name,
+            "purchase_receipt_item": row.name
+        }
+
+        if row.purchase_order:
+            item["purchase_order"] = row.purchase_order
+        if po_item:
+            item["purchase_order_item"] = po_item
+
+        items.append(item)
+
+    return {
+        "success": True,
+        "data": {
+            "name": pr_doc.name,
+            "supplier": pr_doc.supplier,
+            "supplier_name": pr_doc.supplier_name,
+            "posting_date": pr_doc.posting_date,
+            "company": pr_doc.company,
+            "custom_notes_pr": pr_doc.custom_notes_pr or pr_doc.remarks,
+            "supplier_address": supplier_address,
+            "supplier_address_display": supplier_address_display,
+            "items": items
+        }
+    }
+
+
+@frappe.whitelist()
+def fetch_pi_detail(pi=None):
+    """
+    Purchase Invoice header, items and taxes.
+
+    Args:
+        pi: Purchase Invoice name
+    """
+    if not pi:
+        frappe.throw("Parameter pi wajib dikirim")
+
+    pi_doc = frappe.get_doc("Purchase Invoice", pi)
+    pi_doc.check_permission("read")
+
+    items = [{
+        "name": row.name,
+        "item_code": row.item_code,
+        "item_name": row.item_name,
+        "description": row.description,
+        "qty": row.qty,
+        "uom": row.uom,
+        "rate": row.rate,
+        "amount": row.amount,
+        "warehouse": row.warehouse,
+        "purchase_receipt": row.purchase_receipt,
+        "pr_detail": row.pr_detail
+    } for row in pi_doc.items]
+
+    taxes = [{
+        "charge_type": tax.charge_type,
+        "account_head": tax.account_head,
+        "rate": tax.rate,
+        "tax_amount": tax.tax_amount,
+        "description": tax.description
+    } for tax in pi_doc.taxes]
+
+    return {
+        "success": True,
+        "data": {
+            "name": pi_doc.name,
+            "supplier": pi_doc.supplier,
+            "supplier_name": pi_doc.supplier_name,
+            "company": pi_doc.company,
+            "posting_date": pi_doc.posting_date,
+            "due_date": pi_doc.due_date,
+            "bill_no": pi_doc.bill_no,
+            "bill_date": pi_doc.bill_date,
+            "currency": pi_doc.currency,
+            "remarks": pi_doc.remarks,
+            "custom_notes_pi": pi_doc.custom_notes_pi,
+            "supplier_address": pi_doc.supplier_address,
+            "address_display": pi_doc.address_display,
+            "grand_total": pi_doc.grand_total,
+            "net_total": pi_doc.net_total,
+            "total_taxes_and_charges": pi_doc.total_taxes_and_charges,
+            "docstatus": pi_doc.docstatus,
+            "items": items,
+            "taxes": taxes
+        }
+    }
+
+
+def get_supplier_address(supplier):
+    """Return (address name, display) of the supplier's primary (else any) enabled address"""
+    address = frappe.db.sql("""
+        SELECT addr.name
+        FROM `tabAddress` addr
+        INNER JOIN `tabDynamic Link` dl
+            ON dl.parent = addr.name
+            AND dl.parenttype = 'Address'
+        WHERE dl.link_doctype = 'Supplier'
+            AND dl.link_name = %s
+            AND addr.disabled = 0
+        ORDER BY addr.is_primary_address DESC
+        LIMIT 1
+    """, supplier)
+
+    if not address:
+        return None, None
+
+    address_name = address[0][0]
+    return address_name, frappe.get_doc("Address", address_name).get_display()
+
+
+def get_purchase_order_items(rows):
+    """
+    Purchase Order Items linked from receipt rows, in at most two queries.
+
+    Returns:
+        {po item name: {name, qty}} for the linked rows, plus
+        {(purchase order, item code): first matching row} for the rows that
+        only link the Purchase Order
+    """
+    po_items = {}
+
+    unlinked = {(row.purchase_order, row.item_code) for row in rows if row.purchase_order and not row.purchase_order_item}
+    if unlinked:
+        matches = frappe.db.sql("""
+            SELECT name, parent, item_code, qty
+            FROM `tabPurchase Order Item`
+            WHERE parent IN %(purchase_orders)s
+                AND item_code IN %(item_codes)s
+            ORDER BY idx
+        """, {
+            "purchase_orders": tuple({key[0] for key in unlinked}),
+            "item_codes": tuple({key[1] for key in unlinked})
+        }, as_dict=True)
+
+        for match in matches:
+            po_items.setdefault((match.parent, match.item_code), match)
+            po_items[match.name] = match
+
+    linked = {row.purchase_order_item for row in rows if row.purchase_order_item} - set(po_items)
+    if linked:
+        for match in frappe.db.sql("""
+            SELECT name, qty
+            FROM `tabPurchase Order Item`
+            WHERE name IN %(names)s
+        """, {"names": tuple(linked)}, as_dict=True):
+            po_items[match.name] = match
+
+    return po_items
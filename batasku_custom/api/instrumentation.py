@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Hook performance stats
+
+Read and reset the per-hook timing and query counts collected by
+batasku_custom.instrumentation (enabled with the `batasku_instrument_hooks`
+site config flag). System Manager only.
+"""
+
+from __future__ import unicode_literals
+
+import frappe
+
+from batasku_custom.instrumentation import get_stats, is_enabled, reset_stats
+
+
+@frappe.whitelist()
+def get_hook_stats(doctype=None, event=None):
+    """
+    Aggregated stats per (doctype, event, handler), slowest total time first.
+
+    Args:
+        doctype: Optional doctype filter
+        event: Optional event filter (e.g. "on_submit", "Before Save")
+
+    Returns:
+        {"enabled": bool, "data": [{doctype, event, handler, calls, errors,
+        total_ms, avg_ms, max_ms, queries, avg_queries, rows}]}
+    """
+    frappe.only_for("System Manager")
+
+    rows = [
+        row for row in get_stats()
+        if (not doctype or row.doctype == doctype) and (not event or row.event == event)
+    ]
+    return {"enabled": is_enabled(), "data": rows}
+
+
+@frappe.whitelist(methods=["POST"])
+def reset_hook_stats():
+    """Clear the collected stats"""
+    frappe.only_for("System Manager")
+    reset_stats()
+    return {"success": True}
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Period close preflight
+
+Lists what should be settled before an Accounting Period is closed:
+
+- Draft: draft documents of every doctype guarded by the closed period
+  validation in hooks.py, dated inside the period
+- Uncleared Warkat: submitted warkat (Mode of Payment type Bank) Payment
+  Entries of the period without a clearing or bounce journal
+- Missing HPP: submitted Sales Invoices of the period with an item without
+  an HPP snapshot
+
+Only the checks whose doctype the user can read are included, and only for
+a company allowed by the user's Company User Permissions. All checks are one
+UNION ALL query: once grouped for the counts, once as a keyset-paginated
+list (oldest first). `download_period_close_preflight`
+streams the full list from an unbuffered cursor into a spooled CSV file.
+"""
+
+from __future__ import unicode_literals
+import csv
+import io
+import json
+import tempfile
+
+import frappe
+from frappe.core.doctype.user_permission.user_permission import get_user_permissions
+from frappe.utils import cint, getdate
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+
+from batasku_custom.batasku_custom.doctype.auto_journal_registry.auto_journal_registry import (
+    WARKAT_BOUNCE,
+    WARKAT_CLEAR
+)
+
+DRAFT = "Draft"
+UNCLEARED_WARKAT = "Uncleared Warkat"
+MISSING_HPP = "Missing HPP"
+
+CLOSED_PERIOD_VALIDATION = "batasku_custom.accounting_period_restrictions.validate_transaction_against_closed_period"
+
+DEFAULT_PAGE_LENGTH = 100
+MAX_PAGE_LENGTH = 1000
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+@frappe.whitelist()
+def get_period_close_preflight(accounting_period=None, company=None, from_date=None, to_date=None,
+                               check=None, after=None, page_length=DEFAULT_PAGE_LENGTH):
+    """
+    Documents to settle before closing a period.
+
+    Args:
+        accounting_period: Accounting Period; or give company, from_date and to_date
+        check: Optional "Draft", "Uncleared Warkat" or "Missing HPP"
+        after: `next_cursor` of the previous page
+        page_length: Rows per page (max 1000)
+
+    Returns:
+        {"success", "counts": {check: {doctype: count}} (first page only),
+        "data": [{check, doctype, name, date, owner, modified}], "next_cursor"}
+    """
+    frappe.has_permission("Accounting Period", "read", throw=True)
+
+    union, values = get_preflight_query(accounting_period, company, from_date, to_date, check)
+    page_length = min(max(cint(page_length), 1), MAX_PAGE_LENGTH)
+
+    counts = None
+    if not after:
+        counts = {}
+        for row in frappe.db.sql(f"""
+            SELECT t.check_name, t.doctype, COUNT(*) AS count
+            FROM ({union}) t
+            GROUP BY t.check_name, t.doctype
+        """, values, as_dict=True):
+            counts.setdefault(row.check_name, {})[row.doctype] = row.count
+
+    conditions = ""
+    if after:
+        cursor_date, cursor_doctype, cursor_name = json.loads(after)
+        conditions = """WHERE (t.date, t.doctype, t.name) > (%(cursor_date)s, %(cursor_doctype)s, %(cursor_name)s)"""
+        values.update({
+            "cursor_date": getdate(cursor_date),
+            "cursor_doctype": cursor_doctype,
+            "cursor_name": cursor_name
+        })
+
+    rows = frappe.db.sql(f"""
+        SELECT t.check_name AS `check`, t.doctype, t.name, t.date, t.owner, t.modified
+        FROM ({union}) t
+        {conditions}
+        ORDER BY t.date, t.doctype, t.name
+        LIMIT {page_length + 1}
+    """, values, as_dict=True)
+
+    next_cursor = None
+    if len(rows) > page_length:
+        rows = rows[:page_length]
+        last = rows[-1]
+        next_cursor = json.dumps([str(last.date), last.doctype, last.name])
+
+    return {
+        "success": True,
+        "counts": counts,
+        "data": rows,
+        "next_cursor": next_cursor
+    }
+
+
+@frappe.whitelist()
+def download_period_close_preflight(accounting_period=None, company=None, from_date=None, to_date=None, check=None):
+    """
+    Full preflight list as CSV.
+
+    Rows are read from an unbuffered cursor and written to a spooled
+    temporary file, which spills to disk for large lists and is streamed
+    back from there.
+    """
+    frappe.has_permission("Accounting Period", "read", throw=True)
+
+    union, values = get_preflight_query(accounting_period, company, from_date, to_date, check)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    stream = io.TextIOWrapper(spool, encoding="utf-8", newline="", write_through=True)
+    writer = csv.writer(stream)
+    writer.writerow(["Check", "DocType", "Name", "Date", "Owner", "Modified"])
+
+    with frappe.db.unbuffered_cursor():
+        for row in frappe.db.sql(f"""
+            SELECT t.check_name, t.doctype, t.name, t.date, t.owner, t.modified
+            FROM ({union}) t
+            ORDER BY t.date, t.doctype, t.name
+        """, values, as_iterator=True):
+            writer.writerow(row)
+
+    stream.detach()
+    spool.seek(0)
+
+    filename = "period_close_preflight_{0}_{1}.csv".format(values["from_date"], values["to_date"])
+    response = Response(
+        wrap_file(frappe.local.request.environ, spool),
+        mimetype="text/csv",
+        direct_passthrough=True
+    )
+    response.headers["Content-Disposition"] = 'attachment; filename="{0}"'.format(filename)
+    return response
+
+
+def get_preflight_query(accounting_period=None, company=None, from_date=None, to_date=None, check=None):
+    """
+    Return (UNION ALL query, values) of the preflight rows.
+
+    Every branch selects check_name, doctype, name, date, owner, modified.
+    """
+    if accounting_period:
+        period = frappe.db.get_value(
+            "Accounting Period", accounting_period, ["company", "start_date", "end_date"], as_dict=True
+        )
+        if not period:
+            frappe.throw(f"Accounting Period {accounting_period} tidak ditemukan", frappe.DoesNotExistError)
+        frappe.has_permission("Accounting Period", "read", doc=accounting_period, throw=True)
+        company, from_date, to_date = period.company, period.start_date, period.end_date
+
+    if not (company and from_date and to_date):
+        frappe.throw("Pilih Accounting Period, atau company, from_date dan to_date.")
+
+    if check and check not in (DRAFT, UNCLEARED_WARKAT, MISSING_HPP):
+        frappe.throw(f"Check tidak dikenal: {check}")
+
+    validate_company_access(company)
+
+    values = {
+        "company": company,
+        "from_date": getdate(from_date),
+        "to_date": getdate(to_date),
+        "draft": DRAFT,
+        "uncleared_warkat": UNCLEARED_WARKAT,
+        "missing_hpp": MISSING_HPP,
+        "warkat_purposes": (WARKAT_CLEAR, WARKAT_BOUNCE)
+    }
+
+    branches = []
+    # Each branch is only included when the user can read its doctype
+    if check in (None, DRAFT):
+        for doctype in get_guarded_doctypes():
+            if not frappe.has_permission(doctype, "read"):
+                continue
+            date_field = get_date_field(doctype)
+            branches.append(f"""
+                SELECT %(draft)s AS check_name, '{doctype}' AS doctype, name,
+                    {date_field} AS date, owner, modified
+                FROM `tab{doctype}`
+                WHERE docstatus = 0
+                    AND company = %(company)s
+                    AND {date_field} BETWEEN %(from_date)s AND %(to_date)s
+            """)
+
+    if check in (None, UNCLEARED_WARKAT) and frappe.has_permission("Payment Entry", "read"):
+        branches.append("""
+            SELECT %(uncleared_warkat)s AS check_name, 'Payment Entry' AS doctype, pe.name,
+                pe.posting_date AS date, pe.owner, pe.modified
+            FROM `tabPayment Entry` pe
+            INNER JOIN `tabMode of Payment` mop ON mop.name = pe.mode_of_payment
+            WHERE pe.docstatus = 1
+                AND mop.type = 'Bank'
+                AND pe.company = %(company)s
+                AND pe.posting_date BETWEEN %(from_date)s AND %(to_date)s
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM `tabAuto Journal Registry` ajr
+                    WHERE ajr.source_doctype = 'Payment Entry'
+                        AND ajr.source_name = pe.name
+                        AND ajr.purpose IN %(warkat_purposes)s
+                )
+        """)
+
+    if check in (None, MISSING_HPP) and frappe.has_permission("Sales Invoice", "read"):
+        branches.append("""
+            SELECT %(missing_hpp)s AS check_name, 'Sales Invoice' AS doctype, si.name,
+                si.posting_date AS date, si.owner, si.modified
+            FROM `tabSales Invoice` si
+            WHERE si.docstatus = 1
+                AND si.company = %(company)s
+                AND si.posting_date BETWEEN %(from_date)s AND %(to_date)s
+                AND EXISTS (
+                    SELECT 1
+                    FROM `tabSales Invoice Item` sii
+                    WHERE sii.parent = si.name
+                        AND sii.parenttype = 'Sales Invoice'
+                        AND IFNULL(sii.custom_hpp_snapshot, 0) <= 0
+                )
+        """)
+
+    if not branches:
+        frappe.throw("Tidak diizinkan membaca dokumen yang diperiksa.", frappe.PermissionError)
+
+    return "\nUNION ALL\n".join(branches), values
+
+
+def validate_company_access(company):
+    """Refuse a company outside the user's Company User Permissions"""
+    permissions = get_user_permissions().get("Company")
+    if permissions and company not in {permission.get("doc") for permission in permissions}:
+        frappe.throw(f"Tidak diizinkan melihat company {company}.", frappe.PermissionError)
+
+
+def get_guarded_doctypes():
+    """Doctypes whose validate hook runs the closed period validation"""
+    doctypes = []
+    for doctype, events in (frappe.get_hooks("doc_events") or {}).items():
+        handlers = events.get("validate") or []
+        if isinstance(handlers, str):
+            handlers = [handlers]
+        if CLOSED_PERIOD_VALIDATION in handlers and doctype != "*":
+            doctypes.append(doctype)
+    return sorted(doctypes)
+
+
+def get_date_field(doctype):
+    return "posting_date" if frappe.get_meta(doctype).has_field("posting_date") else "transaction_date"
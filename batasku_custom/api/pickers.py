@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Document pickers for the frontend
+
+Whitelisted replacements for the `fetch_pr_list_for_pi`,
+`fetch_po_list_for_pr` and `fetch_so_list_for_dn` API server scripts. The
+bare method names are routed here through `override_whitelisted_methods` in
+hooks.py.
+
+Documents that already have a draft or submitted downstream document are
+excluded with a NOT EXISTS anti-join instead of a growing `name NOT IN (...)`
+list. Results are keyset-paginated on (date, name), newest first: pass the
+returned `next_cursor` back as `after` to get the next page.
+"""
+
+from __future__ import unicode_literals
+import json
+
+import frappe
+from frappe.utils import cint, getdate
+
+DEFAULT_PAGE_LENGTH = 50
+MAX_PAGE_LENGTH = 500
+
+
+@frappe.whitelist()
+def fetch_pr_list_for_pi(company=None, search=None, after=None, page_length=DEFAULT_PAGE_LENGTH):
+    """
+    Submitted Purchase Receipts to bill that are not used by any draft or
+    submitted Purchase Invoice yet.
+
+    Args:
+        company: Optional company filter
+        search: Optional text matched against name, supplier and supplier name
+        after: `next_cursor` of the previous page
+        page_length: Rows per page (max 500)
+
+    Returns:
+        {"success": True, "data": [...], "next_cursor": str or None}
+    """
+    values = {}
+    conditions = get_picker_conditions("pr", "posting_date", company, search, after, values)
+
+    rows = frappe.db.sql("""
+        SELECT pr.name, pr.supplier, pr.supplier_name, pr.posting_date, pr.company,
+            pr.grand_total, pr.per_billed, pr.status
+        FROM `tabPurchase Receipt` pr
+        WHERE pr.docstatus = 1
+            AND pr.status = 'To Bill'
+            AND NOT EXISTS (
+                SELECT 1
+                FROM `tabPurchase Invoice Item` pii
+                INNER JOIN `tabPurchase Invoice` pi ON pii.parent = pi.name
+                WHERE pii.purchase_receipt = pr.name
+                    AND pi.docstatus IN (0, 1)
+            )
+            {conditions}
+        ORDER BY pr.posting_date DESC, pr.name DESC
+        LIMIT {limit}
+    """.format(conditions=conditions, limit=get_page_length(page_length) + 1), values, as_dict=True)
+
+    return get_page(rows, page_length, "posting_date")
+
+
+@frappe.whitelist()
+def fetch_po_list_for_pr(company=None, supplier=None, search=None, after=None, page_length=DEFAULT_PAGE_LENGTH):
+    """
+    Submitted Purchase Orders still to receive that are not used by any draft
+    or submitted Purchase Receipt yet.
+
+    Args:
+        company: Optional company filter
+        supplier: Optional supplier filter
+        search: Optional text matched against name, supplier and supplier name
+        after: `next_cursor` of the previous page
+        page_length: Rows per page (max 500)
+
+    Returns:
+        {"success": True, "data": [...], "next_cursor": str or None}
+    """
+    values = {}
+    conditions = get_picker_conditions("po", "transaction_date", company, search, after, values)
+    if supplier:
+        conditions += " AND po.supplier = %(supplier)s"
+        values["supplier"] = supplier
+
+    rows = frappe.db.sql("""
+        SELECT po.name, po.supplier, po.supplier_name, po.transaction_date, po.company,
+            po.grand_total, po.per_received, po.per_billed, po.status
+        FROM `tabPurchase Order` po
+        WHERE po.docstatus = 1
+            AND po.status IN ('To Receive', 'To Receive and Bill')
+            AND po.per_received < 100
+            AND NOT EXISTS (
+                SELECT 1
+                FROM `tabPurchase Receipt Item` pri
+                INNER JOIN `tabPurchase Receipt` pr ON pri.parent = pr.name
+                WHERE pri.purchase_order = po.name
+                    AND pr.docstatus IN (0, 1)
+            )
+            {conditions}
+        ORDER BY po.transaction_date DESC, po.name DESC
+        LIMIT {limit}
+    """.format(conditions=conditions, limit=get_page_length(page_length) + 1), values, as_dict=True)
+
+    return get_page(rows, page_length, "transaction_date")
+
+
+@frappe.whitelist()
+def fetch_so_list_for_dn(customer=None, company=None, sales_person=None, search=None, after=None,
+        page_length=DEFAULT_PAGE_LENGTH):
+    """
+    Fetch Sales Order List untuk Delivery Note.
+    Filter:
+    - Submitted (docstatus = 1)
+    - Belum fully delivered
+    - Belum ada Delivery Note (draft maupun submitted)
+    - Optional filter: customer, company, sales_person, search
+
+    Pending items are counted in the same query; load them with
+    `fetch_so_items_for_dn` when the user expands a Sales Order.
+
+    Returns:
+        {"success": True, "data": [...], "next_cursor": str or None}
+    """
+    values = {}
+    conditions = ""
+
+    if customer:
+        conditions += " AND so.customer = %(customer)s"
+        values["customer"] = customer
+    if company:
+        conditions += " AND so.company = %(company)s"
+        values["company"] = company
+    if sales_person:
+        conditions += """ AND EXISTS (
+            SELECT 1 FROM `tabSales Team` st
+            WHERE st.parent = so.name AND st.parenttype = 'Sales Order'
+                AND st.sales_person = %(sales_person)s
+        )"""
+        values["sales_person"] = sales_person
+    if search:
+        conditions += " AND (so.name LIKE %(search)s OR so.customer LIKE %(search)s OR so.customer_name LIKE %(search)s)"
+        values["search"] = "%{0}%".format(search.strip())
+
+    cursor = decode_cursor(after)
+    if cursor:
+        conditions += """ AND (so.transaction_date < %(cursor_date)s
+            OR (so.transaction_date = %(cursor_date)s AND so.name < %(cursor_name)s))"""
+        values.update({"cursor_date": cursor[0], "cursor_name": cursor[1]})
+
+    rows = frappe.db.sql("""
+        SELECT so.name, so.customer, so.transaction_date, so.grand_total, so.rounded_total,
+            (
+                SELECT st.sales_person FROM `tabSales Team` st
+                WHERE st.parent = so.name AND st.parenttype = 'Sales Order'
+                ORDER BY st.idx
+                LIMIT 1
+            ) AS sales_person,
+            COUNT(soi.name) AS pending_items
+        FROM `tabSales Order` so
+        INNER JOIN `tabSales Order Item` soi
+            ON soi.parent = so.name
+            AND soi.qty > 0
+            AND soi.delivered_qty < soi.qty
+        WHERE so.docstatus = 1
+            AND NOT EXISTS (
+                SELECT 1 FROM `tabDelivery Note Item` dni
+                WHERE dni.against_sales_order = so.name
+                    AND dni.docstatus < 2
+            )
+            {conditions}
+        GROUP BY so.name
+        ORDER BY so.transaction_date DESC, so.name DESC
+        LIMIT {limit}
+    """.format(conditions=conditions, limit=get_page_length(page_length) + 1), values, as_dict=True)
+
+    return get_page(rows, page_length, "transaction_date")
+
+
+@frappe.whitelist()
+def fetch_so_items_for_dn(sales_order):
+    """
+    Sales Order Items not yet fully delivered, for the Sales Order the user
+    expands in the picker.
+
+    Returns:
+        {"success": True, "data": [...]}
+    """
+    frappe.has_permission("Sales Order", "read", sales_order, throw=True)
+
+    items = frappe.get_all(
+        "Sales Order Item",
+        filters={"parent": sales_order, "parenttype": "Sales Order", "qty": [">", 0]},
+        fields=["name", "item_code", "item_name", "qty", "delivered_qty", "uom", "rate", "warehouse"],
+        order_by="idx"
+    )
+
+    return {
+        "success": True,
+        "data": [item for item in items if item.delivered_qty < item.qty]
+    }
+
+
+def get_picker_conditions(alias, date_field, company, search, after, values):
+    """Company, search and keyset conditions shared by the pickers; adds their values"""
+    conditions = ""
+
+    if company:
+        conditions += " AND {0}.company = %(company)s".format(alias)
+        values["company"] = company
+
+    if search:
+        conditions += """ AND ({0}.name LIKE %(search)s OR {0}.supplier LIKE %(search)s
+            OR {0}.supplier_name LIKE %(search)s)""".format(alias)
+        values["search"] = "%{0}%".format(search.strip())
+
+    cursor = decode_cursor(after)
+    if cursor:
+        conditions += """ AND ({0}.{1} < %(cursor_date)s
+            OR ({0}.{1} = %(cursor_date)s AND {0}.name < %(cursor_name)s))""".format(alias, date_field)
+        values.update({"cursor_date": cursor[0], "cursor_name": cursor[1]})
+
+    return conditions
+
+
+def get_page(rows, page_length, date_field):
+    """Trim the extra row fetched to detect a next page and build the response"""
+    page_length = get_page_length(page_length)
+    next_cursor = None
+
+    if len(rows) > page_length:
+        rows = rows[:page_length]
+        next_cursor = encode_cursor((rows[-1][date_field], rows[-1].name))
+
+    return {
+        "success": True,
+        "data": rows,
+        "next_cursor": next_cursor
+    }
+
+
+def get_page_length(page_length):
+    return min(max(cint(page_length), 1), MAX_PAGE_LENGTH)
+
+
+def encode_cursor(key):
+    return json.dumps([str(key[0]), key[1]])
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    date, name = json.loads(cursor)
+    return (getdate(date), name)
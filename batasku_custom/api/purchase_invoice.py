@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Purchase Invoice API
+
+`create_purchase_invoice_with_details` creates one Purchase Invoice per call
+(re-exported as `batasku_custom.api.create_purchase_invoice_with_details`).
+
+For month-end billing, `enqueue_bulk_purchase_invoices` accepts many invoice
+payloads or Purchase Receipt names and creates the invoices in chunked
+background jobs. Every invoice is committed or rolled back on its own, so one
+bad Purchase Receipt does not abort the batch. Per-invoice status is kept in
+Redis and read back with `get_bulk_purchase_invoice_status`.
+"""
+
+from __future__ import unicode_literals
+import json
+import logging
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now_datetime
+
+from batasku_custom.logger import get_logger
+
+BULK_CHUNK_SIZE = 20
+MAX_BULK_INVOICES = 1000
+# Bulk status is kept for a day after the last update
+BULK_STATUS_TTL = 24 * 60 * 60
+BULK_STATUS_KEY = "batasku_bulk_purchase_invoice"
+BULK_PROGRESS_EVENT = "bulk_purchase_invoice_progress"
+
+
+@frappe.whitelist()
+def create_purchase_invoice_with_details(invoice_data):
+    """
+    Create Purchase Invoice with proper linkage to Purchase Receipt and Purchase Order
+    """
+    logger = get_logger("purchase_invoice")
+
+    # Parse JSON string if needed
+    if isinstance(invoice_data, str):
+        invoice_data = json.loads(invoice_data)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Create Purchase Invoice payload: %s", json.dumps(invoice_data, default=str))
+
+    try:
+        pi = make_purchase_invoice(invoice_data)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            for item in pi.items:
+                logger.debug(
+                    "%s item %s %s: received_qty=%s rejected_qty=%s pr_detail=%s po_detail=%s",
+                    pi.name, item.idx, item.item_code, item.received_qty, item.rejected_qty,
+                    item.pr_detail, item.po_detail
+                )
+
+        return {
+            "success": True,
+            "message": "Purchase Invoice created successfully",
+            "data": {
+                "name": pi.name,
+                "docstatus": pi.docstatus
+            }
+        }
+
+    except Exception as e:
+        frappe.log_error(f"Error creating Purchase Invoice: {str(e)}\n\nTraceback:\n{frappe.get_traceback()}", "Purchase Invoice API Error")
+        return {
+            "success": False,
+            "message": str(e)
+        }
+
+
+def make_purchase_invoice(invoice_data):
+    """
+    Insert (and optionally submit) a Purchase Invoice from a frontend payload.
+
+    Purchase Receipt / Purchase Order linkage for all items is fetched with
+    one query per doctype and matched in memory.
+
+    Args:
+        invoice_data: dict with company, supplier, posting_date, due_date,
+            items and an optional submit flag
+
+    Returns:
+        The inserted Purchase Invoice document
+    """
+    # Create PI document
+    pi = frappe.new_doc("Purchase Invoice")
+
+    # Set basic fields
+    pi.company = invoice_data.get("company")
+    pi.supplier = invoice_data.get("supplier")
+    pi.posting_date = invoice_data.get("posting_date")
+    pi.due_date = invoice_data.get("due_date")
+    pi.currency = invoice_data.get("currency", "IDR")
+    pi.custom_notes_pi = invoice_data.get("custom_notes_pi", "")
+    pi.remarks = invoice_data.get("remarks", "")
+
+    items = invoice_data.get("items", [])
+    pr_items = get_linked_rows(
+        items, "Purchase Receipt Item", "purchase_receipt", "purchase_receipt_item",
+        fields=("received_qty", "rejected_qty")
+    )
+    po_items = get_linked_rows(items, "Purchase Order Item", "purchase_order", "purchase_order_item")
+
+    # Add items with proper linkage
+    for item_data in items:
+        pr_item = pr_items.get((item_data.get("purchase_receipt"), item_data.get("purchase_receipt_item"), item_data["item_code"]))
+        po_item = po_items.get((item_data.get("purchase_order"), item_data.get("purchase_order_item"), item_data["item_code"]))
+
+        # Use frontend quantities if provided, otherwise fallback to the PR item
+        received_qty = get_linked_qty(item_data, pr_item, "received_qty")
+        rejected_qty = get_linked_qty(item_data, pr_item, "rejected_qty")
+
+        # Add item to PI
+        pi.append("items", {
+            "item_code": item_data["item_code"],
+            "item_name": item_data.get("item_name", item_data["item_code"]),
+            "description": item_data.get("description", item_data.get("item_name", item_data["item_code"])),
+            "qty": item_data["qty"],
+            "uom": item_data.get("uom", "Nos"),
+            "rate": item_data["rate"],
+            "warehouse": item_data.get("warehouse"),
+            "purchase_receipt": item_data.get("purchase_receipt"),
+            "purchase_order": item_data.get("purchase_order"),
+            # Set linkage fields if found
+            "pr_detail": pr_item.name if pr_item else None,
+            "po_detail": po_item.name if po_item else None,
+            # Set quantities from frontend
+            "received_qty": received_qty,
+            "rejected_qty": rejected_qty,
+        })
+
+    # Save the document
+    pi.insert()
+
+    # Submit the document if needed
+    if invoice_data.get("submit", False):
+        pi.submit()
+
+    return pi
+
+
+def get_linked_rows(items, doctype, parent_key, name_key, fields=()):
+    """
+    Fetch the PR / PO item rows referenced by a payload in one query.
+
+    Args:
+        items: Payload items
+        doctype: "Purchase Receipt Item" or "Purchase Order Item"
+        parent_key: Payload key of the parent document name
+        name_key: Payload key of the child row name
+        fields: Extra columns to fetch
+
+    Returns:
+        {(parent, name, item_code): row}; a row only matches when all three
+        agree with the payload
+    """
+    names = {item.get(name_key) for item in items if item.get(parent_key) and item.get(name_key)}
+    if not names:
+        return {}
+
+    columns = ", ".join(("name", "parent", "item_code") + tuple(fields))
+    rows = frappe.db.sql(f"""
+        SELECT {columns}
+        FROM `tab{doctype}`
+        WHERE name IN %(names)s
+    """, {"names": tuple(names)}, as_dict=True)
+
+    return {(row.parent, row.name, row.item_code): row for row in rows}
+
+
+def get_linked_qty(item_data, pr_item, fieldname):
+    """Frontend quantity when it is set and not negative, else the PR item value"""
+    qty = item_data.get(fieldname, 0)
+    if qty is not None and qty >= 0:
+        return qty
+    return (pr_item.get(fieldname) or 0) if pr_item else 0
+
+
+@frappe.whitelist()
+def enqueue_bulk_purchase_invoices(invoices=None, purchase_receipts=None, submit=0, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Create many Purchase Invoices in background jobs.
+
+    Args:
+        invoices: JSON list of payloads as accepted by
+            `create_purchase_invoice_with_details`
+        purchase_receipts: JSON list of Purchase Receipt names, each billed
+            in full with ERPNext's standard mapping
+        submit: Submit the invoices created from Purchase Receipts
+        chunk_size: Invoices per background job
+
+    Returns:
+        {"batch_id": ..., "total": ...}; poll `get_bulk_purchase_invoice_status`
+        or listen to the `bulk_purchase_invoice_progress` realtime event
+    """
+    frappe.has_permission("Purchase Invoice", "create", throw=True)
+
+    invoices = frappe.parse_json(invoices) or []
+    purchase_receipts = frappe.parse_json(purchase_receipts) or []
+
+    entries = [{"invoice_data": invoice_data} for invoice_data in invoices]
+    entries += [{"purchase_receipt": pr, "submit": cint(submit)} for pr in purchase_receipts]
+
+    if not entries:
+        frappe.throw(_("Tidak ada Purchase Invoice atau Purchase Receipt yang dikirim."))
+    if len(entries) > MAX_BULK_INVOICES:
+        frappe.throw(_("Maksimal {0} Purchase Invoice per batch.").format(MAX_BULK_INVOICES))
+
+    chunk_size = max(cint(chunk_size), 1)
+    batch_id = frappe.generate_hash(length=12)
+
+    cache = frappe.cache()
+    key = _get_status_key(batch_id)
+    for index, entry in enumerate(entries):
+        entry["index"] = index
+        cache.hset(key, str(index), {
+            "source": _get_entry_source(entry),
+            "status": "Queued"
+        })
+    cache.set_value(_get_meta_key(batch_id), {
+        "total": len(entries),
+        "owner": frappe.session.user,
+        "created": str(now_datetime())
+    }, expires_in_sec=BULK_STATUS_TTL)
+    _expire_status(batch_id)
+
+    for start in range(0, len(entries), chunk_size):
+        frappe.enqueue(
+            "batasku_custom.api.purchase_invoice.create_bulk_purchase_invoice_chunk",
+            queue="long",
+            timeout=1500,
+            batch_id=batch_id,
+            entries=entries[start:start + chunk_size]
+        )
+
+    return {"batch_id": batch_id, "total": len(entries)}
+
+
+def create_bulk_purchase_invoice_chunk(batch_id, entries):
+    """
+    Background job: create one chunk of a bulk batch.
+
+    Each invoice is committed on success and rolled back on failure, so the
+    rest of the chunk (and the batch) carries on.
+    """
+    cache = frappe.cache()
+    key = _get_status_key(batch_id)
+
+    for entry in entries:
+        status = {"source": _get_entry_source(entry)}
+        try:
+            pi = _make_bulk_purchase_invoice(entry)
+            frappe.db.commit()
+            status.update({"status": "Created", "name": pi.name, "docstatus": pi.docstatus})
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(
+                title="Bulk Purchase Invoice Error",
+                message=f"Batch {batch_id}, {status['source']}\n\n{frappe.get_traceback()}"
+            )
+            status.update({"status": "Failed", "message": str(e)})
+        finally:
+            frappe.clear_messages()
+
+        cache.hset(key, str(entry["index"]), status)
+
+    _expire_status(batch_id)
+    frappe.publish_realtime(
+        BULK_PROGRESS_EVENT,
+        get_bulk_purchase_invoice_status(batch_id, include_invoices=0),
+        user=frappe.session.user
+    )
+
+
+@frappe.whitelist()
+def get_bulk_purchase_invoice_status(batch_id, include_invoices=1):
+    """
+    Progress of a bulk batch.
+
+    Returns:
+        {"batch_id", "total", "queued", "created", "failed", "progress",
+        "invoices": [{"source", "status", "name" | "message"}, ...]}
+    """
+    meta = frappe.cache().get_value(_get_meta_key(batch_id))
+    if not meta:
+        frappe.throw(_("Batch {0} tidak ditemukan atau sudah kedaluwarsa.").format(batch_id), frappe.DoesNotExistError)
+    if meta.get("owner") != frappe.session.user and "System Manager" not in frappe.get_roles():
+        frappe.throw(_("Tidak diizinkan melihat batch {0}.").format(batch_id), frappe.PermissionError)
+
+    statuses = frappe.cache().hgetall(_get_status_key(batch_id)) or {}
+    # Hash keys come back from Redis as bytes
+    invoices = [statuses[index] for index in sorted(statuses, key=lambda index: cint(frappe.safe_decode(index)))]
+
+    counts = {"Queued": 0, "Created": 0, "Failed": 0}
+    for status in invoices:
+        counts[status["status"]] += 1
+
+    total = meta["total"]
+    result = {
+        "batch_id": batch_id,
+        "total": total,
+        "queued": counts["Queued"],
+        "created": counts["Created"],
+        "failed": counts["Failed"],
+        "progress": round((total - counts["Queued"]) * 100.0 / total, 2) if total else 100
+    }
+    if cint(include_invoices):
+        result["invoices"] = invoices
+
+    return result
+
+
+def _make_bulk_purchase_invoice(entry):
+    if entry.get("invoice_data"):
+        return make_purchase_invoice(entry["invoice_data"])
+
+    from erpnext.stock.doctype.purchase_receipt.purchase_receipt import make_purchase_invoice as make_pi_from_pr
+
+    pi = make_pi_from_pr(entry["purchase_receipt"])
+    if not pi.items:
+        frappe.throw(_("Purchase Receipt {0} sudah ditagih penuh.").format(entry["purchase_receipt"]))
+
+    pi.insert()
+    if entry.get("submit"):
+        pi.submit()
+
+    return pi
+
+
+def _get_entry_source(entry):
+    if entry.get("purchase_receipt"):
+        return entry["purchase_receipt"]
+
+    invoice_data = entry["invoice_data"]
+    receipts = sorted({
+        item.get("purchase_receipt") for item in invoice_data.get("items", []) if item.get("purchase_receipt")
+    })
+    return ", ".join(receipts) or invoice_data.get("supplier")
+
+
+def _get_status_key(batch_id):
+    return f"{BULK_STATUS_KEY}|{batch_id}"
+
+
+def _get_meta_key(batch_id):
+    return f"{BULK_STATUS_KEY}_meta|{batch_id}"
+
+
+def _expire_status(batch_id):
+    cache = frappe.cache()
+    cache.expire(cache.make_key(_get_status_key(batch_id)), BULK_STATUS_TTL)
@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Warkat (giro / cheque) clearing and bounce
+
+Whitelisted replacements for the `clear_warkat_payment` and
+`bounce_warkat_payment` API server scripts, routed from the bare method names
+through `override_whitelisted_methods`, plus batch endpoints for a bank
+statement day:
+
+- `clear_warkat_payments`: Dr Bank / Cr Warkat for many Payment Entries
+- `bounce_warkat_payments`: reverse the warkat and cancel the Payment Entries
+
+All Payment Entries of a batch are validated with one projection query (mode
+of payment and account types joined in) and one Auto Journal Registry lookup
+for earlier clearing/bounce journals. Valid entries are posted by one
+background job that commits each Payment Entry on its own; per-entry results
+are read back with `get_warkat_batch_status`.
+"""
+
+from __future__ import unicode_literals
+import frappe
+from frappe.utils import today
+
+from batasku_custom.batasku_custom.doctype.auto_journal_registry.auto_journal_registry import (
+    WARKAT_BOUNCE,
+    WARKAT_CLEAR,
+    claim_sources,
+    get_registered_sources,
+    set_journal_entry
+)
+
+CLEAR = "clear"
+BOUNCE = "bounce"
+
+CLEAR_REMARK = "CLEAR WARKAT dari Payment Entry "
+BOUNCE_REMARK = "BOUNCE WARKAT dari Payment Entry "
+
+MAX_BATCH_SIZE = 500
+# Batch results are kept for a day
+BATCH_STATUS_TTL = 24 * 60 * 60
+BATCH_STATUS_KEY = "batasku_warkat_batch"
+BATCH_PROGRESS_EVENT = "warkat_batch_progress"
+
+
+@frappe.whitelist()
+def clear_warkat_payment(payment_entry=None, bank_account=None, company=None, clearance_date=None):
+    """Cair-kan satu warkat: Dr Bank / Cr akun Paid From"""
+    if not payment_entry:
+        frappe.throw("Parameter payment_entry wajib dikirim")
+    if not bank_account:
+        frappe.throw("Parameter bank_account wajib dikirim")
+    if not company:
+        frappe.throw("Parameter company wajib dikirim")
+
+    validate_bank_account(bank_account)
+    pe = get_valid_payment_entries([payment_entry], company, CLEAR, throw=True)[payment_entry]
+
+    je = make_clearing_entry(pe, bank_account, clearance_date)
+
+    return {
+        "success": True,
+        "journal_entry": je.name,
+        "payment_entry": pe.name,
+        "status": "Cleared",
+        "clearance_date": clearance_date
+    }
+
+
+@frappe.whitelist()
+def bounce_warkat_payment(payment_entry=None, company=None, reason=None):
+    """Tolak satu warkat: JE pembalik lalu cancel Payment Entry"""
+    if not payment_entry:
+        frappe.throw("Parameter payment_entry wajib dikirim")
+    if not company:
+        frappe.throw("Parameter company wajib dikirim")
+
+    pe = get_valid_payment_entries([payment_entry], company, BOUNCE, throw=True)[payment_entry]
+
+    je, pe_doc = make_bounce_entry(pe, reason or "-")
+
+    return {
+        "success": True,
+        "journal_entry": je.name,
+        "payment_entry": pe.name,
+        "payment_entry_status": pe_doc.docstatus,
+        "status": "Bounced"
+    }
+
+
+@frappe.whitelist()
+def clear_warkat_payments(payment_entries=None, bank_account=None, company=None, clearance_date=None):
+    """
+    Clear many warkat Payment Entries in a background job.
+
+    Args:
+        payment_entries: JSON list of Payment Entry names
+        bank_account: Bank account debited
+        company: Company of the Payment Entries
+        clearance_date: Set on the Payment Entries when given
+
+    Returns:
+        {"batch_id", "queued": [...], "results": [{"payment_entry", "status", "message"}]}
+        where results holds the entries rejected by validation
+    """
+    if not bank_account:
+        frappe.throw("Parameter bank_account wajib dikirim")
+    validate_bank_account(bank_account)
+
+    return enqueue_warkat_batch(CLEAR, payment_entries, company, bank_account=bank_account, clearance_date=clearance_date)
+
+
+@frappe.whitelist()
+def bounce_warkat_payments(payment_entries=None, company=None, reason=None):
+    """
+    Bounce many warkat Payment Entries in a background job.
+
+    Args:
+        payment_entries: JSON list of Payment Entry names
+        company: Company of the Payment Entries
+        reason: Alasan, written in the Journal Entry remark
+
+    Returns:
+        Same as `clear_warkat_payments`
+    """
+    return enqueue_warkat_batch(BOUNCE, payment_entries, company, reason=reason or "-")
+
+
+@frappe.whitelist()
+def get_warkat_batch_status(batch_id):
+    """Per-entry results of a warkat batch"""
+    status = frappe.cache().get_value(_get_status_key(batch_id))
+    if not status:
+        frappe.throw(f"Batch {batch_id} tidak ditemukan atau sudah kedaluwarsa.", frappe.DoesNotExistError)
+    if status["owner"] != frappe.session.user and "System Manager" not in frappe.get_roles():
+        frappe.throw(f"Tidak diizinkan melihat batch {batch_id}.", frappe.PermissionError)
+    return status
+
+
+def enqueue_warkat_batch(action, payment_entries, company, **kwargs):
+    frappe.has_permission("Journal Entry", "create", throw=True)
+
+    payment_entries = frappe.parse_json(payment_entries) or []
+    if not payment_entries:
+        frappe.throw("Parameter payment_entries wajib dikirim")
+    if not company:
+        frappe.throw("Parameter company wajib dikirim")
+    if len(payment_entries) > MAX_BATCH_SIZE:
+        frappe.throw(f"Maksimal {MAX_BATCH_SIZE} Payment Entry per batch.")
+
+    results = {}
+    valid = get_valid_payment_entries(payment_entries, company, action, errors=results)
+
+    batch_id = frappe.generate_hash(length=12)
+    status = {
+        "batch_id": batch_id,
+        "action": action,
+        "owner": frappe.session.user,
+        "total": len(payment_entries),
+        "results": {name: {"status": "Queued"} for name in valid}
+    }
+    status["results"].update({name: {"status": "Failed", "message": message} for name, message in results.items()})
+    frappe.cache().set_value(_get_status_key(batch_id), status, expires_in_sec=BATCH_STATUS_TTL)
+
+    if valid:
+        frappe.enqueue(
+            "batasku_custom.api.warkat.process_warkat_batch",
+            queue="long",
+            timeout=3600,
+            enqueue_after_commit=True,
+            batch_id=batch_id,
+            action=action,
+            payment_entries=list(valid),
+            company=company,
+            **kwargs
+        )
+
+    return {
+        "batch_id": batch_id,
+        "queued": list(valid),
+        "results": [
+            {"payment_entry": name, "status": "Failed", "message": message}
+            for name, message in results.items()
+        ]
+    }
+
+
+def process_warkat_batch(batch_id, action, payment_entries, company, bank_account=None, clearance_date=None, reason=None):
+    """
+    Background job: post the clearing or bounce journal of every entry.
+
+    Entries are validated again first, since another request may have
+    processed them meanwhile. Each entry is committed on its own; a failure
+    is rolled back and recorded without stopping the batch.
+    """
+    errors = {}
+    valid = get_valid_payment_entries(payment_entries, company, action, errors=errors)
+    results = {name: {"status": "Failed", "message": message} for name, message in errors.items()}
+
+    for name, pe in valid.items():
+        try:
+            if action == CLEAR:
+                je = make_clearing_entry(pe, bank_account, clearance_date)
+            else:
+                je = make_bounce_entry(pe, reason)[0]
+            frappe.db.commit()
+            results[name] = {"status": "Cleared" if action == CLEAR else "Bounced", "journal_entry": je.name}
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(title="Warkat Batch Error", message=f"{action} {name}\n\n{frappe.get_traceback()}")
+            results[name] = {"status": "Failed", "message": str(e)}
+        finally:
+            frappe.clear_messages()
+
+    cache = frappe.cache()
+    status = cache.get_value(_get_status_key(batch_id)) or {"batch_id": batch_id, "action": action, "results": {}}
+    status["results"].update(results)
+    cache.set_value(_get_status_key(batch_id), status, expires_in_sec=BATCH_STATUS_TTL)
+
+    frappe.publish_realtime(BATCH_PROGRESS_EVENT, status, user=frappe.session.user)
+
+
+def get_valid_payment_entries(names, company, action, errors=None, throw=False):
+    """
+    Validate warkat Payment Entries with set-based queries.
+
+    Args:
+        names: Payment Entry names
+        company: Expected company
+        action: CLEAR or BOUNCE
+        errors: dict filled with {name: message} for rejected entries
+        throw: Throw on the first rejected entry instead
+
+    Returns:
+        {name: Payment Entry projection row} of the valid entries
+    """
+    if errors is None:
+        errors = {}
+
+    names = list(dict.fromkeys(names))
+    rows = {
+        row.name: row for row in frappe.db.sql("""
+            SELECT pe.name, pe.company, pe.docstatus, pe.payment_type, pe.posting_date,
+                pe.paid_from, pe.paid_to, pe.paid_amount, pe.party_type, pe.party,
+                pe.reference_no, pe.reference_date,
+                mop.type AS mode_type,
+                paid_from.name AS paid_from_account,
+                paid_from.account_type AS paid_from_account_type,
+                paid_from.root_type AS paid_from_root_type,
+                paid_to.name AS paid_to_account,
+                paid_to.root_type AS paid_to_root_type
+            FROM `tabPayment Entry` pe
+            LEFT JOIN `tabMode of Payment` mop ON mop.name = pe.mode_of_payment
+            LEFT JOIN `tabAccount` paid_from ON paid_from.name = pe.paid_from
+            LEFT JOIN `tabAccount` paid_to ON paid_to.name = pe.paid_to
+            WHERE pe.name IN %(names)s
+        """, {"names": tuple(names)}, as_dict=True)
+    }
+    processed = get_processed_payment_entries(names, action)
+
+    valid = {}
+    for name in names:
+        message = get_warkat_error(rows.get(name), name, company, action, processed)
+        if not message:
+            valid[name] = rows[name]
+        elif throw:
+            frappe.throw(message)
+        else:
+            errors[name] = message
+
+    return valid
+
+
+def get_warkat_error(pe, name, company, action, processed):
+    """Validation message for one Payment Entry, or None"""
+    if not pe:
+        return f"Payment Entry {name} tidak ditemukan"
+    if pe.company != company:
+        return "Company mismatch"
+    if pe.docstatus != 1:
+        return "Payment Entry harus Submitted"
+
+    # Validasi Mode of Payment = Warkat (Bank)
+    if pe.mode_type != "Bank":
+        return "Payment Entry bukan transaksi Warkat"
+
+    # Validasi Double Processing
+    if name in processed:
+        return "Warkat sudah pernah dicairkan" if action == CLEAR else "Warkat sudah pernah ditolak"
+
+    if not pe.paid_from_account:
+        return f"Akun Paid From tidak ditemukan: {pe.paid_from}"
+
+    # Paid From
+    if pe.payment_type == "Pay":
+        if pe.paid_from_root_type != "Asset" or pe.paid_from_account_type != "Current Asset":
+            if action == CLEAR:
+                return f"Paid From harus akun Asset / Current Asset. Saat ini: {pe.paid_from}"
+            return f"Paid From bukan akun Warkat Keluar (Asset - Current Asset). Saat ini: {pe.paid_from}"
+    elif pe.payment_type == "Receive":
+        if pe.paid_from_root_type != "Asset":
+            return f"Paid From harus akun Asset (Piutang / Warkat Masuk). Saat ini: {pe.paid_from}"
+
+    if action == BOUNCE:
+        if not pe.paid_to_account:
+            return f"Akun Paid To tidak ditemukan: {pe.paid_to}"
+
+        # Paid To
+        if pe.payment_type == "Pay":
+            if pe.paid_to_root_type != "Liability":
+                return f"Paid To harus akun Liability (Hutang Dagang). Saat ini: {pe.paid_to}"
+        elif pe.payment_type == "Receive":
+            if pe.paid_to_root_type != "Asset":
+                return f"Paid To harus akun Asset (Bank / Warkat Masuk). Saat ini: {pe.paid_to}"
+
+    return None
+
+
+def get_processed_payment_entries(names, action):
+    """Payment Entries that already have a clearing / bounce Journal Entry"""
+    return set(get_registered_sources("Payment Entry", names, get_purpose(action)))
+
+
+def get_purpose(action):
+    return WARKAT_CLEAR if action == CLEAR else WARKAT_BOUNCE
+
+
+def validate_bank_account(bank_account):
+    bank_acc = frappe.db.get_value("Account", bank_account, ["account_type", "root_type", "disabled"], as_dict=True)
+    if not bank_acc:
+        frappe.throw(f"Akun Bank tidak ditemukan: {bank_account}")
+    if bank_acc.disabled:
+        frappe.throw(f"Akun Bank {bank_account} dinonaktifkan, tidak bisa digunakan")
+    if bank_acc.root_type != "Asset":
+        frappe.throw(f"Akun Bank {bank_account} harus Asset")
+
+
+def make_clearing_entry(pe, bank_account, clearance_date=None):
+    """Journal Entry Warkat → Bank for a validated Payment Entry row"""
+    claim_sources("Payment Entry", [pe.name], WARKAT_CLEAR, company=pe.company)
+
+    je = frappe.new_doc("Journal Entry")
+    je.voucher_type = "Bank Entry"
+    je.company = pe.company
+    je.posting_date = today()
+    je.user_remark = f"{CLEAR_REMARK}{pe.name}"
+
+    # Tambahkan nomor & tanggal warkat jika ada
+    if pe.get("reference_no"):
+        je.cheque_no = pe.reference_no
+    if pe.get("reference_date"):
+        je.cheque_date = pe.reference_date
+
+    # Debit Bank, Kredit Warkat (Keluar: Asset, Masuk: Asset / Piutang)
+    je.append("accounts", {
+        "account": bank_account,
+        "debit_in_account_currency": pe.paid_amount
+    })
+    credit = {
+        "account": pe.paid_from,
+        "credit_in_account_currency": pe.paid_amount
+    }
+    if pe.payment_type == "Receive":
+        credit.update({"party_type": pe.party_type, "party": pe.party})
+    je.append("accounts", credit)
+
+    # Insert & submit
+    je.insert(ignore_permissions=True)
+    je.submit()
+    set_journal_entry("Payment Entry", [pe.name], WARKAT_CLEAR, je.name)
+
+    # Update Clearance Date Payment Entry (opsional)
+    if clearance_date:
+        frappe.db.set_value("Payment Entry", pe.name, "clearance_date", clearance_date)
+
+    return je
+
+
+def make_bounce_entry(pe, reason):
+    """Reversing Journal Entry, then cancel the Payment Entry; returns (je, pe_doc)"""
+    claim_sources("Payment Entry", [pe.name], WARKAT_BOUNCE, company=pe.company)
+
+    je = frappe.new_doc("Journal Entry")
+    je.voucher_type = "Journal Entry"
+    je.company = pe.company
+    je.posting_date = today()
+    je.user_remark = f"{BOUNCE_REMARK}{pe.name}. Alasan: {reason}"
+
+    if pe.payment_type == "Pay":
+        je.append("accounts", {"account": pe.paid_from, "debit_in_account_currency": pe.paid_amount})
+        je.append("accounts", {"account": pe.paid_to, "credit_in_account_currency": pe.paid_amount, "party_type": "Supplier", "party": pe.party})
+    elif pe.payment_type == "Receive":
+        je.append("accounts", {"account": pe.paid_to, "debit_in_account_currency": pe.paid_amount})
+        je.append("accounts", {"account": pe.paid_from, "credit_in_account_currency": pe.paid_amount, "party_type": pe.party_type, "party": pe.party})
+
+    # Insert & submit Journal Entry
+    je.insert(ignore_permissions=True)
+    je.submit()
+    set_journal_entry("Payment Entry", [pe.name], WARKAT_BOUNCE, je.name)
+
+    # Cancel Payment Entry
+    pe_doc = frappe.get_doc("Payment Entry", pe.name)
+    pe_doc.cancel()
+
+    return je, pe_doc
+
+
+def _get_status_key(batch_id):
+    return f"{BATCH_STATUS_KEY}|{batch_id}"
@@ -0,0 +1,232 @@
+# Copyright (c) 2026, batasku and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, flt, getdate, now
+
+DOCTYPE = "Account Balance Snapshot"
+
+
+class AccountBalanceSnapshot(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index(DOCTYPE, ["company", "period_end_date"])
+
+
+def on_period_status_change(periods, status):
+	"""
+	Freeze balances of periods that were closed, drop them for reopened ones.
+
+	Called after the status of the periods changed, from the Accounting Period
+	controller and from the bulk close / reopen job. Snapshots are built by a
+	background job once the status change is committed.
+	"""
+	if not periods:
+		return
+
+	if status == "Open":
+		drop_snapshots(periods)
+	elif status == "Closed":
+		enqueue_snapshots(periods)
+
+
+def on_closed_period_override(period):
+	"""
+	Rebuild the snapshots of a closed period a transaction was allowed into.
+
+	Called from the closed period validation when an override is allowed. The
+	snapshot of the period and the later ones built on it are dropped in the
+	caller's transaction and rebuilt once it commits, so a rolled back
+	transaction leaves them untouched.
+	"""
+	# Once per period and transaction
+	overridden = frappe.flags.setdefault("batasku_snapshot_overrides", set())
+	if period in overridden:
+		return
+	overridden.add(period)
+	frappe.db.after_commit.add(overridden.clear)
+	frappe.db.after_rollback.add(overridden.clear)
+
+	drop_snapshots([period])
+	enqueue_snapshots([period])
+
+
+def enqueue_snapshots(periods):
+	frappe.enqueue(
+		"batasku_custom.batasku_custom.doctype.account_balance_snapshot.account_balance_snapshot.make_snapshots",
+		queue="long",
+		timeout=3600,
+		enqueue_after_commit=True,
+		periods=list(periods),
+	)
+
+
+def make_snapshots(periods):
+	"""
+	Build the snapshots of closed periods and of the later closed periods of
+	their companies, which are built on top of them. Oldest first, committing
+	each period.
+	"""
+	for period in get_snapshot_periods(periods):
+		make_snapshot(period)
+		frappe.db.commit()
+
+
+def get_snapshot_periods(periods):
+	"""Closed periods ending on or after the earliest start of the given periods, per company"""
+	earliest = {}
+	for period in frappe.get_all(
+		"Accounting Period", filters={"name": ["in", periods]}, fields=["company", "start_date"]
+	):
+		if period.company not in earliest or period.start_date < earliest[period.company]:
+			earliest[period.company] = period.start_date
+
+	snapshot_periods = []
+	for company, start_date in earliest.items():
+		snapshot_periods += frappe.get_all(
+			"Accounting Period",
+			filters={
+				"company": company,
+				"status": ["in", ("Closed", "Permanently Closed")],
+				"end_date": [">=", start_date],
+			},
+			fields=["name", "company", "start_date", "end_date"],
+			order_by="end_date asc",
+		)
+
+	return snapshot_periods
+
+
+def make_snapshot(period):
+	"""
+	Freeze the GL balance per (account, cost center) at the end of a period.
+
+	Starts from the latest earlier snapshot of the company and adds one
+	grouped GL Entry query for the rows after it, so only the GL of the gap
+	is scanned.
+	"""
+	frappe.db.delete(DOCTYPE, {"accounting_period": period.name})
+
+	start_date = getdate(period.start_date)
+	end_date = getdate(period.end_date)
+
+	previous = get_latest_snapshot_date(period.company, add_days(start_date, -1))
+	balances = {}
+	if previous:
+		for row in get_snapshot_rows(period.company, previous):
+			balances[(row.account, row.cost_center)] = [flt(row.debit), flt(row.credit), 0, 0]
+
+	for row in frappe.db.sql(
+		"""
+		SELECT account, cost_center,
+			SUM(debit) AS debit, SUM(credit) AS credit,
+			SUM(IF(posting_date >= %(start_date)s, debit, 0)) AS period_debit,
+			SUM(IF(posting_date >= %(start_date)s, credit, 0)) AS period_credit
+		FROM `tabGL Entry`
+		WHERE company = %(company)s
+			AND is_cancelled = 0
+			AND posting_date > %(from_date)s
+			AND posting_date <= %(end_date)s
+		GROUP BY account, cost_center
+		""",
+		{
+			"company": period.company,
+			"start_date": start_date,
+			"end_date": end_date,
+			# Without an earlier snapshot the whole GL up to the end date is read
+			"from_date": previous or "1900-01-01",
+		},
+		as_dict=True,
+	):
+		balance = balances.setdefault((row.account, row.cost_center), [0, 0, 0, 0])
+		balance[0] += flt(row.debit)
+		balance[1] += flt(row.credit)
+		balance[2] += flt(row.period_debit)
+		balance[3] += flt(row.period_credit)
+
+	timestamp = now()
+	user = frappe.session.user
+	frappe.db.bulk_insert(
+		DOCTYPE,
+		fields=[
+			"name", "accounting_period", "company", "period_end_date", "account", "cost_center",
+			"debit", "credit", "period_debit", "period_credit", "creation", "modified", "owner", "modified_by",
+		],
+		values=[
+			(
+				frappe.generate_hash(length=10), period.name, period.company, end_date, account, cost_center,
+				debit, credit, period_debit, period_credit, timestamp, timestamp, user, user,
+			)
+			for (account, cost_center), (debit, credit, period_debit, period_credit) in balances.items()
+		],
+	)
+
+
+def drop_snapshots(periods):
+	"""
+	Drop the snapshots of reopened periods and every later snapshot of their
+	companies, which were built on top of them.
+	"""
+	for period in frappe.get_all(
+		"Accounting Period", filters={"name": ["in", periods]}, fields=["company", "start_date"]
+	):
+		frappe.db.delete(DOCTYPE, {"company": period.company, "period_end_date": [">=", period.start_date]})
+
+
+def get_latest_snapshot_date(company, as_of_date):
+	"""End date of the latest snapshot of a company on or before a date, or None"""
+	return frappe.db.get_value(
+		DOCTYPE,
+		{"company": company, "period_end_date": ["<=", as_of_date]},
+		"period_end_date",
+		order_by="period_end_date desc",
+	)
+
+
+def get_snapshot_rows(company, period_end_date):
+	return frappe.get_all(
+		DOCTYPE,
+		filters={"company": company, "period_end_date": period_end_date},
+		fields=["account", "cost_center", "debit", "credit"],
+	)
+
+
+def get_account_balances(company, to_date):
+	"""
+	Balance per (account, cost center) at a date, for reports.
+
+	Reads the latest snapshot on or before the date and only the GL Entry
+	rows after it.
+
+	Returns:
+		{(account, cost_center): {"debit", "credit"}}
+	"""
+	to_date = getdate(to_date)
+	snapshot_date = get_latest_snapshot_date(company, to_date)
+
+	balances = {}
+	if snapshot_date:
+		for row in get_snapshot_rows(company, snapshot_date):
+			balances[(row.account, row.cost_center)] = {"debit": flt(row.debit), "credit": flt(row.credit)}
+
+	for row in frappe.db.sql(
+		"""
+		SELECT account, cost_center, SUM(debit) AS debit, SUM(credit) AS credit
+		FROM `tabGL Entry`
+		WHERE company = %(company)s
+			AND is_cancelled = 0
+			AND posting_date > %(from_date)s
+			AND posting_date <= %(to_date)s
+		GROUP BY account, cost_center
+		""",
+		{"company": company, "from_date": snapshot_date or "1900-01-01", "to_date": to_date},
+		as_dict=True,
+	):
+		balance = balances.setdefault((row.account, row.cost_center), {"debit": 0.0, "credit": 0.0})
+		balance["debit"] += flt(row.debit)
+		balance["credit"] += flt(row.credit)
+
+	return balances
@@ -0,0 +1,162 @@
+# Copyright (c) 2026, batasku and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, add_months, flt, get_first_day, get_last_day, getdate, nowdate
+
+from batasku_custom.accounting_period_restrictions import _reset_closed_period_cache
+from batasku_custom.batasku_custom.doctype.account_balance_snapshot.account_balance_snapshot import (
+	get_account_balances,
+)
+
+COMPANY = "_Test Company"
+DEBIT_ACCOUNT = "_Test Bank - _TC"
+CREDIT_ACCOUNT = "_Test Cash - _TC"
+COST_CENTER = "_Test Cost Center - _TC"
+SNAPSHOT_JOB = "account_balance_snapshot.make_snapshots"
+
+
+class TestAccountBalanceSnapshot(FrappeTestCase):
+	def setUp(self):
+		# Snapshot jobs are captured and run by run_snapshot_jobs
+		self.enqueue = patch("frappe.enqueue").start()
+		self.addCleanup(patch.stopall)
+
+		# Two consecutive months well in the past, then an open month
+		self.first_start = getdate(get_first_day(add_months(nowdate(), -30)))
+		self.second_start = getdate(add_months(self.first_start, 1))
+		self.open_date = add_days(add_months(self.first_start, 2), 9)
+
+		self.post(add_days(self.first_start, 4), 1000)
+		self.post(add_days(self.second_start, 4), 250)
+		self.post(self.open_date, 75)
+
+		self.first = self.make_period(self.first_start)
+		self.second = self.make_period(self.second_start)
+
+	def tearDown(self):
+		frappe.db.rollback()
+		# The closed period index outlives the rollback
+		_reset_closed_period_cache()
+
+	def test_balances_after_closing_two_periods(self):
+		self.set_status(self.first, "Closed")
+		self.set_status(self.second, "Closed")
+
+		self.assertTrue(self.has_snapshot(self.first))
+		self.assertTrue(self.has_snapshot(self.second))
+		self.assert_balances_match_gl()
+
+		# The second snapshot carries the first forward and splits out its own movement
+		period_debit = frappe.db.get_value(
+			"Account Balance Snapshot",
+			{"accounting_period": self.second.name, "account": DEBIT_ACCOUNT},
+			"period_debit",
+		)
+		self.assertEqual(flt(period_debit, 2), 250)
+
+	def test_balances_after_reopening_and_closing_again(self):
+		self.set_status(self.first, "Closed")
+		self.set_status(self.second, "Closed")
+
+		# Reopening drops the period's snapshot and the later ones built on it
+		self.set_status(self.first, "Open")
+		self.assertFalse(self.has_snapshot(self.first))
+		self.assertFalse(self.has_snapshot(self.second))
+		self.assert_balances_match_gl()
+
+		# Closing it again rebuilds both
+		self.set_status(self.first, "Closed")
+		self.assertTrue(self.has_snapshot(self.first))
+		self.assertTrue(self.has_snapshot(self.second))
+		self.assert_balances_match_gl()
+
+	def test_balances_after_override_posting(self):
+		self.set_status(self.first, "Closed")
+		self.set_status(self.second, "Closed")
+
+		# A period that does not close Journal Entries lets the override
+		# through the ERPNext check; the app's validation logs and allows it
+		frappe.db.set_value(
+			"Closed Document", {"parent": self.first.name, "document_type": "Journal Entry"}, "closed", 0
+		)
+		self.post(add_days(self.first_start, 19), 500)
+
+		self.assertFalse(self.has_snapshot(self.first))
+		self.assertFalse(self.has_snapshot(self.second))
+
+		self.run_snapshot_jobs()
+		self.assertTrue(self.has_snapshot(self.first))
+		self.assertTrue(self.has_snapshot(self.second))
+		self.assert_balances_match_gl()
+
+	def post(self, posting_date, amount):
+		return make_journal_entry(
+			DEBIT_ACCOUNT, CREDIT_ACCOUNT, amount, cost_center=COST_CENTER, posting_date=posting_date, submit=True
+		)
+
+	def make_period(self, start_date):
+		return frappe.get_doc(
+			{
+				"doctype": "Accounting Period",
+				"period_name": f"_Test Snapshot {start_date.strftime('%Y-%m')}",
+				"company": COMPANY,
+				"start_date": start_date,
+				"end_date": get_last_day(start_date),
+				"period_type": "Monthly",
+			}
+		).insert()
+
+	def set_status(self, period, status):
+		period.reload()
+		period.status = status
+		period.save()
+		self.run_snapshot_jobs()
+
+	def run_snapshot_jobs(self):
+		"""Run the snapshot jobs enqueued so far, without committing the test data"""
+		calls = [call for call in self.enqueue.call_args_list if call.args[0].endswith(SNAPSHOT_JOB)]
+		self.enqueue.reset_mock()
+
+		with patch.object(frappe.db, "commit"):
+			for call in calls:
+				frappe.get_attr(call.args[0])(periods=call.kwargs["periods"])
+
+	def has_snapshot(self, period):
+		return bool(frappe.db.exists("Account Balance Snapshot", {"accounting_period": period.name}))
+
+	def assert_balances_match_gl(self):
+		for date in (
+			self.first.end_date,
+			add_days(self.second_start, 9),
+			self.second.end_date,
+			self.open_date,
+		):
+			self.assertEqual(get_snapshot_balances(date), get_gl_balances(date), msg=f"balances at {date}")
+
+
+def get_snapshot_balances(to_date):
+	return {
+		key: (flt(balance["debit"], 2), flt(balance["credit"], 2))
+		for key, balance in get_account_balances(COMPANY, to_date).items()
+	}
+
+
+def get_gl_balances(to_date):
+	return {
+		(row.account, row.cost_center): (flt(row.debit, 2), flt(row.credit, 2))
+		for row in frappe.db.sql(
+			"""
+			SELECT account, cost_center, SUM(debit) AS debit, SUM(credit) AS credit
+			FROM `tabGL Entry`
+			WHERE company = %(company)s AND is_cancelled = 0 AND posting_date <= %(to_date)s
+			GROUP BY account, cost_center
+			""",
+			{"company": COMPANY, "to_date": getdate(to_date)},
+			as_dict=True,
+		)
+	}
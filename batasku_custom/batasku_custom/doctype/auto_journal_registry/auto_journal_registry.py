@@ -0,0 +1,117 @@
+# Copyright (c) 2026, batasku and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import now
+
+from batasku_custom.instrumentation import instrumented
+
+DOCTYPE = "Auto Journal Registry"
+
+COMMISSION_ACCRUAL = "Commission Accrual"
+COMMISSION_REVERSAL = "Commission Reversal"
+COMMISSION_PAYMENT = "Commission Payment"
+WARKAT_CLEAR = "Warkat Clear"
+WARKAT_BOUNCE = "Warkat Bounce"
+
+
+class AutoJournalRegistry(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_unique(DOCTYPE, ("source_doctype", "source_name", "purpose"), constraint_name="unique_source_purpose")
+
+
+def get_registered_sources(source_doctype, source_names, purpose):
+	"""Return {source name: journal entry} of the sources already registered for a purpose"""
+	if not source_names:
+		return {}
+
+	return dict(
+		frappe.db.sql(
+			"""
+			SELECT source_name, journal_entry
+			FROM `tabAuto Journal Registry`
+			WHERE source_doctype = %(source_doctype)s
+				AND purpose = %(purpose)s
+				AND source_name IN %(source_names)s
+			""",
+			{"source_doctype": source_doctype, "purpose": purpose, "source_names": tuple(source_names)},
+		)
+	)
+
+
+def claim_sources(source_doctype, source_names, purpose, company=None):
+	"""
+	Register sources for a purpose before their Journal Entry is created.
+
+	The unique (source_doctype, source_name, purpose) index makes a concurrent
+	claim for the same source wait for this transaction and then fail, so a
+	source can only get one Journal Entry per purpose. The claim is rolled back
+	with the transaction if the Journal Entry is not created.
+	"""
+	timestamp = now()
+	user = frappe.session.user
+	rows = [
+		(frappe.generate_hash(length=10), source_doctype, source_name, purpose, company, timestamp, timestamp, user, user)
+		for source_name in source_names
+	]
+
+	try:
+		frappe.db.bulk_insert(
+			DOCTYPE,
+			fields=["name", "source_doctype", "source_name", "purpose", "company", "creation", "modified", "owner", "modified_by"],
+			values=rows,
+		)
+	except Exception as e:
+		if not frappe.db.is_duplicate_entry(e):
+			raise
+		registered = get_registered_sources(source_doctype, source_names, purpose)
+		frappe.throw(
+			"{0} sudah memiliki Journal Entry {1}: {2}".format(
+				source_doctype, purpose, ", ".join(sorted(registered) or source_names)
+			),
+			frappe.DuplicateEntryError,
+		)
+
+
+def set_journal_entry(source_doctype, source_names, purpose, journal_entry):
+	"""Link claimed sources to the Journal Entry created for them"""
+	frappe.db.sql(
+		"""
+		UPDATE `tabAuto Journal Registry`
+		SET journal_entry = %(journal_entry)s
+		WHERE source_doctype = %(source_doctype)s
+			AND purpose = %(purpose)s
+			AND source_name IN %(source_names)s
+		""",
+		{
+			"journal_entry": journal_entry,
+			"source_doctype": source_doctype,
+			"purpose": purpose,
+			"source_names": tuple(source_names),
+		},
+	)
+
+
+@instrumented
+def on_journal_entry_cancel(doc, method=None):
+	"""Release the sources of a cancelled Journal Entry so they can be posted again"""
+	paid_invoices = frappe.get_all(
+		DOCTYPE,
+		filters={"journal_entry": doc.name, "purpose": COMMISSION_PAYMENT, "source_doctype": "Sales Invoice"},
+		pluck="source_name",
+	)
+	if paid_invoices:
+		frappe.db.sql(
+			"""
+			UPDATE `tabSales Invoice`
+			SET custom_commission_paid = 0
+			WHERE name IN %(names)s
+			""",
+			{"names": tuple(paid_invoices)},
+		)
+
+	frappe.db.delete(DOCTYPE, {"journal_entry": doc.name})
@@ -0,0 +1,8 @@
+// Copyright (c) 2026, batasku and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Sales Commission Fact", {
+// 	refresh(frm) {
+
+// 	},
+// });
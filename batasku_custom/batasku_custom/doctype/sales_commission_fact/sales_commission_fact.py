@@ -0,0 +1,210 @@
+# Copyright (c) 2026, batasku and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.core.doctype.user_permission.user_permission import get_user_permissions
+from frappe.model.document import Document
+from frappe.utils import now
+
+from batasku_custom.commission import compute_fact_values
+from batasku_custom.hpp import resolve_hpp
+from batasku_custom.instrumentation import instrumented
+
+FACT_FIELDS = (
+	"sales_invoice",
+	"sales_invoice_item",
+	"idx",
+	"posting_date",
+	"company",
+	"customer",
+	"customer_name",
+	"sales_person",
+	"is_return",
+	"return_against",
+	"item_code",
+	"item_name",
+	"qty",
+	"rate",
+	"price_list_rate",
+	"hpp_rate",
+	"financial_cost_percent",
+	"commission_rate",
+	"sales",
+	"hpp_base",
+	"financial_cost",
+	"hpp_total",
+	"gross_profit_before_overhead",
+	"gross_profit",
+	"valuation_margin_zone",
+	"valuation_base_profit",
+	"valuation_commission",
+	"valuation_company_margin",
+	"margin_margin_zone",
+	"margin_base_profit",
+	"margin_commission",
+	"margin_company_margin",
+)
+
+GROUP_BY_FIELDS = ("sales_invoice", "customer", "sales_person", "item_code")
+
+
+class SalesCommissionFact(Document):
+	pass
+
+
+@instrumented
+def on_sales_invoice_submit(doc, method=None):
+	"""Write one fact row per item of a submitted Sales Invoice or Credit Note"""
+	write_facts_for_invoice(doc)
+
+
+@instrumented
+def on_sales_invoice_cancel(doc, method=None):
+	"""Remove the facts of a cancelled Sales Invoice"""
+	delete_facts_for_invoices([doc.name])
+
+
+def write_facts_for_invoice(doc):
+	"""Replace the fact rows of a Sales Invoice document"""
+	delete_facts_for_invoices([doc.name])
+
+	if not doc.items:
+		return
+
+	# Last Sales Team row wins, as in the commission report
+	sales_person = doc.sales_team[-1].sales_person if doc.get("sales_team") else None
+	hpp_map = resolve_hpp(doc.items)
+
+	facts = [
+		compute_fact_values(item, doc, sales_person, hpp_map.get(item.name, 0))
+		for item in doc.items
+	]
+	insert_facts(facts, owner=doc.modified_by)
+
+
+def insert_facts(facts, owner=None):
+	"""Bulk insert computed fact rows; they are derived data, so no validation runs"""
+	if not facts:
+		return
+
+	timestamp = now()
+	owner = owner or frappe.session.user
+	columns = ("name", "creation", "modified", "owner", "modified_by", "docstatus", *FACT_FIELDS)
+	values = [
+		(frappe.generate_hash(length=10), timestamp, timestamp, owner, owner, 0)
+		+ tuple(fact.get(fieldname) for fieldname in FACT_FIELDS)
+		for fact in facts
+	]
+
+	frappe.db.bulk_insert("Sales Commission Fact", columns, values)
+
+
+def delete_facts_for_invoices(invoice_names):
+	if not invoice_names:
+		return
+
+	frappe.db.delete("Sales Commission Fact", {"sales_invoice": ("in", list(invoice_names))})
+
+
+def rebuild_sales_commission_facts(company=None, from_date=None, to_date=None, batch_size=200):
+	"""
+	Backfill facts for submitted Sales Invoices, committing per batch.
+
+	Run from a background job, see `enqueue_rebuild_sales_commission_facts`.
+	"""
+	filters = {"docstatus": 1}
+	if company:
+		filters["company"] = company
+	if from_date and to_date:
+		filters["posting_date"] = ["between", [from_date, to_date]]
+
+	invoice_names = frappe.get_all("Sales Invoice", filters=filters, pluck="name", order_by="posting_date, name")
+
+	for start in range(0, len(invoice_names), batch_size):
+		for name in invoice_names[start : start + batch_size]:
+			write_facts_for_invoice(frappe.get_doc("Sales Invoice", name))
+		frappe.db.commit()
+
+	return len(invoice_names)
+
+
+@frappe.whitelist()
+def enqueue_rebuild_sales_commission_facts(company=None, from_date=None, to_date=None):
+	"""Start a background rebuild of the Sales Commission Fact table"""
+	frappe.only_for(("System Manager", "Accounts Manager"))
+
+	frappe.enqueue(
+		"batasku_custom.batasku_custom.doctype.sales_commission_fact.sales_commission_fact.rebuild_sales_commission_facts",
+		queue="long",
+		timeout=3600,
+		company=company,
+		from_date=from_date,
+		to_date=to_date,
+	)
+	return {"success": True, "message": "Rebuild of Sales Commission Fact has been queued"}
+
+
+@frappe.whitelist()
+def get_sales_commission_summary(company=None, from_date=None, to_date=None, group_by="sales_person", mode="valuation"):
+	"""
+	Commission totals from the fact table with a single GROUP BY query.
+
+	Args:
+		group_by: One of sales_invoice, customer, sales_person, item_code
+		mode: "valuation" or "margin" (margin commission does not depend on include_hpp)
+	"""
+	frappe.has_permission("Sales Commission Fact", "read", throw=True)
+
+	if group_by not in GROUP_BY_FIELDS:
+		frappe.throw(f"group_by harus salah satu dari: {', '.join(GROUP_BY_FIELDS)}")
+
+	prefix = "margin_" if mode == "margin" else "valuation_"
+	conditions = ["1 = 1"]
+	if company:
+		conditions.append("company = %(company)s")
+
+	allowed_companies = get_allowed_companies()
+	if allowed_companies is not None:
+		if company and company not in allowed_companies:
+			frappe.throw(f"Tidak diizinkan melihat komisi company {company}.", frappe.PermissionError)
+		conditions.append("company IN %(allowed_companies)s")
+	if from_date:
+		conditions.append("posting_date >= %(from_date)s")
+	if to_date:
+		conditions.append("posting_date <= %(to_date)s")
+
+	where = " AND ".join(conditions)
+
+	return frappe.db.sql(
+		f"""
+		SELECT
+			{group_by} AS `key`,
+			COUNT(DISTINCT sales_invoice) AS invoice_count,
+			SUM(sales) AS sales,
+			SUM(hpp_total) AS hpp_total,
+			SUM(gross_profit) AS gross_profit,
+			SUM({prefix}commission) AS commission,
+			SUM({prefix}company_margin) AS company_margin,
+			SUM(CASE WHEN {prefix}commission > 0 THEN {prefix}commission ELSE 0 END) AS commission_positive,
+			SUM(CASE WHEN {prefix}commission < 0 THEN -{prefix}commission ELSE 0 END) AS commission_negative
+		FROM `tabSales Commission Fact`
+		WHERE {where}
+		GROUP BY {group_by}
+		ORDER BY commission DESC
+		""",
+		{
+			"company": company,
+			"from_date": from_date,
+			"to_date": to_date,
+			"allowed_companies": tuple(allowed_companies or ("",)),
+		},
+		as_dict=True,
+	)
+
+
+def get_allowed_companies():
+	"""Companies the user is restricted to by User Permissions, or None if unrestricted"""
+	permissions = get_user_permissions().get("Company")
+	if not permissions:
+		return None
+	return {permission.get("doc") for permission in permissions}
@@ -0,0 +1,73 @@
+# Copyright (c) 2026, batasku and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from batasku_custom.commission import (
+	MARGIN_FILTERS,
+	VALUATION_FILTERS,
+	compute_fact_values,
+	compute_item_row,
+	row_from_fact,
+)
+
+HPP = 7000
+
+
+def make_invoice(is_return=0):
+	return frappe._dict(
+		{
+			"name": "SI-TEST-CN" if is_return else "SI-TEST",
+			"posting_date": "2026-10-01",
+			"company": "_Test Company",
+			"customer": "_Test Customer",
+			"customer_name": "_Test Customer",
+			"is_return": is_return,
+			"return_against": "SI-TEST" if is_return else None,
+			"custom_persentase_komisi_si": 40,
+		}
+	)
+
+
+def make_item(invoice):
+	return frappe._dict(
+		{
+			"name": f"{invoice.name}-1",
+			"parent": invoice.name,
+			"idx": 1,
+			"item_code": "_Test Item",
+			"item_name": "_Test Item",
+			# ERPNext stores credit note quantities as negative
+			"qty": -2 if invoice.is_return else 5,
+			"rate": 12000,
+			"price_list_rate": 10000,
+			"margin_rate_or_amount": 1500,
+			"custom_financial_cost_percent": 2,
+		}
+	)
+
+
+class TestSalesCommissionFact(FrappeTestCase):
+	def test_fact_matches_report_for_invoice(self):
+		self.assert_fact_matches_report(make_invoice())
+
+	def test_fact_matches_report_for_credit_note(self):
+		self.assert_fact_matches_report(make_invoice(is_return=1))
+
+	def assert_fact_matches_report(self, invoice):
+		item = make_item(invoice)
+		fact = frappe._dict(compute_fact_values(item, invoice, "_Test Sales Person", HPP))
+
+		for filters in (VALUATION_FILTERS, MARGIN_FILTERS):
+			expected = compute_item_row(item, invoice, "_Test Sales Person", HPP, filters)
+			actual = row_from_fact(fact, filters)
+			for key, value in expected.items():
+				if isinstance(value, float):
+					self.assertAlmostEqual(actual[key], value, places=6, msg=f"{filters.mode} {key}")
+				else:
+					self.assertEqual(actual[key], value, msg=f"{filters.mode} {key}")
+
+		if invoice.is_return:
+			self.assertLess(fact.sales, 0)
+			self.assertLess(fact.valuation_commission, 0)
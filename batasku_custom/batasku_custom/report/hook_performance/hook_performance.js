@@ -0,0 +1,27 @@
+// Copyright (c) 2026, batasku and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Hook Performance"] = {
+	filters: [
+		{
+			fieldname: "doctype",
+			label: __("DocType"),
+			fieldtype: "Link",
+			options: "DocType",
+		},
+		{
+			fieldname: "event",
+			label: __("Event"),
+			fieldtype: "Data",
+		},
+	],
+	onload(report) {
+		report.page.add_inner_button(__("Reset Stats"), () => {
+			frappe.confirm(__("Clear all collected hook stats?"), () => {
+				frappe
+					.call("batasku_custom.api.instrumentation.reset_hook_stats")
+					.then(() => report.refresh());
+			});
+		});
+	},
+};
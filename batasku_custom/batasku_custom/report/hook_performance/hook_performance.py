@@ -0,0 +1,33 @@
+# Copyright (c) 2026, batasku and contributors
+# For license information, please see license.txt
+
+from frappe import _
+
+from batasku_custom.api.instrumentation import get_hook_stats
+
+
+def execute(filters=None):
+	filters = filters or {}
+	stats = get_hook_stats(filters.get("doctype"), filters.get("event"))
+
+	message = None
+	if not stats["enabled"]:
+		message = _("Instrumentation is off. Enable it with: bench --site <site> set-config batasku_instrument_hooks 1")
+
+	return get_columns(), stats["data"], message
+
+
+def get_columns():
+	return [
+		{"fieldname": "doctype", "label": _("DocType"), "fieldtype": "Link", "options": "DocType", "width": 150},
+		{"fieldname": "event", "label": _("Event"), "fieldtype": "Data", "width": 120},
+		{"fieldname": "handler", "label": _("Handler"), "fieldtype": "Data", "width": 320},
+		{"fieldname": "calls", "label": _("Calls"), "fieldtype": "Int", "width": 80},
+		{"fieldname": "errors", "label": _("Errors"), "fieldtype": "Int", "width": 80},
+		{"fieldname": "total_ms", "label": _("Total (ms)"), "fieldtype": "Float", "precision": 1, "width": 110},
+		{"fieldname": "avg_ms", "label": _("Avg (ms)"), "fieldtype": "Float", "precision": 1, "width": 100},
+		{"fieldname": "max_ms", "label": _("Max (ms)"), "fieldtype": "Float", "precision": 1, "width": 100},
+		{"fieldname": "avg_queries", "label": _("Avg Queries"), "fieldtype": "Float", "precision": 1, "width": 110},
+		{"fieldname": "queries", "label": _("Queries"), "fieldtype": "Int", "width": 90},
+		{"fieldname": "rows", "label": _("Rows Read"), "fieldtype": "Int", "width": 100},
+	]
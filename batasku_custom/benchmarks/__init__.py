@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Benchmarks for the batasku_custom hooks, pickers and reports
+
+Run against a local test site (allow_tests or developer_mode must be set;
+the dataset is committed to the site):
+
+    bench --site test.local execute batasku_custom.benchmarks.run \
+        --kwargs "{'sizes': '100,1000', 'baseline': 'sites/test.local/benchmarks/baseline.json'}"
+
+Every size gets its own synthetic company (see dataset.py), generated once
+and reused by later runs. Each case (see cases.py) is timed `repeat` times
+with its query and row counts, and the result is written as JSON under
+sites/<site>/benchmarks/. Passing a previous result as `baseline` prints
+the cases that got slower or run more queries.
+"""
+
+from __future__ import unicode_literals
+
+from batasku_custom.benchmarks.runner import compare, run  # noqa: F401
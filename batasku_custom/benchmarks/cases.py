@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Benchmark cases
+
+Every case is `setup(ctx)` returning the callable that is timed. Setup work
+(loading documents, building unsaved returns) is not measured. The runner
+rolls back after every call, so a case may change the database freely.
+"""
+
+from __future__ import unicode_literals
+
+import frappe
+from frappe.utils import add_days, add_months, date_diff, get_first_day, getdate, nowdate
+
+from batasku_custom.benchmarks.dataset import CLOSED_MONTHS
+
+# Documents per case, enough to average out per-document noise
+SAMPLE_SIZE = 50
+
+
+def closed_period_validation(ctx):
+    """
+    Validate every submitted Sales Invoice plus documents dated inside the
+    closed months against the closed periods.
+
+    The invoices are dated around today, after the watermark; the closed
+    month documents go through the interval lookup and the override path.
+    """
+    from batasku_custom.accounting_period_restrictions import _reset_closed_period_cache, validate_many
+
+    docs = frappe.get_all(
+        "Sales Invoice",
+        filters={"company": ctx.company, "docstatus": 1},
+        fields=["name", "posting_date", "company"]
+    )
+    docs += [
+        frappe._dict({"doctype": "Sales Invoice", "name": None, "posting_date": posting_date, "company": ctx.company})
+        for posting_date in get_closed_month_dates()
+    ]
+
+    def run():
+        # Cold index: the first lookup per company rebuilds it
+        _reset_closed_period_cache()
+        validate_many(docs)
+        frappe.clear_messages()
+
+    return run
+
+
+def closed_period_lookup(ctx):
+    """Look up dates spread over the closed months in the warm closed period index"""
+    from batasku_custom.accounting_period_restrictions import find_closed_period
+
+    dates = get_closed_month_dates(step=1)
+    find_closed_period(ctx.company, dates[0])
+
+    def run():
+        for posting_date in dates:
+            find_closed_period(ctx.company, posting_date)
+
+    return run
+
+
+def get_closed_month_dates(step=7):
+    """Every `step`-th day of the closed months of the dataset"""
+    start_date = getdate(add_months(get_first_day(nowdate()), -CLOSED_MONTHS))
+    days = date_diff(get_first_day(nowdate()), start_date)
+    return [add_days(start_date, i) for i in range(0, days, step)]
+
+
+def dn_return_validation(ctx):
+    """Validate unsaved partial returns of the first Delivery Notes"""
+    from erpnext.stock.doctype.delivery_note.delivery_note import make_sales_return
+
+    from batasku_custom.overrides.delivery_note_return import validate_delivery_note_return
+
+    returns = []
+    for name in ctx.delivery_notes[:SAMPLE_SIZE]:
+        doc = make_sales_return(name)
+        for item in doc.items:
+            item.qty = -1
+            item.return_reason = "Damaged"
+        returns.append(doc)
+
+    def run():
+        for doc in returns:
+            validate_delivery_note_return(doc)
+
+    return run
+
+
+def hpp_snapshot_dn(ctx):
+    """Delivery Note before_submit HPP snapshot, from an empty snapshot"""
+    from batasku_custom.hpp import snapshot_delivery_note_hpp
+
+    docs = get_docs("Delivery Note", ctx.delivery_notes)
+
+    def run():
+        for doc in docs:
+            reset_hpp_snapshots(doc)
+            snapshot_delivery_note_hpp(doc)
+
+    return run
+
+
+def hpp_snapshot_si(ctx):
+    """Sales Invoice before_submit HPP snapshot, from an empty snapshot"""
+    from batasku_custom.hpp import snapshot_sales_invoice_hpp
+
+    docs = get_docs("Sales Invoice", ctx.sales_invoices)
+
+    def run():
+        for doc in docs:
+            reset_hpp_snapshots(doc)
+            snapshot_sales_invoice_hpp(doc)
+
+    return run
+
+
+def picker_pr_for_pi(ctx):
+    from batasku_custom.api.pickers import fetch_pr_list_for_pi
+
+    return lambda: fetch_pr_list_for_pi(company=ctx.company)
+
+
+def picker_po_for_pr(ctx):
+    from batasku_custom.api.pickers import fetch_po_list_for_pr
+
+    return lambda: fetch_po_list_for_pr(company=ctx.company)
+
+
+def picker_so_for_dn(ctx):
+    from batasku_custom.api.pickers import fetch_so_list_for_dn
+
+    return lambda: fetch_so_list_for_dn(company=ctx.company)
+
+
+def profit_commission_report(ctx):
+    from batasku_custom.api.commission_report import get_profit_commission_report_dual
+
+    return lambda: get_profit_commission_report_dual(
+        from_date=ctx.from_date, to_date=ctx.to_date, company=ctx.company
+    )
+
+
+def get_docs(doctype, names):
+    return [frappe.get_doc(doctype, name) for name in names[:SAMPLE_SIZE]]
+
+
+def reset_hpp_snapshots(doc):
+    for item in doc.items:
+        item.custom_hpp_snapshot = 0
+
+
+CASES = {
+    "closed_period_lookup": closed_period_lookup,
+    "closed_period_validation": closed_period_validation,
+    "dn_return_validation": dn_return_validation,
+    "hpp_snapshot_dn": hpp_snapshot_dn,
+    "hpp_snapshot_si": hpp_snapshot_si,
+    "picker_pr_for_pi": picker_pr_for_pi,
+    "picker_po_for_pr": picker_po_for_pr,
+    "picker_so_for_dn": picker_so_for_dn,
+    "profit_commission_report": profit_commission_report,
+}
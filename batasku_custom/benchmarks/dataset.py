@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Synthetic dataset for the benchmarks
+
+`get_dataset(size)` returns the dataset of one size, generating it on first
+use. A dataset is one company "Batasku Bench <size>" with:
+
+- size // 10 items (stocked, with a "Standar Pembelian" price), customers,
+  and a few suppliers and sales persons linked to employees
+- 24 closed monthly accounting periods before the current month
+- size Sales Orders with a sales team; 4 out of 5 are delivered and invoiced
+  and every 10th Delivery Note / Sales Invoice gets a partial return
+- size // 5 Purchase Orders; 4 out of 5 are received and half of the receipts
+  are invoiced
+
+Generation is seeded, so the same size and seed give the same documents.
+"""
+
+from __future__ import unicode_literals
+import random
+
+import frappe
+from frappe.utils import add_days, add_months, get_first_day, get_last_day, getdate, nowdate
+
+PRICE_LIST = "Standar Pembelian"
+CLOSED_MONTHS = 24
+
+
+def get_dataset(size, seed=42):
+    """Return the context of a dataset, generating it when missing"""
+    if not (frappe.conf.allow_tests or frappe.conf.developer_mode):
+        frappe.throw("Benchmark hanya boleh dijalankan di site test (allow_tests atau developer_mode).")
+
+    company = get_company_name(size)
+    if not frappe.db.exists("Company", company):
+        generate_dataset(size, seed)
+        frappe.db.commit()
+    return load_context(company)
+
+
+def generate_dataset(size, seed=42):
+    rng = random.Random(seed)
+    company = make_company(size)
+    abbr = frappe.get_cached_value("Company", company, "abbr")
+    warehouse = f"Stores - {abbr}"
+
+    make_commission_accounts(company, abbr)
+    items = make_items(company, max(size // 10, 10), rng)
+    customers = make_parties("Customer", company, max(size // 10, 5))
+    suppliers = make_parties("Supplier", company, max(size // 50, 3))
+    sales_persons = make_sales_persons(company, max(size // 100, 3))
+
+    make_stock(company, warehouse, items, size)
+    make_sales(company, warehouse, items, customers, sales_persons, size, rng)
+    make_purchases(company, warehouse, items, suppliers, max(size // 5, 5), rng)
+    make_closed_periods(company)
+
+
+def load_context(company):
+    """Names the benchmark cases work on"""
+    def names(doctype, **filters):
+        filters["company"] = company
+        return frappe.get_all(doctype, filters=filters, pluck="name", order_by="name")
+
+    return frappe._dict({
+        "company": company,
+        "from_date": get_first_day(add_months(nowdate(), -1)),
+        "to_date": get_last_day(nowdate()),
+        "sales_orders": names("Sales Order", docstatus=1),
+        "delivery_notes": names("Delivery Note", docstatus=1, is_return=0),
+        "sales_invoices": names("Sales Invoice", docstatus=1, is_return=0),
+        "credit_notes": names("Sales Invoice", docstatus=1, is_return=1),
+        "purchase_receipts": names("Purchase Receipt", docstatus=1),
+    })
+
+
+def get_company_name(size):
+    return f"Batasku Bench {size}"
+
+
+def make_company(size):
+    company = frappe.get_doc({
+        "doctype": "Company",
+        "company_name": get_company_name(size),
+        "abbr": f"BB{size}",
+        "default_currency": "IDR",
+        "country": "Indonesia",
+        "create_chart_of_accounts_based_on": "Standard Template",
+        "chart_of_accounts": "Standard"
+    }).insert()
+    return company.name
+
+
+def make_commission_accounts(company, abbr):
+    """Accounts matched by the commission resolver"""
+    for account_name, parent, account_type in (
+        ("Beban Komisi Penjualan", f"Indirect Expenses - {abbr}", "Expense Account"),
+        ("Hutang Komisi Sales", f"Accounts Payable - {abbr}", "Payable"),
+    ):
+        frappe.get_doc({
+            "doctype": "Account",
+            "account_name": account_name,
+            "parent_account": parent,
+            "account_type": account_type,
+            "company": company
+        }).insert()
+
+
+def make_items(company, count, rng):
+    if not frappe.db.exists("Price List", PRICE_LIST):
+        frappe.get_doc({
+            "doctype": "Price List",
+            "price_list_name": PRICE_LIST,
+            "currency": "IDR",
+            "buying": 1
+        }).insert()
+
+    items = []
+    for i in range(count):
+        item_code = f"{company} Item {i:05d}"
+        frappe.get_doc({
+            "doctype": "Item",
+            "item_code": item_code,
+            "item_group": "All Item Groups",
+            "stock_uom": "Nos",
+            "is_stock_item": 1,
+            "custom_financial_cost_percent": rng.choice((0, 1, 2))
+        }).insert()
+
+        rate = rng.randrange(10, 500) * 1000
+        frappe.get_doc({
+            "doctype": "Item Price",
+            "item_code": item_code,
+            "price_list": PRICE_LIST,
+            "price_list_rate": rate
+        }).insert()
+        items.append(frappe._dict(item_code=item_code, rate=rate))
+
+    return items
+
+
+def make_parties(doctype, company, count):
+    names = []
+    for i in range(count):
+        values = {"doctype": doctype}
+        if doctype == "Customer":
+            values.update({
+                "customer_name": f"{company} Customer {i:04d}",
+                "customer_group": "All Customer Groups",
+                "territory": "All Territories"
+            })
+        else:
+            values.update({
+                "supplier_name": f"{company} Supplier {i:04d}",
+                "supplier_group": "All Supplier Groups"
+            })
+        names.append(frappe.get_doc(values).insert().name)
+    return names
+
+
+def make_sales_persons(company, count):
+    names = []
+    for i in range(count):
+        employee = frappe.get_doc({
+            "doctype": "Employee",
+            "first_name": f"Bench Sales {i:03d}",
+            "company": company,
+            "gender": "Male",
+            "date_of_birth": "1990-01-01",
+            "date_of_joining": "2020-01-01"
+        }).insert()
+        sales_person = frappe.get_doc({
+            "doctype": "Sales Person",
+            "sales_person_name": f"{company} Sales {i:03d}",
+            "parent_sales_person": "Sales Team",
+            "employee": employee.name,
+            "custom_default_commission_rate": 40
+        }).insert()
+        names.append(sales_person.name)
+    return names
+
+
+def make_stock(company, warehouse, items, size):
+    stock_entry = frappe.get_doc({
+        "doctype": "Stock Entry",
+        "stock_entry_type": "Material Receipt",
+        "company": company,
+        "items": [{
+            "item_code": item.item_code,
+            "t_warehouse": warehouse,
+            "qty": size * 10,
+            "basic_rate": item.rate
+        } for item in items]
+    })
+    stock_entry.insert()
+    stock_entry.submit()
+
+
+def make_sales(company, warehouse, items, customers, sales_persons, count, rng):
+    from erpnext.accounts.doctype.sales_invoice.sales_invoice import make_sales_return as make_credit_note
+    from erpnext.selling.doctype.sales_order.sales_order import make_delivery_note
+    from erpnext.stock.doctype.delivery_note.delivery_note import make_sales_invoice, make_sales_return
+
+    for i in range(count):
+        so = frappe.get_doc({
+            "doctype": "Sales Order",
+            "company": company,
+            "customer": rng.choice(customers),
+            "delivery_date": add_days(nowdate(), 7),
+            "set_warehouse": warehouse,
+            "items": [{
+                "item_code": item.item_code,
+                "qty": rng.randint(1, 10),
+                "rate": item.rate * rng.choice((1.2, 1.3, 1.5)),
+                "warehouse": warehouse
+            } for item in rng.sample(items, rng.randint(1, 5))],
+            "sales_team": [{"sales_person": rng.choice(sales_persons), "allocated_percentage": 100}]
+        })
+        so.insert()
+        so.submit()
+
+        # Every 5th Sales Order stays undelivered for the Sales Order picker
+        if i % 5 == 4:
+            continue
+
+        dn = make_delivery_note(so.name)
+        dn.insert()
+        dn.submit()
+
+        si = make_sales_invoice(dn.name)
+        si.insert()
+        si.submit()
+
+        if i % 10 == 0:
+            for return_doc in (make_sales_return(dn.name), make_credit_note(si.name)):
+                for item in return_doc.items:
+                    item.qty = -1
+                    if return_doc.doctype == "Delivery Note":
+                        item.return_reason = "Damaged"
+                return_doc.insert()
+                return_doc.submit()
+
+        if i % 100 == 99:
+            frappe.db.commit()
+
+
+def make_purchases(company, warehouse, items, suppliers, count, rng):
+    from erpnext.buying.doctype.purchase_order.purchase_order import make_purchase_receipt
+    from erpnext.stock.doctype.purchase_receipt.purchase_receipt import make_purchase_invoice
+
+    for i in range(count):
+        po = frappe.get_doc({
+            "doctype": "Purchase Order",
+            "company": company,
+            "supplier": rng.choice(suppliers),
+            "schedule_date": add_days(nowdate(), 7),
+            "set_warehouse": warehouse,
+            "items": [{
+                "item_code": item.item_code,
+                "qty": rng.randint(10, 100),
+                "rate": item.rate,
+                "warehouse": warehouse
+            } for item in rng.sample(items, rng.randint(1, 5))]
+        })
+        po.insert()
+        po.submit()
+
+        # Every 5th Purchase Order stays unreceived for the Purchase Order picker
+        if i % 5 == 4:
+            continue
+
+        pr = make_purchase_receipt(po.name)
+        pr.insert()
+        pr.submit()
+
+        if i % 2 == 0:
+            pi = make_purchase_invoice(pr.name)
+            pi.insert()
+            pi.submit()
+
+
+def make_closed_periods(company):
+    """Closed monthly periods before the current month"""
+    month_start = get_first_day(nowdate())
+    for i in range(CLOSED_MONTHS, 0, -1):
+        start_date = getdate(add_months(month_start, -i))
+        period = frappe.get_doc({
+            "doctype": "Accounting Period",
+            "period_name": f"{company} {start_date.strftime('%Y-%m')}",
+            "company": company,
+            "start_date": start_date,
+            "end_date": get_last_day(start_date),
+            "period_type": "Monthly"
+        }).insert()
+        period.db_set("status", "Closed")
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Benchmark runner: time the cases per dataset size and compare with a baseline
+"""
+
+from __future__ import unicode_literals
+import json
+import os
+import statistics
+
+import frappe
+from frappe.utils import cint, flt, now_datetime
+
+from batasku_custom.benchmarks.cases import CASES
+from batasku_custom.benchmarks.dataset import get_dataset
+from batasku_custom.profiling import QueryCounter
+
+DEFAULT_SIZES = "100,1000"
+DEFAULT_REPEAT = 5
+# A case regresses when its median gets this much slower than the baseline
+REGRESSION_THRESHOLD = 0.2
+
+
+def run(sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, seed=42, cases=None, output=None, baseline=None):
+    """
+    Run the benchmark cases and write the result as JSON.
+
+    Args:
+        sizes: Comma separated dataset sizes (Sales Orders per dataset)
+        repeat: Timed calls per case; min, median and max are reported
+        seed: Dataset seed
+        cases: Optional comma separated case names, all cases by default
+        output: Result path, defaults to sites/<site>/benchmarks/<timestamp>.json
+        baseline: Optional previous result to compare with
+
+    Returns:
+        Path of the written result
+    """
+    case_names = split(cases) or list(CASES)
+    unknown = set(case_names) - set(CASES)
+    if unknown:
+        frappe.throw("Case benchmark tidak dikenal: {0}".format(", ".join(sorted(unknown))))
+
+    result = {
+        "site": frappe.local.site,
+        "timestamp": str(now_datetime()),
+        "repeat": cint(repeat),
+        "seed": cint(seed),
+        "sizes": {}
+    }
+
+    for size in [cint(size) for size in split(sizes)]:
+        ctx = get_dataset(size, cint(seed))
+        result["sizes"][str(size)] = {
+            name: run_case(CASES[name], ctx, cint(repeat)) for name in case_names
+        }
+        print_results(size, result["sizes"][str(size)])
+
+    path = output or get_default_output_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=1, sort_keys=True)
+    print(f"Result written to {path}")
+
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare(json.load(f), result)
+        for line in regressions:
+            print(line)
+        if not regressions:
+            print("No regressions against baseline")
+
+    return path
+
+
+def run_case(setup, ctx, repeat):
+    """Time one case `repeat` times, rolling back after every call"""
+    call = setup(ctx)
+    timings = []
+    counter = None
+
+    for _ in range(max(repeat, 1)):
+        try:
+            with QueryCounter() as counter:
+                call()
+        finally:
+            frappe.db.rollback()
+        timings.append(counter.elapsed * 1000)
+
+    # Query and row counts of the last call; earlier calls may have warmed caches
+    return {
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "queries": counter.queries,
+        "rows": counter.rows
+    }
+
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare two results.
+
+    Returns:
+        One line per case that got slower than `threshold` (fraction of the
+        baseline median) or runs more queries than in the baseline
+    """
+    if isinstance(baseline, str):
+        baseline = json.loads(baseline)
+    if isinstance(current, str):
+        current = json.loads(current)
+
+    regressions = []
+    for size, cases in current["sizes"].items():
+        for name, stats in cases.items():
+            before = baseline.get("sizes", {}).get(size, {}).get(name)
+            if not before:
+                continue
+
+            if before["median_ms"] and stats["median_ms"] > before["median_ms"] * (1 + flt(threshold)):
+                regressions.append(
+                    f"[{size}] {name}: median {before['median_ms']} ms -> {stats['median_ms']} ms"
+                )
+            if stats["queries"] > before["queries"]:
+                regressions.append(
+                    f"[{size}] {name}: queries {before['queries']} -> {stats['queries']}"
+                )
+
+    return regressions
+
+
+def print_results(size, cases):
+    print(f"Dataset size {size}")
+    for name, stats in cases.items():
+        print(
+            f"  {name:<28} median {stats['median_ms']:>10.3f} ms  "
+            f"min {stats['min_ms']:>10.3f} ms  queries {stats['queries']:>5}  rows {stats['rows']:>7}"
+        )
+
+
+def get_default_output_path():
+    return frappe.get_site_path("benchmarks", now_datetime().strftime("%Y%m%d-%H%M%S") + ".json")
+
+
+def split(value):
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value]
+    return [v.strip() for v in str(value).split(",") if v.strip()]
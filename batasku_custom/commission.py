@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Sales commission calculation shared by the profit/commission report and the
+Sales Commission Fact table. HPP is resolved by `batasku_custom.hpp`.
+"""
+
+from __future__ import unicode_literals
+import frappe
+from frappe.utils import flt
+
+DEFAULT_COMMISSION_RATE = 40
+COMPANY_SHARE = 0.60
+
+
+def compute_item_row(item, invoice, sales_person, hpp, filters):
+    """Compute the `by_item` row for one Sales Invoice Item"""
+    mode = filters.mode
+    include_hpp = filters.include_hpp
+    show_cost = mode == "valuation" or include_hpp
+
+    is_return = invoice.is_return or 0
+    qty = flt(item.qty)
+    selling = flt(item.rate)
+    bottom = flt(item.price_list_rate)
+    margin_input = flt(item.margin_rate_or_amount)
+
+    # UNTUK CREDIT NOTE: Qty sudah negatif dari ERPNext
+    qty_abs = abs(qty)
+    multiplier = -1 if is_return else 1
+
+    financial_cost_percent = flt(item.custom_financial_cost_percent)
+
+    sales_amount = selling * qty_abs * multiplier
+    hpp_base_amount = hpp * qty_abs * multiplier
+    financial_cost_amount = abs(hpp_base_amount) * (financial_cost_percent / 100) * multiplier
+    hpp_total_amount = hpp_base_amount + financial_cost_amount
+
+    if mode == "valuation":
+        margin_zone = max(selling - bottom, 0)
+
+        gross_profit_before_overhead = (selling - hpp) * qty_abs * multiplier
+        gross_profit = gross_profit_before_overhead - financial_cost_amount
+        base_company_profit = (bottom - hpp) * qty_abs * multiplier - financial_cost_amount
+    else:  # margin
+        margin_zone = abs(margin_input)
+        if include_hpp:
+            gross_profit_before_overhead = (selling - hpp) * qty_abs * multiplier
+            gross_profit = gross_profit_before_overhead - financial_cost_amount
+            base_company_profit = (selling - hpp) * qty_abs * COMPANY_SHARE * multiplier - financial_cost_amount
+        else:
+            gross_profit_before_overhead = 0.0
+            gross_profit = 0.0
+            base_company_profit = 0.0
+
+    company_margin = margin_zone * qty_abs * COMPANY_SHARE * multiplier
+
+    # --- Komisi dengan multiplier untuk CN ---
+    rate = flt(invoice.custom_persentase_komisi_si or DEFAULT_COMMISSION_RATE) / 100
+    sales_commission = margin_zone * qty_abs * rate * multiplier
+    company_profit = base_company_profit + company_margin
+
+    return {
+        "invoice":                      item.parent,
+        "is_return":                    is_return,
+        "return_against":               invoice.return_against,
+        "document_type":                "Credit Note" if is_return else "Invoice",
+        "customer":                     invoice.customer,
+        "customer_name":                invoice.customer_name or invoice.customer,
+        "sales_person":                 sales_person,
+        "item_code":                    item.item_code,
+        "item_name":                    item.item_name,
+        "qty":                          qty,
+        "rate":                         selling,
+        "price_list_rate":              bottom,
+        "hpp_rate":                     hpp if show_cost else None,
+        "financial_cost_percent":       financial_cost_percent if show_cost else None,
+        "sales":                        sales_amount,
+        "hpp_base":                     hpp_base_amount if show_cost else None,
+        "financial_cost":               financial_cost_amount if show_cost else None,
+        "hpp_total":                    hpp_total_amount if show_cost else None,
+        "gross_profit_before_overhead": gross_profit_before_overhead,
+        "gross_profit":                 gross_profit,
+        "base_profit":                  base_company_profit,
+        "margin_zone":                  margin_zone,
+        "commission":                   sales_commission,
+        "company_margin":               company_margin,
+        "company_profit":               company_profit
+    }
+
+
+VALUATION_FILTERS = frappe._dict({"mode": "valuation", "include_hpp": False})
+MARGIN_FILTERS = frappe._dict({"mode": "margin", "include_hpp": True})
+
+
+def compute_fact_values(item, invoice, sales_person, hpp):
+    """
+    Compute the Sales Commission Fact values of one invoice item.
+
+    Both report modes are stored: the shared amounts once, and the margin
+    zone, base profit, commission and company margin per mode. The margin
+    mode values assume include_hpp; without it the report zeroes the profit
+    columns, which `row_from_fact` does on read.
+    """
+    valuation = compute_item_row(item, invoice, sales_person, hpp, VALUATION_FILTERS)
+    margin = compute_item_row(item, invoice, sales_person, hpp, MARGIN_FILTERS)
+
+    return {
+        "sales_invoice":                item.parent,
+        "sales_invoice_item":           item.name,
+        "idx":                          item.idx,
+        "posting_date":                 invoice.posting_date,
+        "company":                      invoice.company,
+        "customer":                     invoice.customer,
+        "customer_name":                valuation["customer_name"],
+        "sales_person":                 sales_person,
+        "is_return":                    valuation["is_return"],
+        "return_against":               invoice.return_against,
+        "item_code":                    item.item_code,
+        "item_name":                    item.item_name,
+        "qty":                          valuation["qty"],
+        "rate":                         valuation["rate"],
+        "price_list_rate":              valuation["price_list_rate"],
+        "hpp_rate":                     valuation["hpp_rate"],
+        "financial_cost_percent":       valuation["financial_cost_percent"],
+        "commission_rate":              flt(invoice.custom_persentase_komisi_si or DEFAULT_COMMISSION_RATE),
+        "sales":                        valuation["sales"],
+        "hpp_base":                     valuation["hpp_base"],
+        "financial_cost":               valuation["financial_cost"],
+        "hpp_total":                    valuation["hpp_total"],
+        "gross_profit_before_overhead": valuation["gross_profit_before_overhead"],
+        "gross_profit":                 valuation["gross_profit"],
+        "valuation_margin_zone":        valuation["margin_zone"],
+        "valuation_base_profit":        valuation["base_profit"],
+        "valuation_commission":         valuation["commission"],
+        "valuation_company_margin":     valuation["company_margin"],
+        "margin_margin_zone":           margin["margin_zone"],
+        "margin_base_profit":           margin["base_profit"],
+        "margin_commission":            margin["commission"],
+        "margin_company_margin":        margin["company_margin"]
+    }
+
+
+def row_from_fact(fact, filters, sales_person=None):
+    """Build the report `by_item` row for a Sales Commission Fact row"""
+    show_cost = filters.mode == "valuation" or filters.include_hpp
+
+    if filters.mode == "valuation":
+        prefix = "valuation_"
+        gross_profit_before_overhead = flt(fact.gross_profit_before_overhead)
+        gross_profit = flt(fact.gross_profit)
+        base_profit = flt(fact.valuation_base_profit)
+    else:
+        prefix = "margin_"
+        if filters.include_hpp:
+            gross_profit_before_overhead = flt(fact.gross_profit_before_overhead)
+            gross_profit = flt(fact.gross_profit)
+            base_profit = flt(fact.margin_base_profit)
+        else:
+            gross_profit_before_overhead = gross_profit = base_profit = 0.0
+
+    company_margin = flt(fact.get(prefix + "company_margin"))
+
+    return {
+        "invoice":                      fact.sales_invoice,
+        "is_return":                    fact.is_return,
+        "return_against":               fact.return_against,
+        "document_type":                "Credit Note" if fact.is_return else "Invoice",
+        "customer":                     fact.customer,
+        "customer_name":                fact.customer_name or fact.customer,
+        "sales_person":                 sales_person or fact.sales_person,
+        "item_code":                    fact.item_code,
+        "item_name":                    fact.item_name,
+        "qty":                          flt(fact.qty),
+        "rate":                         flt(fact.rate),
+        "price_list_rate":              flt(fact.price_list_rate),
+        "hpp_rate":                     flt(fact.hpp_rate) if show_cost else None,
+        "financial_cost_percent":       flt(fact.financial_cost_percent) if show_cost else None,
+        "sales":                        flt(fact.sales),
+        "hpp_base":                     flt(fact.hpp_base) if show_cost else None,
+        "financial_cost":               flt(fact.financial_cost) if show_cost else None,
+        "hpp_total":                    flt(fact.hpp_total) if show_cost else None,
+        "gross_profit_before_overhead": gross_profit_before_overhead,
+        "gross_profit":                 gross_profit,
+        "base_profit":                  base_profit,
+        "margin_zone":                  flt(fact.get(prefix + "margin_zone")),
+        "commission":                   flt(fact.get(prefix + "commission")),
+        "company_margin":               company_margin,
+        "company_profit":               base_profit + company_margin
+    }
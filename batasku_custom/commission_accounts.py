@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Commission account and employee resolver
+
+The commission journals need, per company, the commission expense and
+payable accounts (found by account name keyword) and, per sales person, the
+linked employee. Both are cached in Redis:
+
+- accounts in the `batasku_commission_accounts` hash, one entry per company
+- the sales person → employee mapping as one value for the site
+
+Account changes clear the accounts, Sales Person changes clear the mapping
+(see doc_events in hooks.py). Both are cleared again after commit, like the
+closed period index.
+"""
+
+from __future__ import unicode_literals
+import frappe
+
+from batasku_custom.instrumentation import instrumented
+
+COMMISSION_ACCOUNTS_CACHE_KEY = "batasku_commission_accounts"
+SALES_PERSON_EMPLOYEE_CACHE_KEY = "batasku_sales_person_employees"
+
+# Keywords in order of preference
+EXPENSE_ACCOUNT_KEYWORDS = ("Beban Komisi Penjualan", "Komisi Penjualan")
+PAYABLE_ACCOUNT_KEYWORDS = ("Hutang Komisi Sales", "Komisi Sales")
+
+
+def get_commission_accounts(company):
+    """
+    Return the commission accounts of a company.
+
+    Returns:
+        {"expense_account": name or None, "payable_account": name or None}
+    """
+    return frappe.cache().hget(
+        COMMISSION_ACCOUNTS_CACHE_KEY,
+        company,
+        generator=lambda: find_commission_accounts(company)
+    )
+
+
+def find_commission_accounts(company):
+    """Match the account keywords for a company with one query"""
+    keywords = EXPENSE_ACCOUNT_KEYWORDS + PAYABLE_ACCOUNT_KEYWORDS
+    values = {"company": company}
+    like_conditions = []
+    for i, keyword in enumerate(keywords):
+        values[f"keyword_{i}"] = f"%{keyword}%"
+        like_conditions.append(f"account_name LIKE %(keyword_{i})s")
+
+    accounts = frappe.db.sql("""
+        SELECT name, account_name, account_type
+        FROM `tabAccount`
+        WHERE company = %(company)s
+            AND account_type IN ('Expense Account', 'Payable')
+            AND ({0})
+        ORDER BY modified DESC
+    """.format(" OR ".join(like_conditions)), values, as_dict=True)
+
+    return {
+        "expense_account": _match_account(accounts, "Expense Account", EXPENSE_ACCOUNT_KEYWORDS),
+        "payable_account": _match_account(accounts, "Payable", PAYABLE_ACCOUNT_KEYWORDS)
+    }
+
+
+def get_sales_person_employees():
+    """Return {sales person: employee} for every Sales Person linked to an Employee"""
+    cache = frappe.cache()
+    employees = cache.get_value(SALES_PERSON_EMPLOYEE_CACHE_KEY)
+    if employees is None:
+        employees = dict(frappe.get_all(
+            "Sales Person",
+            filters={"employee": ["is", "set"]},
+            fields=["name", "employee"],
+            as_list=True
+        ))
+        cache.set_value(SALES_PERSON_EMPLOYEE_CACHE_KEY, employees)
+    return employees
+
+
+def get_first_employee(sales_persons):
+    """Employee of the first sales person that has one, or None"""
+    employees = get_sales_person_employees()
+    for sales_person in sales_persons:
+        if employees.get(sales_person):
+            return employees[sales_person]
+    return None
+
+
+@instrumented
+def clear_commission_account_cache(doc=None, method=None):
+    """Account doc event: forget the resolved accounts of all companies"""
+    _reset_commission_account_cache()
+    frappe.db.after_commit.add(_reset_commission_account_cache)
+
+
+@instrumented
+def clear_sales_person_employee_cache(doc=None, method=None):
+    """Sales Person doc event: forget the sales person → employee mapping"""
+    _reset_sales_person_employee_cache()
+    frappe.db.after_commit.add(_reset_sales_person_employee_cache)
+
+
+def _reset_commission_account_cache():
+    frappe.cache().delete_value(COMMISSION_ACCOUNTS_CACHE_KEY)
+
+
+def _reset_sales_person_employee_cache():
+    frappe.cache().delete_value(SALES_PERSON_EMPLOYEE_CACHE_KEY)
+
+
+def _match_account(accounts, account_type, keywords):
+    for keyword in keywords:
+        keyword = keyword.lower()
+        for account in accounts:
+            if account.account_type == account_type and keyword in (account.account_name or "").lower():
+                return account.name
+    return None
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Commission Journal Entries on Sales Invoice submit
+
+Replaces the "Auto Commission Journal on SI Submit" and
+"Auto Reverse Commission JE on Credit Note" server scripts:
+
+- Sales Invoice: Dr commission expense / Cr commission payable (Employee)
+- Credit Note: the reverse, for the commission of the returned amount
+
+Accounts and the sales person → employee mapping come from the cached
+resolver in batasku_custom.commission_accounts. Every Journal Entry is
+registered in the Auto Journal Registry, so an invoice gets at most one
+accrual or reversal.
+"""
+
+from __future__ import unicode_literals
+import frappe
+from frappe.utils import flt
+
+from batasku_custom.batasku_custom.doctype.auto_journal_registry.auto_journal_registry import (
+    COMMISSION_ACCRUAL,
+    COMMISSION_REVERSAL,
+    claim_sources,
+    get_registered_sources,
+    set_journal_entry
+)
+from batasku_custom.commission_accounts import get_commission_accounts, get_first_employee
+from batasku_custom.instrumentation import instrumented
+
+
+@instrumented
+def make_commission_journal_entry(doc, method=None):
+    """Sales Invoice on_submit: post the commission or its reversal"""
+    if doc.is_return and doc.return_against:
+        make_commission_reversal(doc)
+    else:
+        make_commission_accrual(doc)
+
+
+def make_commission_accrual(doc):
+    """Dr Beban Komisi Penjualan / Cr Hutang Komisi Sales for a Sales Invoice"""
+    if not doc.custom_total_komisi_sales:
+        return
+    if get_registered_sources("Sales Invoice", [doc.name], COMMISSION_ACCRUAL):
+        return
+
+    total_commission = flt(doc.custom_total_komisi_sales)
+    if total_commission <= 0:
+        frappe.msgprint(f"Sales Invoice {doc.name} tidak memiliki komisi, JE tidak dibuat.")
+        return
+
+    accounts = get_accounts(doc.company)
+    employee_party = get_employee_party(doc, "Sales Invoice", "JE")
+
+    claim_sources("Sales Invoice", [doc.name], COMMISSION_ACCRUAL, company=doc.company)
+
+    # Buat Journal Entry
+    je = frappe.new_doc("Journal Entry")
+    je.voucher_type = "Journal Entry"
+    je.posting_date = doc.posting_date
+    je.company = doc.company
+    je.user_remark = f"Auto Commission for {doc.name}"
+
+    # Debit Expense
+    je.append("accounts", {
+        "account": accounts["expense_account"],
+        "debit_in_account_currency": total_commission
+    })
+
+    # Credit Payable dengan Employee
+    je.append("accounts", {
+        "account": accounts["payable_account"],
+        "credit_in_account_currency": total_commission,
+        "party_type": "Employee",
+        "party": employee_party
+    })
+
+    je.insert(ignore_permissions=True)
+    je.submit()
+    set_journal_entry("Sales Invoice", [doc.name], COMMISSION_ACCRUAL, je.name)
+
+    doc.db_set("custom_commission_journal_entry", je.name)
+    frappe.msgprint(f"Journal Entry {je.name} berhasil dibuat untuk komisi Sales Invoice {doc.name}")
+
+
+def make_commission_reversal(doc):
+    """Dr Hutang Komisi Sales / Cr Beban Komisi Penjualan for a Credit Note"""
+    reversed_commission = abs(flt(doc.custom_total_komisi_sales))
+    if reversed_commission <= 0:
+        frappe.msgprint(f"Credit Note {doc.name} tidak memiliki komisi, JE pembalik tidak dibuat.")
+        return
+
+    accounts = get_accounts(doc.company)
+    employee_party = get_employee_party(doc, "Credit Note", "JE pembalik")
+
+    claim_sources("Sales Invoice", [doc.name], COMMISSION_REVERSAL, company=doc.company)
+
+    reverse_je = frappe.new_doc("Journal Entry")
+    reverse_je.voucher_type = "Journal Entry"
+    reverse_je.posting_date = doc.posting_date
+    reverse_je.company = doc.company
+    reverse_je.user_remark = (
+        f"Reversal Commission for Credit Note {doc.name} "
+        f"(against Invoice {doc.return_against})"
+    )
+
+    # DEBIT Hutang Komisi Sales (mengurangi liability)
+    reverse_je.append("accounts", {
+        "account": accounts["payable_account"],
+        "debit_in_account_currency": reversed_commission,
+        "party_type": "Employee",
+        "party": employee_party
+    })
+
+    # CREDIT Beban Komisi Penjualan (mengurangi expense)
+    reverse_je.append("accounts", {
+        "account": accounts["expense_account"],
+        "credit_in_account_currency": reversed_commission
+    })
+
+    reverse_je.insert(ignore_permissions=True)
+    reverse_je.submit()
+    set_journal_entry("Sales Invoice", [doc.name], COMMISSION_REVERSAL, reverse_je.name)
+
+    # Link JE pembalik ke Credit Note
+    doc.db_set("custom_commission_journal_entry", reverse_je.name)
+
+    frappe.msgprint(
+        f"✓ Reversal Journal Entry {reverse_je.name} berhasil dibuat untuk Credit Note {doc.name}<br>"
+        f"Komisi dibalik: {reversed_commission}",
+        indicator="green"
+    )
+
+
+def get_accounts(company):
+    """Commission accounts of the company; throws when one is missing"""
+    accounts = get_commission_accounts(company)
+    if not accounts["expense_account"]:
+        frappe.throw(f"Tidak ditemukan akun Expense untuk komisi di company '{company}'")
+    if not accounts["payable_account"]:
+        frappe.throw(f"Tidak ditemukan akun Payable untuk komisi di company '{company}'")
+    return accounts
+
+
+def get_employee_party(doc, label, je_label):
+    """
+    Employee of the first sales person of the first item's Sales Order.
+
+    Args:
+        doc: Sales Invoice
+        label: "Sales Invoice" or "Credit Note", for messages
+        je_label: "JE" or "JE pembalik", for messages
+    """
+    if not doc.items or not doc.items[0].sales_order:
+        frappe.throw(f"{label} {doc.name} tidak memiliki Sales Order di item pertama. {je_label} tidak bisa dibuat.")
+
+    first_so = doc.items[0].sales_order
+    sales_persons = frappe.get_all(
+        "Sales Team",
+        filters={"parent": first_so, "parenttype": "Sales Order"},
+        pluck="sales_person",
+        order_by="idx"
+    )
+    if not sales_persons:
+        frappe.throw(f"Sales Order {first_so} tidak memiliki Sales Person. {je_label} tidak bisa dibuat.")
+
+    employee_party = get_first_employee(sales_persons)
+    if not employee_party:
+        frappe.throw(
+            f"{label} {doc.name}: Tidak ditemukan Employee untuk komisi di Sales Order {first_so}. "
+            "Pastikan semua Sales Person terkait Employee sebelum submit."
+        )
+
+    return employee_party
@@ -130,7 +130,8 @@ app_license = "mit"
 # Override standard doctype classes
 
 override_doctype_class = {
-	"Accounting Period": "batasku_custom.overrides.accounting_period.CustomAccountingPeriod"
+	"Accounting Period": "batasku_custom.overrides.accounting_period.CustomAccountingPeriod",
+	"Server Script": "batasku_custom.overrides.server_script.InstrumentedServerScript"
 }
 
 # Document Events
@@ -178,6 +179,24 @@ override_doctype_class = {
 # 	"frappe.desk.doctype.event.event.get_events": "batasku_custom.event.get_events"
 # }
 #
+# API server scripts ported to app modules keep their bare method names
+override_whitelisted_methods = {
+    "get_profit_commission_report_dual": "batasku_custom.api.commission_report.get_profit_commission_report_dual",
+    "fetch_pr_list_for_pi": "batasku_custom.api.pickers.fetch_pr_list_for_pi",
+    "fetch_po_list_for_pr": "batasku_custom.api.pickers.fetch_po_list_for_pr",
+    "fetch_so_list_for_dn": "batasku_custom.api.pickers.fetch_so_list_for_dn",
+    "pay_sales_commission": "batasku_custom.api.commission_payment.pay_sales_commission",
+    "clear_warkat_payment": "batasku_custom.api.warkat.clear_warkat_payment",
+    "bounce_warkat_payment": "batasku_custom.api.warkat.bounce_warkat_payment",
+    "kas_masuk_multi": "batasku_custom.api.cash.kas_masuk_multi",
+    "kas_keluar_multi": "batasku_custom.api.cash.kas_keluar_multi",
+    "fetch_po_detail_for_pr": "batasku_custom.api.details.fetch_po_detail_for_pr",
+    "fetch_pr_detail_for_pi": "batasku_custom.api.details.fetch_pr_detail_for_pi",
+    "fetch_pi_detail": "batasku_custom.api.details.fetch_pi_detail",
+    "preview_sales_invoice_commission": "batasku_custom.api.commission.preview_sales_invoice_commission",
+    "get_paid_sales_invoices": "batasku_custom.api.commission_payment.get_paid_sales_invoices"
+}
+#
 # each overriding function accepts a `data` argument;
 # generated from the base implementation of the doctype dashboard,
 # along with any modifications made in other Frappe apps
@@ -269,6 +288,12 @@ doc_events = {
     },
     "Sales Invoice": {
         "validate": "batasku_custom.accounting_period_restrictions.validate_transaction_against_closed_period",
+        "before_submit": "batasku_custom.hpp.snapshot_sales_invoice_hpp",
+        "on_submit": [
+            "batasku_custom.batasku_custom.doctype.sales_commission_fact.sales_commission_fact.on_sales_invoice_submit",
+            "batasku_custom.commission_journal.make_commission_journal_entry"
+        ],
+        "on_cancel": "batasku_custom.batasku_custom.doctype.sales_commission_fact.sales_commission_fact.on_sales_invoice_cancel",
         "before_cancel": "batasku_custom.accounting_period_restrictions.validate_transaction_deletion",
         "on_trash": "batasku_custom.accounting_period_restrictions.validate_transaction_deletion"
     },
@@ -279,6 +304,7 @@ doc_events = {
     },
     "Journal Entry": {
         "validate": "batasku_custom.accounting_period_restrictions.validate_transaction_against_closed_period",
+        "on_cancel": "batasku_custom.batasku_custom.doctype.auto_journal_registry.auto_journal_registry.on_journal_entry_cancel",
         "before_cancel": "batasku_custom.accounting_period_restrictions.validate_transaction_deletion",
         "on_trash": "batasku_custom.accounting_period_restrictions.validate_transaction_deletion"
     },
@@ -308,10 +334,37 @@ doc_events = {
             "batasku_custom.accounting_period_restrictions.validate_transaction_against_closed_period",
             "batasku_custom.overrides.delivery_note_return.validate_delivery_note_return"
         ],
+        "before_submit": "batasku_custom.hpp.snapshot_delivery_note_hpp",
         "on_submit": "batasku_custom.overrides.delivery_note_return.on_submit_delivery_note_return",
         "on_cancel": "batasku_custom.overrides.delivery_note_return.on_cancel_delivery_note_return",
         "before_cancel": "batasku_custom.accounting_period_restrictions.validate_transaction_deletion",
         "on_trash": "batasku_custom.accounting_period_restrictions.validate_transaction_deletion"
+    },
+    # Commission account / employee resolver cache
+    "Account": {
+        "on_update": "batasku_custom.commission_accounts.clear_commission_account_cache",
+        "on_trash": "batasku_custom.commission_accounts.clear_commission_account_cache",
+        "after_rename": "batasku_custom.commission_accounts.clear_commission_account_cache"
+    },
+    "Sales Person": {
+        "on_update": [
+            "batasku_custom.commission_accounts.clear_sales_person_employee_cache",
+            "batasku_custom.api.commission.clear_commission_preview_cache"
+        ],
+        "on_trash": [
+            "batasku_custom.commission_accounts.clear_sales_person_employee_cache",
+            "batasku_custom.api.commission.clear_commission_preview_cache"
+        ],
+        "after_rename": [
+            "batasku_custom.commission_accounts.clear_sales_person_employee_cache",
+            "batasku_custom.api.commission.clear_commission_preview_cache"
+        ]
+    },
+    # Delivery Note commission preview cache (sales team fallback)
+    "Customer": {
+        "on_update": "batasku_custom.api.commission.clear_commission_preview_cache",
+        "on_trash": "batasku_custom.api.commission.clear_commission_preview_cache",
+        "after_rename": "batasku_custom.api.commission.clear_commission_preview_cache"
     }
 }
 
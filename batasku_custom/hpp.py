@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+HPP (cost) resolution
+
+One batched resolver for the HPP fallback chain used by the Delivery Note
+and Sales Invoice snapshots and by the profit/commission report:
+
+    row snapshot → Delivery Note Item snapshot / incoming_rate (optional) →
+    row incoming_rate → Bin.valuation_rate → Item Price "Standar Pembelian" →
+    Item.last_purchase_rate (optional)
+
+The Delivery Note snapshot skips the Delivery Note Item tier: on a return,
+dn_detail points at the original Delivery Note's item, and the return is
+valued at its own incoming_rate first, as the server script did.
+
+Each tier is resolved for all pending rows with a single query, so the cost
+of a document no longer grows with its number of lines.
+
+The snapshot hooks replace the "Auto Snapshot Hpp DN" and
+"Auto Snapshoot Hpp SI" server scripts.
+"""
+
+from __future__ import unicode_literals
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+from batasku_custom.instrumentation import instrumented
+
+PURCHASE_PRICE_LIST = "Standar Pembelian"
+
+
+@instrumented
+def snapshot_delivery_note_hpp(doc, method=None):
+    """
+    Delivery Note before_submit: lock HPP and financial cost % on every item.
+
+    HPP falls back up to Item.last_purchase_rate; an item without any HPP
+    blocks the submit.
+    """
+    items = [item for item in doc.items if flt(item.custom_hpp_snapshot) <= 0]
+    if items:
+        hpp_map = resolve_hpp(items, use_dn_detail=False, use_last_purchase_rate=True)
+        for item in items:
+            hpp = hpp_map.get(item.name, 0)
+            if hpp <= 0:
+                frappe.throw(_(
+                    "HPP tidak ditemukan untuk item {0}. "
+                    "Periksa stok, valuation, price list, atau last purchase rate."
+                ).format(item.item_code))
+
+            # LOCK SNAPSHOT HPP
+            item.custom_hpp_snapshot = hpp
+
+    set_financial_cost_percent(doc.items)
+
+
+@instrumented
+def snapshot_sales_invoice_hpp(doc, method=None):
+    """
+    Sales Invoice before_submit: lock HPP and financial cost % on every item.
+
+    HPP and financial cost % are taken from the linked Delivery Note Item
+    first; an item without any HPP blocks the submit.
+    """
+    items = [item for item in doc.items if flt(item.custom_hpp_snapshot) <= 0]
+    if items:
+        hpp_map = resolve_hpp(items)
+        for item in items:
+            hpp = hpp_map.get(item.name, 0)
+            if hpp <= 0:
+                frappe.throw(_(
+                    "HPP tidak valid untuk item {0} di Sales Invoice {1}. "
+                    "Periksa Delivery Note, stok, valuation, atau price list."
+                ).format(item.item_code, doc.name))
+
+            # LOCK SNAPSHOT HPP
+            item.custom_hpp_snapshot = hpp
+
+    set_financial_cost_percent(doc.items, use_dn_detail=True)
+
+
+def resolve_hpp(rows, use_dn_detail=True, use_last_purchase_rate=False):
+    """
+    Resolve HPP for a list of item rows, one query per fallback tier.
+
+    Rows can be child documents or dicts with name, item_code, warehouse,
+    custom_hpp_snapshot, incoming_rate and optionally dn_detail.
+
+    Args:
+        rows: Delivery Note Item / Sales Invoice Item rows
+        use_dn_detail: Try the linked Delivery Note Item before the row's
+            own incoming_rate
+        use_last_purchase_rate: Also fall back to Item.last_purchase_rate
+
+    Returns:
+        {row name: hpp}, 0 when no tier has a value
+    """
+    hpp_map = {}
+    pending = []
+
+    for row in rows:
+        snapshot = flt(row.get("custom_hpp_snapshot"))
+        if snapshot > 0:
+            hpp_map[row.name] = snapshot
+        else:
+            pending.append(row)
+
+    # Delivery Note Item snapshot / incoming rate, then the row's own incoming rate
+    dn_rates = {}
+    if use_dn_detail:
+        dn_rates = get_dn_item_rates({row.get("dn_detail") for row in pending if row.get("dn_detail")})
+    pending = _apply_tier(pending, hpp_map, lambda row: first_positive(
+        dn_rates.get(row.get("dn_detail")), row.get("incoming_rate")
+    ))
+
+    # Bin valuation rate
+    valuation = get_bin_valuation_rates(pending)
+    pending = _apply_tier(pending, hpp_map, lambda row: valuation.get((row.item_code, row.warehouse)))
+
+    # Item Price "Standar Pembelian"
+    prices = get_purchase_prices({row.item_code for row in pending if row.item_code})
+    pending = _apply_tier(pending, hpp_map, lambda row: prices.get(row.item_code))
+
+    # Item.last_purchase_rate
+    if use_last_purchase_rate and pending:
+        item_values = get_item_values({row.item_code for row in pending if row.item_code}, "last_purchase_rate")
+        pending = _apply_tier(pending, hpp_map, lambda row: item_values.get(row.item_code))
+
+    for row in pending:
+        hpp_map[row.name] = 0
+
+    return hpp_map
+
+
+def set_financial_cost_percent(rows, use_dn_detail=False):
+    """
+    Lock custom_financial_cost_percent on rows that do not have one yet.
+
+    Taken from the linked Delivery Note Item (when use_dn_detail) and then
+    from the Item master; 0 is a valid value (no overhead).
+    """
+    rows = [row for row in rows if flt(row.get("custom_financial_cost_percent")) <= 0]
+    if not rows:
+        return
+
+    dn_values = {}
+    if use_dn_detail:
+        dn_details = {row.dn_detail for row in rows if row.get("dn_detail")}
+        if dn_details:
+            dn_values = dict(frappe.db.sql("""
+                SELECT name, custom_financial_cost_percent
+                FROM `tabDelivery Note Item`
+                WHERE name IN %(names)s
+            """, {"names": tuple(dn_details)}))
+
+    missing = [row for row in rows if flt(dn_values.get(row.get("dn_detail"))) <= 0]
+    item_values = get_item_values({row.item_code for row in missing if row.item_code}, "custom_financial_cost_percent")
+
+    for row in rows:
+        fin_cost = flt(dn_values.get(row.get("dn_detail")))
+        if fin_cost <= 0:
+            fin_cost = flt(item_values.get(row.item_code))
+        row.custom_financial_cost_percent = fin_cost
+
+
+def get_dn_item_rates(dn_details):
+    """Return {Delivery Note Item name: snapshot HPP, else incoming_rate}"""
+    if not dn_details:
+        return {}
+
+    rows = frappe.db.sql("""
+        SELECT name, custom_hpp_snapshot, incoming_rate
+        FROM `tabDelivery Note Item`
+        WHERE name IN %(names)s
+    """, {"names": tuple(dn_details)}, as_dict=True)
+
+    return {row.name: first_positive(row.custom_hpp_snapshot, row.incoming_rate) for row in rows}
+
+
+def get_bin_valuation_rates(rows):
+    """Return {(item_code, warehouse): valuation_rate} for the rows' Bins"""
+    pairs = {(row.item_code, row.warehouse) for row in rows if row.item_code and row.get("warehouse")}
+    if not pairs:
+        return {}
+
+    result = frappe.db.sql("""
+        SELECT item_code, warehouse, valuation_rate
+        FROM `tabBin`
+        WHERE item_code IN %(item_codes)s AND warehouse IN %(warehouses)s
+    """, {
+        "item_codes": tuple({pair[0] for pair in pairs}),
+        "warehouses": tuple({pair[1] for pair in pairs})
+    }, as_dict=True)
+
+    return {(row.item_code, row.warehouse): flt(row.valuation_rate) for row in result}
+
+
+def get_purchase_prices(item_codes, price_list=PURCHASE_PRICE_LIST):
+    """Return {item_code: price_list_rate}, latest modified Item Price per item"""
+    if not item_codes:
+        return {}
+
+    prices = {}
+    for row in frappe.db.sql("""
+        SELECT item_code, price_list_rate
+        FROM `tabItem Price`
+        WHERE price_list = %(price_list)s AND item_code IN %(item_codes)s
+        ORDER BY modified DESC
+    """, {"price_list": price_list, "item_codes": tuple(item_codes)}, as_dict=True):
+        prices.setdefault(row.item_code, flt(row.price_list_rate))
+
+    return prices
+
+
+def get_item_values(item_codes, fieldname):
+    """Return {item_code: value} of one Item master field"""
+    if not item_codes:
+        return {}
+
+    return dict(frappe.get_all(
+        "Item",
+        filters={"name": ["in", list(item_codes)]},
+        fields=["name", fieldname],
+        as_list=True
+    ))
+
+
+def first_positive(*values):
+    """Return the first value greater than zero, or 0"""
+    for value in values:
+        if flt(value) > 0:
+            return flt(value)
+    return 0
+
+
+def _apply_tier(pending, hpp_map, get_rate):
+    """Set HPP from one tier for the rows it can resolve; return the rest"""
+    still_pending = []
+    for row in pending:
+        hpp = flt(get_rate(row))
+        if hpp:
+            hpp_map[row.name] = hpp
+        else:
+            still_pending.append(row)
+    return still_pending
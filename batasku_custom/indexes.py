@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Indexes for the app's hot queries
+
+`HOT_QUERY_INDEXES` lists the composite indexes the hooks, pickers and
+reports rely on. `ensure_indexes` (run by the add_hot_query_indexes patch)
+adds the ones no existing index already covers, i.e. no index starts with
+the same columns in the same order.
+
+`check_hot_queries` runs EXPLAIN on a representative form of each hot query
+and reports every table it reads with a full scan:
+
+    bench --site test.local execute batasku_custom.indexes.check_hot_queries
+"""
+
+from __future__ import unicode_literals
+
+import frappe
+
+# (doctype, columns in index order)
+HOT_QUERY_INDEXES = (
+    # Delivery Note return validation: returns of one delivery note
+    ("Delivery Note", ("return_against", "is_return", "docstatus")),
+    # Purchase Receipt picker: receipts without a Purchase Invoice
+    ("Purchase Invoice Item", ("purchase_receipt",)),
+    # Purchase Order picker: orders without a Purchase Receipt
+    ("Purchase Receipt Item", ("purchase_order",)),
+    # Commission report and payment: invoices of a sales person
+    ("Sales Team", ("parent", "sales_person")),
+    # Closed period index
+    ("Accounting Period", ("company", "status", "start_date", "end_date")),
+    # HPP fallback to the purchase price list
+    ("Item Price", ("item_code", "price_list")),
+)
+
+# (label, query, values); values only need to be plausible for EXPLAIN
+HOT_QUERIES = (
+    ("dn_returned_qty", """
+        SELECT dni.item_code, SUM(ABS(dni.qty))
+        FROM `tabDelivery Note Item` dni
+        INNER JOIN `tabDelivery Note` dn ON dni.parent = dn.name
+        WHERE dn.docstatus = 1
+            AND dn.is_return = 1
+            AND dn.return_against = %(name)s
+            AND dni.item_code IN %(item_codes)s
+        GROUP BY dni.item_code
+    """, {"name": "DN-EXPLAIN", "item_codes": ("ITEM-EXPLAIN",)}),
+    ("pr_picker_invoiced", """
+        SELECT 1
+        FROM `tabPurchase Invoice Item` pii
+        INNER JOIN `tabPurchase Invoice` pi ON pii.parent = pi.name
+        WHERE pii.purchase_receipt = %(name)s
+            AND pi.docstatus IN (0, 1)
+    """, {"name": "PR-EXPLAIN"}),
+    ("po_picker_received", """
+        SELECT 1
+        FROM `tabPurchase Receipt Item` pri
+        INNER JOIN `tabPurchase Receipt` pr ON pri.parent = pr.name
+        WHERE pri.purchase_order = %(name)s
+            AND pr.docstatus IN (0, 1)
+    """, {"name": "PO-EXPLAIN"}),
+    ("sales_person_invoices", """
+        SELECT si.name
+        FROM `tabSales Invoice` si
+        INNER JOIN `tabSales Team` st
+            ON st.parent = si.name
+            AND st.parenttype = 'Sales Invoice'
+        WHERE si.company = %(company)s
+            AND st.sales_person = %(sales_person)s
+            AND si.docstatus = 1
+    """, {"company": "COMPANY-EXPLAIN", "sales_person": "SP-EXPLAIN"}),
+    ("closed_periods", """
+        SELECT name, period_name, status, start_date, end_date
+        FROM `tabAccounting Period`
+        WHERE company = %(company)s
+            AND status IN ('Closed', 'Permanently Closed')
+        ORDER BY start_date, end_date
+    """, {"company": "COMPANY-EXPLAIN"}),
+    ("purchase_prices", """
+        SELECT item_code, price_list_rate
+        FROM `tabItem Price`
+        WHERE price_list = %(price_list)s AND item_code IN %(item_codes)s
+        ORDER BY modified DESC
+    """, {"price_list": "Standar Pembelian", "item_codes": ("ITEM-EXPLAIN",)}),
+)
+
+# EXPLAIN access types that read every row of the table or index
+FULL_SCAN_TYPES = ("ALL", "index")
+
+
+def ensure_indexes():
+    """
+    Add the hot query indexes that are missing.
+
+    Returns:
+        Names of the indexes created
+    """
+    created = []
+    for doctype, columns in HOT_QUERY_INDEXES:
+        if has_covering_index(doctype, columns):
+            continue
+
+        index_name = get_index_name(columns)
+        frappe.db.add_index(doctype, list(columns), index_name=index_name)
+        created.append(index_name)
+
+    return created
+
+
+def has_covering_index(doctype, columns):
+    """True if an index of the doctype's table starts with `columns`, in order"""
+    indexes = {}
+    for row in frappe.db.sql(f"SHOW INDEX FROM `tab{doctype}`", as_dict=True):
+        indexes.setdefault(row.Key_name, []).append((row.Seq_in_index, row.Column_name))
+
+    columns = list(columns)
+    for index_columns in indexes.values():
+        index_columns = [column for _, column in sorted(index_columns)]
+        if index_columns[:len(columns)] == columns:
+            return True
+
+    return False
+
+
+def get_index_name(columns):
+    # MariaDB limits identifiers to 64 characters
+    return "batasku_{0}_index".format("_".join(columns))[:64]
+
+
+def check_hot_queries():
+    """
+    EXPLAIN every hot query and report full table / index scans.
+
+    Returns:
+        [{"query", "table", "type", "key", "rows"}] of the scans found
+    """
+    scans = []
+    for label, query, values in HOT_QUERIES:
+        for row in frappe.db.sql(f"EXPLAIN {query}", values, as_dict=True):
+            if row.get("type") in FULL_SCAN_TYPES:
+                scans.append({
+                    "query": label,
+                    "table": row.get("table"),
+                    "type": row.get("type"),
+                    "key": row.get("key"),
+                    "rows": row.get("rows")
+                })
+
+    for scan in scans:
+        print("{query}: {type} scan on {table} (key {key}, ~{rows} rows)".format(**scan))
+    if not scans:
+        print(f"No full scans in {len(HOT_QUERIES)} hot queries")
+
+    return scans
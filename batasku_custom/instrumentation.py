@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Per-hook timing and query counts
+
+Opt-in instrumentation of the batasku_custom doc_events handlers and of
+DocType Event server scripts. Enable it per site:
+
+    bench --site <site> set-config batasku_instrument_hooks 1
+
+Every instrumented call records its wall time, the number of DB queries and
+the rows they returned. Stats are aggregated in one Redis hash per site, one
+set of counters per (doctype, event, handler), written with a single
+pipelined round trip per call. When the flag is off a handler only pays for
+one config lookup.
+
+Handlers opt in with the `instrumented` decorator; server scripts are timed
+by the Server Script class override in overrides/server_script.py. Read the
+stats with `batasku_custom.api.instrumentation.get_hook_stats` or the
+"Hook Performance" report.
+"""
+
+from __future__ import unicode_literals
+import functools
+
+import frappe
+
+from batasku_custom.profiling import QueryCounter
+
+INSTRUMENT_CONFIG_KEY = "batasku_instrument_hooks"
+HOOK_STATS_KEY = "batasku_hook_stats"
+STAT_FIELDS = ("calls", "errors", "total_ms", "max_ms", "queries", "rows")
+
+# HSET field to ARGV[2] if it is larger than the stored value
+SET_MAX_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if not current or tonumber(current) < tonumber(ARGV[2]) then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+"""
+
+
+def is_enabled():
+    return bool(frappe.conf.get(INSTRUMENT_CONFIG_KEY))
+
+
+def instrumented(fn):
+    """Record timing and query counts of a doc_events handler `fn(doc, method)`"""
+    handler = "{0}.{1}".format(fn.__module__.replace("batasku_custom.", "", 1), fn.__name__)
+
+    @functools.wraps(fn)
+    def wrapper(doc=None, method=None, *args, **kwargs):
+        if not is_enabled():
+            return fn(doc, method, *args, **kwargs)
+        with record_call(getattr(doc, "doctype", None), method, handler):
+            return fn(doc, method, *args, **kwargs)
+
+    return wrapper
+
+
+class record_call(object):
+    """Context manager timing one handler call and adding it to the stats"""
+
+    def __init__(self, doctype, event, handler):
+        self.key = "|".join((doctype or "", event or "", handler))
+        self.counter = QueryCounter()
+
+    def __enter__(self):
+        self.counter.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.counter.__exit__(exc_type, exc_value, traceback)
+        try:
+            add_call(self.key, self.counter, failed=exc_type is not None)
+        except Exception:
+            # Stats must never break the document action
+            frappe.log_error(title="Hook Instrumentation Error")
+        return False
+
+
+def add_call(key, counter, failed=False):
+    """Add one call to the Redis counters of `key` in one round trip"""
+    elapsed_ms = counter.elapsed * 1000
+
+    # Raw redis commands: frappe's hset/hget pickle values, HINCRBY needs numbers
+    pipe = frappe.cache().pipeline(transaction=False)
+    name = get_stats_key()
+    pipe.hincrby(name, f"{key}|calls", 1)
+    pipe.hincrbyfloat(name, f"{key}|total_ms", elapsed_ms)
+    pipe.hincrby(name, f"{key}|queries", counter.queries)
+    pipe.hincrby(name, f"{key}|rows", counter.rows)
+    if failed:
+        pipe.hincrby(name, f"{key}|errors", 1)
+    pipe.eval(SET_MAX_SCRIPT, 1, name, f"{key}|max_ms", elapsed_ms)
+    pipe.execute()
+
+
+def get_stats():
+    """
+    Aggregated stats, slowest total time first.
+
+    Returns:
+        [{doctype, event, handler, calls, errors, total_ms, avg_ms, max_ms,
+        queries, avg_queries, rows}]
+    """
+    pipe = frappe.cache().pipeline(transaction=False)
+    pipe.hgetall(get_stats_key())
+    raw = pipe.execute()[0] or {}
+
+    stats = {}
+    for field, value in raw.items():
+        doctype, event, handler, stat = frappe.safe_decode(field).rsplit("|", 3)
+        row = stats.setdefault((doctype, event, handler), dict.fromkeys(STAT_FIELDS, 0))
+        row[stat] = float(value)
+
+    rows = []
+    for (doctype, event, handler), row in stats.items():
+        calls = int(row["calls"]) or 1
+        rows.append(frappe._dict({
+            "doctype": doctype,
+            "event": event,
+            "handler": handler,
+            "calls": int(row["calls"]),
+            "errors": int(row["errors"]),
+            "total_ms": round(row["total_ms"], 3),
+            "avg_ms": round(row["total_ms"] / calls, 3),
+            "max_ms": round(float(row["max_ms"]), 3),
+            "queries": int(row["queries"]),
+            "avg_queries": round(row["queries"] / calls, 2),
+            "rows": int(row["rows"])
+        }))
+
+    return sorted(rows, key=lambda row: row.total_ms, reverse=True)
+
+
+def reset_stats():
+    frappe.cache().delete_value(HOOK_STATS_KEY)
+
+
+def get_stats_key():
+    return frappe.cache().make_key(HOOK_STATS_KEY)
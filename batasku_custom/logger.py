@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Logging for batasku_custom
+
+`get_logger("purchase_invoice")` returns a logger for the site log
+`sites/<site>/logs/batasku_custom.purchase_invoice.log`.
+
+Levels come from site config and default to WARNING, so disabled debug
+output costs one level check:
+
+    bench --site <site> set-config batasku_log_level INFO
+    bench --site <site> set-config batasku_log_levels '{"delivery_note_return": "DEBUG"}' --parse
+
+`batasku_log_levels` overrides the site level per module.
+
+Keyword arguments other than the standard logging ones are structured
+fields, appended to the message as JSON:
+
+    logger.debug("Return validated", doc=doc.name, items=len(doc.items))
+
+Trace mode logs everything at DEBUG for a sample of requests and jobs, so a
+production site can be profiled without turning debug on for everybody.
+Every line of a traced request carries the same `trace` field:
+
+    bench --site <site> set-config batasku_log_trace_sample_rate 0.01
+
+Pass values as logging arguments (`logger.debug("PI %s", name)`) rather than
+pre-formatted strings, and guard anything expensive to build with
+`logger.isEnabledFor(logging.DEBUG)`.
+"""
+
+from __future__ import unicode_literals
+import json
+import logging
+import random
+
+import frappe
+from frappe.utils import flt
+
+DEFAULT_LOG_LEVEL = "WARNING"
+LOG_LEVEL_CONFIG_KEY = "batasku_log_level"
+MODULE_LOG_LEVELS_CONFIG_KEY = "batasku_log_levels"
+TRACE_SAMPLE_RATE_CONFIG_KEY = "batasku_log_trace_sample_rate"
+
+# Keyword arguments handled by logging itself, everything else is a field
+LOGGING_KWARGS = ("exc_info", "stack_info", "stacklevel", "extra")
+
+
+class BataskuLogger(logging.LoggerAdapter):
+    """Level-gated logger adapter with structured fields and trace sampling"""
+
+    def __init__(self, logger, level):
+        super().__init__(logger, {})
+        self.level = level
+
+    def isEnabledFor(self, level):
+        return level >= self.level or get_trace_id() is not None
+
+    def log(self, level, msg, *args, **kwargs):
+        if self.isEnabledFor(level):
+            msg, kwargs = self.process(msg, kwargs)
+            self.logger.log(level, msg, *args, **kwargs)
+
+    def process(self, msg, kwargs):
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in LOGGING_KWARGS}
+
+        trace_id = get_trace_id()
+        if trace_id:
+            fields["trace"] = trace_id
+
+        if fields:
+            msg = "{0} {1}".format(msg, json.dumps(fields, default=str, sort_keys=True))
+        return msg, kwargs
+
+
+def get_logger(module):
+    """
+    Return the logger for a batasku_custom module.
+
+    Args:
+        module: Module name, without the `batasku_custom.` prefix
+    """
+    logger = frappe.logger(f"batasku_custom.{module}", allow_site=True)
+    # The adapter gates by level; the file logger passes everything it gets
+    logger.setLevel(logging.DEBUG)
+    return BataskuLogger(logger, get_log_level(module))
+
+
+def get_log_level(module=None):
+    """
+    Level of a module as a logging constant: `batasku_log_levels[module]`,
+    else `batasku_log_level`, else WARNING.
+    """
+    module_levels = frappe.conf.get(MODULE_LOG_LEVELS_CONFIG_KEY) or {}
+    level = module_levels.get(module) if module else None
+    return to_level(level or frappe.conf.get(LOG_LEVEL_CONFIG_KEY))
+
+
+def to_level(level):
+    level = logging.getLevelName(str(level or DEFAULT_LOG_LEVEL).upper())
+    return level if isinstance(level, int) else logging.WARNING
+
+
+def get_trace_id():
+    """
+    Trace id of the current request or job if it is sampled, else None.
+
+    Sampling is decided once per request / job (frappe.local is reset for
+    each) from `batasku_log_trace_sample_rate`.
+    """
+    trace_id = getattr(frappe.local, "batasku_trace_id", None)
+    if trace_id is None:
+        rate = flt(frappe.conf.get(TRACE_SAMPLE_RATE_CONFIG_KEY))
+        trace_id = frappe.generate_hash(length=10) if rate and random.random() < rate else ""
+        frappe.local.batasku_trace_id = trace_id
+    return trace_id or None
@@ -5,6 +5,14 @@
 from __future__ import unicode_literals
 import frappe
 from erpnext.accounts.doctype.accounting_period.accounting_period import AccountingPeriod
+from batasku_custom.accounting_period_restrictions import (
+    CLOSED_STATUSES,
+    clear_closed_period_cache,
+    sync_closed_documents
+)
+from batasku_custom.batasku_custom.doctype.account_balance_snapshot.account_balance_snapshot import (
+    on_period_status_change
+)
 
 class CustomAccountingPeriod(AccountingPeriod):
     """Custom Accounting Period with bug fixes and enhancements"""
@@ -28,9 +36,28 @@ class CustomAccountingPeriod(AccountingPeriod):
     
     def on_update(self):
         """Update closed status of all documents when period status changes"""
-        # Sync closed_documents with period status
+        # Sync closed_documents with period status; the rows are already
+        # saved at this point, so update them in the database as well
         if self.get('status'):
-            should_close = self.get('status') in ['Closed', 'Permanently Closed']
+            should_close = self.get('status') in CLOSED_STATUSES
             
             for doc in self.closed_documents:
                 doc.closed = 1 if should_close else 0
+            sync_closed_documents([self.name], should_close)
+            
+            # Freeze the GL balances on close, drop them on reopen
+            before = self.get_doc_before_save()
+            if (before.get('status') if before else 'Open') != self.status:
+                on_period_status_change([self.name], self.status)
+        
+        # Status or dates may have changed, rebuild the closed period index
+        clear_closed_period_cache()
+    
+    def on_trash(self):
+        """Drop the cached closed period index and the balance snapshots when a period is deleted"""
+        clear_closed_period_cache()
+        on_period_status_change([self.name], 'Open')
+    
+    def after_rename(self, old_name, new_name, merge=False):
+        """Cached index rows carry the period name, rebuild after rename"""
+        clear_closed_period_cache()
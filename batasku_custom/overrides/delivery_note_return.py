@@ -10,8 +10,12 @@ Handles validation and processing for delivery note returns
 from __future__ import unicode_literals
 import frappe
 from frappe import _
-from frappe.utils import now, nowdate
+from frappe.utils import flt, now, nowdate
 
+from batasku_custom.instrumentation import instrumented
+from batasku_custom.logger import get_logger
+
+@instrumented
 def validate_delivery_note_return(doc, method=None):
     """
     Validate Delivery Note Return before saving
@@ -21,68 +25,43 @@ def validate_delivery_note_return(doc, method=None):
     - Notes are provided when reason is "Other"
     - Return quantities don't exceed original delivered quantities
     - Populates company_total_stock for each item
+    
+    Stock, delivered and previously returned quantities are read with one
+    grouped query each for the whole document, not per item row.
     """
     
     if not doc.is_return:
         return
     
-    print("\n" + "="*80)
-    print(f"=== VALIDATE DELIVERY NOTE RETURN: {doc.name} ===")
-    print("="*80)
-    
-    frappe.logger().info(f"=== VALIDATE DELIVERY NOTE RETURN: {doc.name} ===")
+    logger = get_logger("delivery_note_return")
+    logger.debug("Validating delivery note return", doc=doc.name, items=len(doc.items))
     
     # Validate return against exists
     if not doc.return_against:
         frappe.throw(_("Return Against is required for return documents"))
     
-    # Get original delivery note
-    original_dn = frappe.get_doc("Delivery Note", doc.return_against)
+    # Delivered qty per item on the original delivery note
+    original_qty = get_delivered_qty_map(doc.return_against)
+    if not original_qty and not frappe.db.exists("Delivery Note", doc.return_against):
+        frappe.throw(
+            _("Delivery Note {0} not found").format(doc.return_against),
+            frappe.DoesNotExistError
+        )
     
-    # Build map of original items
-    original_items = {}
-    for item in original_dn.items:
-        original_items[item.item_code] = {
-            'qty': item.qty,
-            'warehouse': item.warehouse,
-            'rate': item.rate
-        }
+    item_codes = {item.item_code for item in doc.items if item.item_code}
+    stock_qty = get_actual_qty_map(doc.items)
+    returned_qty = get_returned_qty_map(doc.return_against, item_codes, exclude=doc.name)
     
-    # Validate return items and populate company_total_stock
-    print(f"\nProcessing {len(doc.items)} items...")
     for item in doc.items:
-        print(f"\n  Item: {item.item_code}")
-        print(f"    Warehouse: {item.warehouse}")
-        print(f"    Current company_total_stock: {item.company_total_stock or 0}")
-        
-        frappe.logger().info(f"Processing item {item.item_code} at warehouse {item.warehouse}")
-        
         # Populate company_total_stock from Bin
         if item.item_code and item.warehouse:
-            try:
-                # Use frappe.db.sql for more reliable query
-                bin_data = frappe.db.sql("""
-                    SELECT actual_qty, projected_qty
-                    FROM `tabBin`
-                    WHERE item_code = %s AND warehouse = %s
-                    LIMIT 1
-                """, (item.item_code, item.warehouse), as_dict=True)
-                
-                if bin_data and len(bin_data) > 0:
-                    item.company_total_stock = bin_data[0].actual_qty or 0
-                    print(f"    ✓ Set company_total_stock: {item.company_total_stock}")
-                    frappe.logger().info(f"✓ Set company_total_stock for {item.item_code}: {item.company_total_stock}")
-                else:
-                    item.company_total_stock = 0
-                    print(f"    ⚠ No Bin record found, set to 0")
-                    frappe.logger().warning(f"⚠ No Bin record found for {item.item_code} at {item.warehouse}, setting to 0")
-            except Exception as e:
-                item.company_total_stock = 0
-                print(f"    ✗ Error: {str(e)}")
-                frappe.logger().error(f"✗ Failed to get stock for {item.item_code}: {str(e)}")
+            item.company_total_stock = stock_qty.get((item.item_code, item.warehouse), 0)
+            logger.debug(
+                "Company total stock", doc=doc.name, row=item.idx, item_code=item.item_code,
+                warehouse=item.warehouse, company_total_stock=item.company_total_stock
+            )
         else:
-            print(f"    ⚠ Missing item_code or warehouse")
-            frappe.logger().warning(f"⚠ Missing item_code or warehouse for row {item.idx}")
+            logger.warning("Missing item_code or warehouse", doc=doc.name, row=item.idx)
         
         # Validate return reason is selected
         if not item.return_reason:
@@ -97,37 +76,81 @@ def validate_delivery_note_return(doc, method=None):
             ).format(item.idx, item.item_code))
         
         # Validate return quantity doesn't exceed delivered quantity
-        if item.item_code in original_items:
-            original_qty = abs(original_items[item.item_code]['qty'])
+        if item.item_code in original_qty:
+            delivered_qty = original_qty[item.item_code]
             return_qty = abs(item.qty)
-            
-            # Check for previous returns
-            previous_returns = frappe.db.sql("""
-                SELECT SUM(ABS(dni.qty)) as total_returned
-                FROM `tabDelivery Note Item` dni
-                INNER JOIN `tabDelivery Note` dn ON dni.parent = dn.name
-                WHERE dn.docstatus = 1
-                AND dn.is_return = 1
-                AND dn.return_against = %s
-                AND dni.item_code = %s
-                AND dn.name != %s
-            """, (doc.return_against, item.item_code, doc.name), as_dict=True)
-            
-            total_returned = previous_returns[0].total_returned or 0
-            remaining_qty = original_qty - total_returned
+            total_returned = returned_qty.get(item.item_code, 0)
+            remaining_qty = delivered_qty - total_returned
             
             if return_qty > remaining_qty:
                 frappe.throw(_(
                     "Row {0}: Return quantity ({1}) exceeds remaining returnable quantity ({2}) for item {3}. "
                     "Delivered: {4}, Previously returned: {5}"
                 ).format(item.idx, return_qty, remaining_qty, item.item_code, 
-                        original_qty, total_returned))
+                        delivered_qty, total_returned))
+    
+    logger.debug("Validation complete for delivery note return", doc=doc.name)
+
+def get_delivered_qty_map(delivery_note):
+    """Return {item_code: delivered qty} for a delivery note, read as a projection"""
+    rows = frappe.db.sql("""
+        SELECT item_code, SUM(ABS(qty)) AS qty
+        FROM `tabDelivery Note Item`
+        WHERE parent = %s AND parenttype = 'Delivery Note'
+        GROUP BY item_code
+    """, (delivery_note,), as_dict=True)
+    
+    return {row.item_code: flt(row.qty) for row in rows}
+
+def get_actual_qty_map(items):
+    """Return {(item_code, warehouse): actual_qty} from Bin for all item rows in one query"""
+    pairs = {(item.item_code, item.warehouse) for item in items if item.item_code and item.warehouse}
+    if not pairs:
+        return {}
+    
+    item_codes = tuple({pair[0] for pair in pairs})
+    warehouses = tuple({pair[1] for pair in pairs})
+    
+    try:
+        rows = frappe.db.sql("""
+            SELECT item_code, warehouse, actual_qty
+            FROM `tabBin`
+            WHERE item_code IN %(item_codes)s AND warehouse IN %(warehouses)s
+        """, {"item_codes": item_codes, "warehouses": warehouses}, as_dict=True)
+    except Exception as e:
+        get_logger("delivery_note_return").error("Failed to read Bin stock: %s", e)
+        return {}
+    
+    return {
+        (row.item_code, row.warehouse): flt(row.actual_qty)
+        for row in rows
+        if (row.item_code, row.warehouse) in pairs
+    }
+
+def get_returned_qty_map(return_against, item_codes, exclude=None):
+    """Return {item_code: qty} already returned against a delivery note by other submitted returns"""
+    if not item_codes:
+        return {}
+    
+    rows = frappe.db.sql("""
+        SELECT dni.item_code, SUM(ABS(dni.qty)) AS total_returned
+        FROM `tabDelivery Note Item` dni
+        INNER JOIN `tabDelivery Note` dn ON dni.parent = dn.name
+        WHERE dn.docstatus = 1
+        AND dn.is_return = 1
+        AND dn.return_against = %(return_against)s
+        AND dni.item_code IN %(item_codes)s
+        AND dn.name != %(exclude)s
+        GROUP BY dni.item_code
+    """, {
+        "return_against": return_against,
+        "item_codes": tuple(item_codes),
+        "exclude": exclude or ""
+    }, as_dict=True)
     
-    print("\n" + "="*80)
-    print(f"=== VALIDATION COMPLETE FOR: {doc.name} ===")
-    print("="*80 + "\n")
-    frappe.logger().info(f"=== VALIDATION COMPLETE FOR: {doc.name} ===")
+    return {row.item_code: flt(row.total_returned) for row in rows}
 
+@instrumented
 def on_submit_delivery_note_return(doc, method=None):
     """
     Handle Delivery Note Return submission
@@ -143,6 +166,7 @@ def on_submit_delivery_note_return(doc, method=None):
     
     frappe.msgprint(_("Return processed successfully. Stock has been updated."))
 
+@instrumented
 def on_cancel_delivery_note_return(doc, method=None):
     """
     Handle Delivery Note Return cancellation
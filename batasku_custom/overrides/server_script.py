@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+from __future__ import unicode_literals
+from frappe.core.doctype.server_script.server_script import ServerScript
+
+from batasku_custom.instrumentation import is_enabled, record_call
+
+
+class InstrumentedServerScript(ServerScript):
+    """Server Script that records timing and query counts of DocType Event scripts"""
+
+    def execute_doc(self, doc):
+        if not is_enabled():
+            return super().execute_doc(doc)
+
+        with record_call(doc.doctype, self.doctype_event, f"Server Script: {self.name}"):
+            return super().execute_doc(doc)
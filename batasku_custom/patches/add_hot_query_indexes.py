@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Add the composite indexes of the app's hot queries that are missing
+(see batasku_custom.indexes).
+"""
+
+from __future__ import unicode_literals
+
+from batasku_custom.indexes import ensure_indexes
+
+
+def execute():
+    ensure_indexes()
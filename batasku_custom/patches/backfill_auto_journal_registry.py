@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Register the automatic Journal Entries posted before the Auto Journal
+Registry existed, so the duplicate checks also cover them.
+"""
+
+from __future__ import unicode_literals
+import frappe
+from frappe.utils import now
+
+from batasku_custom.api.commission_payment import PAYMENT_REMARK
+from batasku_custom.api.warkat import BOUNCE_REMARK, CLEAR_REMARK
+from batasku_custom.batasku_custom.doctype.auto_journal_registry.auto_journal_registry import (
+    COMMISSION_ACCRUAL,
+    COMMISSION_PAYMENT,
+    COMMISSION_REVERSAL,
+    DOCTYPE,
+    WARKAT_BOUNCE,
+    WARKAT_CLEAR
+)
+
+
+def execute():
+    frappe.reload_doc("batasku_custom", "doctype", "auto_journal_registry")
+
+    # Commission accrual / reversal linked on the Sales Invoice
+    rows = frappe.db.sql("""
+        SELECT 'Sales Invoice', si.name,
+            IF(si.is_return = 1, %(reversal)s, %(accrual)s), je.name, si.company
+        FROM `tabSales Invoice` si
+        INNER JOIN `tabJournal Entry` je
+            ON je.name = si.custom_commission_journal_entry AND je.docstatus = 1
+        WHERE si.docstatus = 1
+    """, {"accrual": COMMISSION_ACCRUAL, "reversal": COMMISSION_REVERSAL})
+
+    # Commission payments reference the Sales Invoice on their debit rows
+    rows += frappe.db.sql("""
+        SELECT DISTINCT 'Sales Invoice', jea.reference_name, %(purpose)s, je.name, je.company
+        FROM `tabJournal Entry` je
+        INNER JOIN `tabJournal Entry Account` jea ON jea.parent = je.name
+        WHERE je.docstatus = 1
+            AND je.user_remark = %(remark)s
+            AND IFNULL(jea.reference_name, '') != ''
+    """, {"purpose": COMMISSION_PAYMENT, "remark": PAYMENT_REMARK})
+
+    # Warkat journals carry the Payment Entry name in their remark
+    rows += frappe.db.sql("""
+        SELECT 'Payment Entry', SUBSTRING(je.user_remark, %(offset)s), %(purpose)s, je.name, je.company
+        FROM `tabJournal Entry` je
+        WHERE je.docstatus = 1 AND je.user_remark LIKE %(prefix)s
+    """, {"offset": len(CLEAR_REMARK) + 1, "purpose": WARKAT_CLEAR, "prefix": CLEAR_REMARK + "%"})
+
+    rows += frappe.db.sql("""
+        SELECT 'Payment Entry',
+            SUBSTRING_INDEX(SUBSTRING(je.user_remark, %(offset)s), '. Alasan:', 1),
+            %(purpose)s, je.name, je.company
+        FROM `tabJournal Entry` je
+        WHERE je.docstatus = 1 AND je.user_remark LIKE %(prefix)s
+    """, {"offset": len(BOUNCE_REMARK) + 1, "purpose": WARKAT_BOUNCE, "prefix": BOUNCE_REMARK + "%"})
+
+    timestamp = now()
+    frappe.db.bulk_insert(
+        DOCTYPE,
+        fields=["name", "source_doctype", "source_name", "purpose", "journal_entry", "company",
+            "creation", "modified", "owner", "modified_by"],
+        values=[
+            (frappe.generate_hash(length=10),) + tuple(row) + (timestamp, timestamp, "Administrator", "Administrator")
+            for row in rows
+        ],
+        ignore_duplicates=True
+    )
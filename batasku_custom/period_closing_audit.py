@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Buffered audit writer for Period Closing Log
+
+Audit entries are collected per request or background job and written after
+the caller's transaction commits, in a single bulk insert run by a background
+job. Nothing is committed in the middle of the caller's transaction, and a
+rolled back transaction leaves no audit rows behind.
+
+Usage:
+    from batasku_custom.period_closing_audit import log_period_action
+    log_period_action(period_name, 'Transaction Modified', reason='...')
+"""
+
+from __future__ import unicode_literals
+import frappe
+from frappe.model.naming import set_new_name
+from frappe.utils import now
+
+LOG_FIELDS = (
+    'accounting_period',
+    'action_type',
+    'action_by',
+    'action_date',
+    'reason',
+    'before_snapshot',
+    'after_snapshot',
+    'affected_transaction',
+    'transaction_doctype',
+    'ip_address',
+    'user_agent'
+)
+
+_BUFFER_ATTR = 'batasku_period_closing_log_buffer'
+
+
+def log_period_action(accounting_period, action_type, **fields):
+    """
+    Buffer a Period Closing Log entry until the current transaction commits.
+
+    Request details (user, IP address, user agent) are captured now, since
+    the entry is written later from a background job.
+
+    Args:
+        accounting_period: Accounting Period name
+        action_type: One of the Period Closing Log action types
+        **fields: Any other Period Closing Log field
+    """
+    entry = {
+        'accounting_period': accounting_period,
+        'action_type': action_type,
+        'action_by': frappe.session.user,
+        'action_date': now(),
+        'ip_address': getattr(frappe.local, 'request_ip', None),
+        'user_agent': _get_user_agent()
+    }
+    entry.update({key: value for key, value in fields.items() if key in LOG_FIELDS})
+
+    buffer = _get_buffer()
+    if not buffer:
+        # First entry in this transaction, flush once it commits
+        frappe.db.after_commit.add(flush)
+        frappe.db.after_rollback.add(discard)
+    buffer.append(entry)
+
+
+def flush():
+    """Hand all buffered entries to one background job"""
+    entries = _get_buffer()
+    if not entries:
+        return
+
+    setattr(frappe.local, _BUFFER_ATTR, [])
+    frappe.enqueue(
+        'batasku_custom.period_closing_audit.write_period_closing_logs',
+        queue='short',
+        entries=entries,
+        now=frappe.flags.in_test
+    )
+
+
+def discard():
+    """Drop buffered entries of a rolled back transaction"""
+    setattr(frappe.local, _BUFFER_ATTR, [])
+
+
+def write_period_closing_logs(entries):
+    """
+    Write Period Closing Log entries with a single bulk insert.
+
+    Entries come from trusted writers in this app, so document validation is
+    skipped; only naming and standard columns are filled in here.
+    """
+    if not entries:
+        return
+
+    timestamp = now()
+    columns = ('name', 'creation', 'modified', 'owner', 'modified_by', 'docstatus') + LOG_FIELDS
+    values = []
+
+    for entry in entries:
+        log = frappe.new_doc('Period Closing Log')
+        log.update(entry)
+        set_new_name(log)
+
+        values.append(
+            (log.name, timestamp, timestamp, log.action_by, log.action_by, 0)
+            + tuple(log.get(fieldname) for fieldname in LOG_FIELDS)
+        )
+
+    frappe.db.bulk_insert('Period Closing Log', columns, values)
+
+
+def _get_buffer():
+    buffer = getattr(frappe.local, _BUFFER_ATTR, None)
+    if buffer is None:
+        buffer = []
+        setattr(frappe.local, _BUFFER_ATTR, buffer)
+    return buffer
+
+
+def _get_user_agent():
+    request = getattr(frappe.local, 'request', None)
+    if not request:
+        return None
+    return (request.headers.get('User-Agent') or '')[:140]
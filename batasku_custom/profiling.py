@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Batasku and contributors
+# For license information, please see license.txt
+
+"""
+Query counting for benchmarks and instrumentation
+
+    with QueryCounter() as counter:
+        validate_delivery_note_return(doc)
+    counter.queries, counter.rows, counter.elapsed
+
+While at least one counter is active, `frappe.db.sql` of the current
+connection is shadowed by a wrapper that reports every query to all active
+counters, so counters can be nested. The wrapper is removed when the last
+counter exits; nothing is patched otherwise.
+"""
+
+from __future__ import unicode_literals
+import time
+
+import frappe
+
+
+class QueryCounter(object):
+    """Count queries, rows returned and wall time of a block"""
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.elapsed = 0.0
+        self._start = None
+
+    def __enter__(self):
+        counters = _get_active_counters()
+        if not counters:
+            _install(frappe.db)
+        counters.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.elapsed = time.perf_counter() - self._start
+        counters = _get_active_counters()
+        if self in counters:
+            counters.remove(self)
+        if not counters:
+            _uninstall(frappe.db)
+        return False
+
+    def as_dict(self):
+        return {
+            "queries": self.queries,
+            "rows": self.rows,
+            "elapsed_ms": round(self.elapsed * 1000, 3)
+        }
+
+
+def _get_active_counters():
+    if not hasattr(frappe.local, "batasku_query_counters"):
+        frappe.local.batasku_query_counters = []
+    return frappe.local.batasku_query_counters
+
+
+def _install(db):
+    original = db.sql
+
+    def counted_sql(*args, **kwargs):
+        result = original(*args, **kwargs)
+        rows = len(result) if isinstance(result, (list, tuple)) else 0
+        for counter in _get_active_counters():
+            counter.queries += 1
+            counter.rows += rows
+        return result
+
+    counted_sql.batasku_counted = True
+    db.sql = counted_sql
+
+
+def _uninstall(db):
+    if getattr(db.__dict__.get("sql"), "batasku_counted", False):
+        del db.sql